@@ -3,9 +3,9 @@ import json
 import logging
 from typing import List, Dict, Any
 from pydantic import BaseModel, Field
-from exa_py import Exa
 import google.generativeai as genai
 from dotenv import load_dotenv
+from pie_shared import exa_client
 
 load_dotenv()
 
@@ -31,7 +31,6 @@ class CompetitorBenchmark(BaseModel):
 # --- Configuration ---
 
 genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-_exa = Exa(api_key=os.getenv("EXA_API_KEY"))
 
 # Note: Using gemini-2.5-flash as requested. 
 # We don't need "application/json" mime type here because passing the Pydantic schema handles it.
@@ -84,7 +83,8 @@ async def _fetch_comparison_intel(product: str, competitor: str, category: str)
     logger.info(f"Searching web with Neural Query: {neural_query}")
 
     try:
-        result = _exa.search_and_contents(
+        # Runs in a worker thread via exa_client, so the event loop keeps serving other jobs
+        results = await exa_client.search_and_contents(
             neural_query,
             type="auto", # Balances exact keywords with semantic meaning
             num_results=3,
@@ -94,10 +94,10 @@ async def _fetch_comparison_intel(product: str, competitor: str, category: str)
         )
         
         snippets = []
-        for r in result.results:
+        for r in results:
             # Prioritize highlights (the most relevant part of the page)
-            content = r.highlights[0] if r.highlights else r.text
-            snippets.append(f"Source: {r.title}\nInsights: {content}")
+            content = r["highlights"][0] if r["highlights"] else r["text"]
+            snippets.append(f"Source: {r['title']}\nInsights: {content}")
             
         return "\n---\n".join(snippets)
         
@@ -0,0 +1,111 @@
+"""
+job_cache.py — per-job reviews and analysis results kept between calls.
+/analyze stores what it worked on, so /generate_report only needs the
+job_id. Entries live in an LRU bounded by JOB_CACHE_MAX_BYTES; entries
+pushed out of memory are spilled to JOB_CACHE_DIR as zstd msgpack and
+promoted back on the next hit. Everything expires after JOB_CACHE_TTL_SECONDS.
+"""
+import os
+import time
+import hashlib
+import asyncio
+from pathlib import Path
+from collections import OrderedDict
+import msgpack
+import zstandard
+
+JOB_CACHE_MAX_BYTES   = int(os.getenv("JOB_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+JOB_CACHE_TTL_SECONDS = float(os.getenv("JOB_CACHE_TTL_SECONDS", "3600"))
+JOB_CACHE_DIR = os.getenv("JOB_CACHE_DIR", str(Path(__file__).resolve().parent / "job_cache"))  # empty = no spill
+
+class JobCache:
+    def __init__(self, max_bytes: int = JOB_CACHE_MAX_BYTES, ttl: float = JOB_CACHE_TTL_SECONDS,
+                 spill_dir: str = JOB_CACHE_DIR):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.spill_dir = Path(spill_dir) if spill_dir else None
+        # job_id -> (entry, packed size, stored at)
+        self._entries: OrderedDict[str, tuple[dict, int, float]] = OrderedDict()
+        self._size = 0
+        if self.spill_dir:
+            self.spill_dir.mkdir(parents=True, exist_ok=True)
+
+    async def put(self, job_id: str, **fields):
+        """Store or extend the entry for `job_id` (e.g. reviews, then analysis_result)."""
+        current = await self.get(job_id) or {}
+        await self._store(job_id, {**current, **fields}, time.time())
+
+    async def get(self, job_id: str) -> dict | None:
+        hit = self._entries.get(job_id)
+        if hit is not None:
+            entry, _, stored_at = hit
+            if time.time() - stored_at > self.ttl:
+                self._drop(job_id)
+                return None
+            self._entries.move_to_end(job_id)
+            return entry
+        if self.spill_dir is None:
+            return None
+        spilled = await asyncio.to_thread(self._read_spilled, job_id)
+        if spilled is None:
+            return None
+        entry, stored_at = spilled
+        await self._store(job_id, entry, stored_at)
+        return entry
+
+    async def _store(self, job_id: str, entry: dict, stored_at: float):
+        size = len(msgpack.packb(entry))
+        self._drop(job_id)
+        self._entries[job_id] = (entry, size, stored_at)
+        self._size += size
+        await self._evict()
+
+    def _drop(self, job_id: str):
+        old = self._entries.pop(job_id, None)
+        if old is not None:
+            self._size -= old[1]
+
+    async def _evict(self):
+        while self._size > self.max_bytes and self._entries:
+            job_id, (entry, size, stored_at) = self._entries.popitem(last=False)
+            self._size -= size
+            if self.spill_dir and time.time() - stored_at < self.ttl:
+                await asyncio.to_thread(self._spill, job_id, entry, stored_at)
+
+    def _path(self, job_id: str) -> Path:
+        # job_id comes from the request body — never use it as a path directly
+        return self.spill_dir / f"{hashlib.sha256(job_id.encode()).hexdigest()[:32]}.msgpack.zst"
+
+    def _spill(self, job_id: str, entry: dict, stored_at: float):
+        path = self._path(job_id)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(zstandard.ZstdCompressor().compress(msgpack.packb(entry)))
+        os.utime(tmp, (stored_at, stored_at))  # TTL counts from the original store
+        tmp.replace(path)
+
+    def _read_spilled(self, job_id: str) -> tuple[dict, float] | None:
+        path = self._path(job_id)
+        try:
+            stored_at = path.stat().st_mtime
+            if time.time() - stored_at > self.ttl:
+                path.unlink(missing_ok=True)
+                return None
+            entry = msgpack.unpackb(zstandard.ZstdDecompressor().decompressobj().decompress(path.read_bytes()))
+        except (FileNotFoundError, ValueError, zstandard.ZstdError):
+            return None
+        path.unlink(missing_ok=True)  # back in memory now
+        return entry, stored_at
+
+    def prune_spilled(self) -> int:
+        """Delete expired spill files. Blocking — run in a thread."""
+        if self.spill_dir is None:
+            return 0
+        cutoff = time.time() - self.ttl
+        removed = 0
+        for path in self.spill_dir.glob("*.msgpack.zst"):
+            if path.stat().st_mtime < cutoff:
+                path.unlink(missing_ok=True)
+                removed += 1
+        return removed
+
+job_cache = JobCache()
@@ -1,9 +1,17 @@
 import asyncio
 import os
+import time
+from contextlib import asynccontextmanager
 from pathlib import Path
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import FileResponse, JSONResponse, Response
 from .models import AnalyzeRequest, ReportRequest
+from pie_shared.cancellation import cancellations, JobCancelled
+from pie_shared.tracing import TraceMiddleware, span, traced, drain
+from pie_shared.load import LoadMiddleware, load
+from pie_shared.wire import CodecRoute, CodecResponse
+from .job_cache import job_cache
+from pie_shared.http_ranges import strong_etag, not_modified, requested_range
 from .agents.sentiment_agent import run_sentiment_agent
 from .agents.priority_agent import run_priority_agent
 from .agents.competitor_agent import run_competitor_agent
@@ -12,7 +20,52 @@ from .report_writer import write_report
 from .finance_engine import generate_visualizations
 from .report_generator import convert_to_pdf
 
-app = FastAPI(title="Analysis Service")
+# PDFs and chart PNGs older than this are deleted (0 keeps them forever)
+REPORT_RETENTION_DAYS = float(os.getenv("REPORT_RETENTION_DAYS", "30"))
+REPORT_PRUNE_INTERVAL_SECONDS = float(os.getenv("REPORT_PRUNE_INTERVAL_SECONDS", "3600"))
+# Reports can be regenerated when a job is retried, so clients revalidate by ETag
+REPORT_CACHE_CONTROL = os.getenv("REPORT_CACHE_CONTROL", "private, max-age=300, must-revalidate")
+# Concurrent agent calls (mostly Gemini) at which the service reports itself saturated
+ANALYSIS_MAX_AGENT_CALLS = int(os.getenv("ANALYSIS_MAX_AGENT_CALLS", "16"))
+load.limit("agent_calls", ANALYSIS_MAX_AGENT_CALLS)
+
+def _prune_reports() -> int:
+    cutoff = time.time() - REPORT_RETENTION_DAYS * 86400
+    removed = job_cache.prune_spilled()
+    for path in REPORTS_DIR.iterdir():
+        if path.suffix in (".pdf", ".png") and path.stat().st_mtime < cutoff:
+            path.unlink(missing_ok=True)
+            _etags.pop(path, None)
+            removed += 1
+    return removed
+
+async def _prune_reports_loop():
+    while True:
+        try:
+            removed = await asyncio.to_thread(_prune_reports)
+            if removed:
+                print(f"[Analysis] Pruned {removed} old report files")
+        except Exception as e:
+            print(f"[Analysis] Report pruning failed: {e}")
+        await asyncio.sleep(REPORT_PRUNE_INTERVAL_SECONDS)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    prune_task = asyncio.create_task(_prune_reports_loop()) if REPORT_RETENTION_DAYS > 0 else None
+    yield
+    if prune_task:
+        prune_task.cancel()
+
+app = FastAPI(title="Analysis Service", lifespan=lifespan, default_response_class=CodecResponse)
+# msgpack/zstd bodies on request; JSON stays the default
+app.router.route_class = CodecRoute
+app.add_middleware(TraceMiddleware)
+app.add_middleware(LoadMiddleware)
+
+@app.exception_handler(JobCancelled)
+async def job_cancelled_handler(request: Request, exc: JobCancelled):
+    return JSONResponse(status_code=409, content={"detail": "Job was cancelled"})
+
 BASE_DIR = Path(__file__).resolve().parent
 
 # Define the reports directory inside analysis_service/app/
@@ -23,18 +76,30 @@ os.makedirs(REPORTS_DIR, exist_ok=True)
 
 @app.post("/analyze")
 async def analyze(req: AnalyzeRequest):
+    return await _analyze(req)
+
+@app.post("/analyze_and_report")
+async def analyze_and_report(req: AnalyzeRequest):
+    """/analyze and /generate_report in one round trip."""
+    analysis_result = await _analyze(req)
+    report = await _report(req.job_id, req.product_name, analysis_result,
+                           [r.model_dump() for r in req.reviews])
+    return {"analysis_result": analysis_result, **report}
+
+async def _analyze(req: AnalyzeRequest) -> dict:
     print(f"[Analysis] Starting for: {req.product_name} ({len(req.reviews)} reviews)")
     
     reviews_dicts = [r.model_dump() for r in req.reviews]
     
-    # Run all 4 agents in parallel
-    results = await asyncio.gather(
-        run_sentiment_agent(reviews_dicts),
-        run_priority_agent(reviews_dicts, req.product_name),
-        run_competitor_agent(reviews_dicts, req.product_name),
-        run_risk_agent(reviews_dicts, req.product_name, req.mau, req.arpu),
-        return_exceptions=True,
-    )
+    # Run all 4 agents in parallel — POST /cancel/{job_id} cancels whichever are still pending
+    with cancellations.track(req.job_id) as token, load.track("agent_calls", 4):
+        results = await token.run(asyncio.gather(
+            traced("agent.sentiment", run_sentiment_agent(reviews_dicts)),
+            traced("agent.priority", run_priority_agent(reviews_dicts, req.product_name)),
+            traced("agent.competitor", run_competitor_agent(reviews_dicts, req.product_name)),
+            traced("agent.risk", run_risk_agent(reviews_dicts, req.product_name, req.mau, req.arpu)),
+            return_exceptions=True,
+        ))
     
     sentiment_result  = results[0] if not isinstance(results[0], Exception) else {}
     priority_result   = results[1] if not isinstance(results[1], Exception) else {}
@@ -57,47 +122,109 @@ async def analyze(req: AnalyzeRequest):
     }
     
     print(f"[Analysis] All agents complete.")
+    # A following /generate_report for this job then only needs the job_id
+    await job_cache.put(
+        req.job_id,
+        product_name=req.product_name,
+        reviews=reviews_dicts,
+        analysis_result=analysis_result,
+    )
     return analysis_result
 
 
 @app.post("/generate_report")
 async def generate_report(req: ReportRequest):
-    reviews_dicts = [r.model_dump() for r in req.reviews]
+    """Fields left out of the request are taken from this job's /analyze call."""
+    cached = await job_cache.get(req.job_id) or {}
+    product_name = req.product_name or cached.get("product_name")
+    analysis_result = req.analysis_result if req.analysis_result is not None else cached.get("analysis_result")
+    reviews_dicts = [r.model_dump() for r in req.reviews] if req.reviews is not None else cached.get("reviews")
+    if product_name is None or analysis_result is None or reviews_dicts is None:
+        raise HTTPException(404, "No cached analysis for this job — send product_name, analysis_result and reviews")
+    return await _report(req.job_id, product_name, analysis_result, reviews_dicts)
 
-    markdown_text = await write_report(
-        req.product_name,
-        req.analysis_result,
-        reviews_dicts,
-    )
+async def _report(job_id: str, product_name: str, analysis_result: dict, reviews_dicts: list[dict]) -> dict:
+    with cancellations.track(job_id) as token, load.track("agent_calls"):
+        markdown_text = await token.run(traced("report.write_markdown", write_report(
+            product_name,
+            analysis_result,
+            reviews_dicts,
+        )))
 
-    chart_paths = generate_visualizations(
-        req.analysis_result,
-        req.job_id,
-        REPORTS_DIR,
-    )
+    with span("report.charts"):
+        chart_paths = generate_visualizations(
+            analysis_result,
+            job_id,
+            REPORTS_DIR,
+        )
 
-    report_path = str(REPORTS_DIR / f"report_{req.job_id}.pdf")
+    report_path = str(REPORTS_DIR / f"report_{job_id}.pdf")
 
-    success = convert_to_pdf(
-        markdown_text  = markdown_text,
-        output_path    = report_path,
-        reviews        = reviews_dicts,
-        chart_paths    = chart_paths,
-        product_name   = req.product_name,       # ← new
-        analysis_result = req.analysis_result,   # ← new (for WCS metadata on cover)
-    )
+    with span("report.render_pdf"):
+        success = convert_to_pdf(
+            markdown_text  = markdown_text,
+            output_path    = report_path,
+            reviews        = reviews_dicts,
+            chart_paths    = chart_paths,
+            product_name   = product_name,       # ← new
+            analysis_result = analysis_result,   # ← new (for WCS metadata on cover)
+        )
 
     if not success:
         return {"success": False, "report_path": None, "error": "PDF generation failed"}
 
     return {"success": True, "report_path": str(report_path)}
 
+@app.post("/cancel/{job_id}")
+async def cancel(job_id: str):
+    """Cancel pending agent calls for `job_id`."""
+    stopped = cancellations.cancel(job_id)
+    if stopped:
+        print(f"[Analysis] Cancelled {stopped} request(s) for job {job_id}")
+    return {"job_id": job_id, "cancelled": stopped}
+
+@app.get("/traces/{trace_id}")
+def get_trace(trace_id: str):
+    """Spans recorded for `trace_id`. Drained on read — the gateway stores them per job."""
+    return {"spans": drain(trace_id)}
+
+@app.get("/load")
+def get_load():
+    """Live load for the gateway's admission control."""
+    return load.snapshot()
+
 @app.get("/health")
 def health():
     return {"status": "ok"}
 @app.get("/report/{job_id}")
-def download_report(job_id: str):
+def download_report(job_id: str, request: Request):
     path = REPORTS_DIR / f"report_{job_id}.pdf"
     if not path.exists():
         raise HTTPException(404, "Report not found")
-    return FileResponse(path, media_type="application/pdf")
\ No newline at end of file
+
+    stat = path.stat()
+    etag = _report_etag(path, stat.st_mtime_ns, stat.st_size)
+    headers = {"ETag": etag, "Cache-Control": REPORT_CACHE_CONTROL, "Accept-Ranges": "bytes"}
+    if not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    byte_range = requested_range(request, etag, stat.st_size)
+    if byte_range is None:
+        return FileResponse(path, media_type="application/pdf", headers=headers)
+    start, end = byte_range
+    with open(path, "rb") as f:
+        f.seek(start)
+        chunk = f.read(end - start + 1)
+    headers["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+    return Response(chunk, status_code=206, media_type="application/pdf", headers=headers)
+
+_etags: dict[Path, tuple[int, int, str]] = {}
+
+def _report_etag(path: Path, mtime_ns: int, size: int) -> str:
+    """Content hash, recomputed only when the file changes."""
+    cached = _etags.get(path)
+    if cached and cached[:2] == (mtime_ns, size):
+        return cached[2]
+    etag = strong_etag(path.read_bytes())
+    _etags[path] = (mtime_ns, size, etag)
+    return etag
\ No newline at end of file
@@ -23,9 +23,10 @@ class AnalyzeRequest(BaseModel):
 
 class ReportRequest(BaseModel):
     job_id: str
-    product_name: str
-    analysis_result: dict
-    reviews: list[ReviewInput]
+    # Omitted fields come from the job cache filled by /analyze
+    product_name: Optional[str] = None
+    analysis_result: Optional[dict] = None
+    reviews: Optional[list[ReviewInput]] = None
 
 class PriorityItem(BaseModel):
     quadrant: str         # "IMMEDIATE" | "STRATEGIC" | "UX" | "MONITOR"
@@ -0,0 +1,71 @@
+import asyncio
+import os
+import time
+from app.job_cache import JobCache
+
+REVIEWS = [{"text": f"review {i}", "sentiment": "positive"} for i in range(50)]
+
+def test_put_extends_the_entry():
+    cache = JobCache(spill_dir="")
+
+    async def scenario():
+        await cache.put("j", reviews=REVIEWS)
+        await cache.put("j", analysis_result={"risk": 0.2})
+        return await cache.get("j"), await cache.get("other")
+
+    entry, missing = asyncio.run(scenario())
+    assert entry == {"reviews": REVIEWS, "analysis_result": {"risk": 0.2}}
+    assert missing is None
+
+def test_evicted_entries_spill_to_disk_and_come_back(tmp_path):
+    cache = JobCache(max_bytes=3000, spill_dir=str(tmp_path))
+
+    async def scenario():
+        await cache.put("old", reviews=REVIEWS)
+        await cache.put("new", reviews=REVIEWS)  # pushes "old" out of memory
+        spilled = list(tmp_path.glob("*.msgpack.zst"))
+        return spilled, await cache.get("old")
+
+    spilled, entry = asyncio.run(scenario())
+    assert len(spilled) == 1 and ".." not in spilled[0].name
+    assert entry == {"reviews": REVIEWS}
+
+def test_without_a_spill_dir_evicted_entries_are_gone():
+    cache = JobCache(max_bytes=3000, spill_dir="")
+
+    async def scenario():
+        await cache.put("old", reviews=REVIEWS)
+        await cache.put("new", reviews=REVIEWS)
+        return await cache.get("old"), await cache.get("new")
+
+    old, new = asyncio.run(scenario())
+    assert old is None and new == {"reviews": REVIEWS}
+
+def test_expired_entries_are_dropped_in_memory_and_on_disk(tmp_path):
+    cache = JobCache(max_bytes=3000, ttl=60, spill_dir=str(tmp_path))
+
+    async def scenario():
+        await cache.put("old", reviews=REVIEWS)
+        await cache.put("new", reviews=REVIEWS)
+        # Age everything past the TTL
+        for path in tmp_path.glob("*.msgpack.zst"):
+            os.utime(path, (time.time() - 120, time.time() - 120))
+        entry, size, _ = cache._entries["new"]
+        cache._entries["new"] = (entry, size, time.time() - 120)
+        return await cache.get("old"), await cache.get("new")
+
+    assert asyncio.run(scenario()) == (None, None)
+    assert cache.prune_spilled() == 0 and not list(tmp_path.glob("*.msgpack.zst"))
+
+def test_prune_removes_only_expired_spill_files(tmp_path):
+    cache = JobCache(max_bytes=3000, ttl=60, spill_dir=str(tmp_path))
+
+    async def scenario():
+        for job_id in ("a", "b", "c"):
+            await cache.put(job_id, reviews=REVIEWS)
+
+    asyncio.run(scenario())
+    stale, fresh = sorted(tmp_path.glob("*.msgpack.zst"))
+    os.utime(stale, (time.time() - 120, time.time() - 120))
+    assert cache.prune_spilled() == 1
+    assert list(tmp_path.glob("*.msgpack.zst")) == [fresh]
@@ -1 +1,4 @@
+import os
 
+# Names this service in shared code (trace spans, /load); set before pie_shared is imported
+os.environ.setdefault("SERVICE_NAME", "classifier")
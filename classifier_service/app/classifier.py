@@ -11,9 +11,12 @@ import os
 os.environ["HF_HOME"] = os.path.join(os.getcwd(), "hf_cache")
 import re
 import json
+import threading
 from groq import Groq
 from transformers import pipeline
 from .models import RawReview, ClassifiedReview
+from pie_shared.cancellation import JobCancelled
+from pie_shared.tracing import span
 from transformers import pipeline, AutoTokenizer, AutoModelForSeq2SeqLM
 from dotenv import load_dotenv
 load_dotenv()
@@ -21,6 +24,8 @@ load_dotenv()
 # We use DistilBART because it is 40% smaller and 50% faster than standard BART
 SUMMARIZATION_MODEL = "sshleifer/distilbart-cnn-12-6"
 GROQ_MODEL = "llama-3.1-8b-instant"  # Fast, cheap, smart enough for classification
+SENTIMENT_BATCH_SIZE = int(os.getenv("SENTIMENT_BATCH_SIZE", "8"))
+SUMMARIZE_BATCH_SIZE = int(os.getenv("SUMMARIZE_BATCH_SIZE", "8"))
 
 # ── MODEL LOADING ──────────────────────────────────────────────────────────
 print("[Classifier] Loading sentiment model...")
@@ -65,34 +70,40 @@ def _quality_score(text: str, upvotes: int, source: str) -> float:
     if upvotes > 10: score += 0.2
     return min(score + 0.5, 1.0) # Simplified for this example
 
-def _summarize_local(texts: list[str]) -> list[str]:
+def _summarize_local(texts: list[str], before_batch=None) -> list[str]:
     """
     Compresses long texts into short summaries locally.
+    Long texts go through DistilBART SUMMARIZE_BATCH_SIZE at a time;
+    `before_batch` is called before each model batch (cancellation checks).
     """
-    summaries = []
-    for text in texts:
-        if len(text.split()) < 60:
-            summaries.append(text)
-            continue
-            
+    summaries = list(texts)  # short texts are kept as-is
+    long_idx = [i for i, text in enumerate(texts) if len(text.split()) >= 60]
+    for start in range(0, len(long_idx), SUMMARIZE_BATCH_SIZE):
+        if before_batch:
+            before_batch()
+        batch_idx = long_idx[start:start + SUMMARIZE_BATCH_SIZE]
+        batch = [texts[i] for i in batch_idx]
         try:
-            # Explicit generation call instead of pipeline
-            inputs = _tokenizer(text, return_tensors="pt", max_length=1024, truncation=True)
-            
-            # Generate summary IDs
-            summary_ids = _summ_model.generate(
-                inputs["input_ids"], 
-                max_length=60, 
-                min_length=10, 
-                do_sample=False
-            )
+            with span("summarize.batch", texts=len(batch)):
+                # Explicit generation call instead of pipeline
+                inputs = _tokenizer(batch, return_tensors="pt", max_length=1024, truncation=True, padding=True)
+                
+                # Generate summary IDs
+                summary_ids = _summ_model.generate(
+                    inputs["input_ids"],
+                    attention_mask=inputs["attention_mask"],
+                    max_length=60, 
+                    min_length=10, 
+                    do_sample=False
+                )
             
             # Decode back to text
-            summary = _tokenizer.decode(summary_ids[0], skip_special_tokens=True)
-            summaries.append(summary)
+            for i, ids in zip(batch_idx, summary_ids):
+                summaries[i] = _tokenizer.decode(ids, skip_special_tokens=True)
         except Exception as e:
             print(f"[Classifier] Summarization failed: {e}")
-            summaries.append(text[:200]) 
+            for i, text in zip(batch_idx, batch):
+                summaries[i] = text[:200]
             
     return summaries
 
@@ -137,61 +148,100 @@ def _verify_with_groq(summaries: list[str], product_name: str) -> list[bool]:
 
 # ... [_quality_score and _summarize_local remain the same] ...
 
-def classify_reviews(reviews: list[RawReview], product_name: str, min_quality: float = 0.15) -> tuple[list[ClassifiedReview], int]:
-    clean = []
-    rejected = 0
+def classify_reviews(
+    reviews: list[RawReview],
+    product_name: str,
+    min_quality: float = 0.15,
+    stop: threading.Event | None = None,
+) -> tuple[list[ClassifiedReview], int]:
+    """`stop` is polled between model batches; raises JobCancelled once it is set."""
+    result = classify_review_groups([(reviews, product_name)], min_quality, [stop])[0]
+    if result is None:
+        raise JobCancelled("classification stopped")
+    return result
+
+def classify_review_groups(
+    groups: list[tuple[list[RawReview], str]],
+    min_quality: float = 0.15,
+    stops: list[threading.Event | None] | None = None,
+) -> list[tuple[list[ClassifiedReview], int] | None]:
+    """
+    classify_reviews for several products at once: summarization and
+    sentiment run as shared model batches, relevance checks stay per product.
+    A group whose stop event is set comes back as None; JobCancelled is
+    raised once every group is stopped.
+    """
+    stops = stops or [None] * len(groups)
+
+    def stopped(g: int) -> bool:
+        return stops[g] is not None and stops[g].is_set()
+
+    def raise_if_all_stopped():
+        # Checked between model calls so cancelled jobs free the CPU quickly
+        if all(stopped(g) for g in range(len(groups))):
+            raise JobCancelled("classification stopped")
+
+    clean = [[] for _ in groups]
+    rejected = [0] * len(groups)
     
     # 1. PHASE 1: PRE-FILTER
-    candidates = []
-    for r in reviews:
-        if SPAM_RE.search(r.text):
-            rejected += 1
-            continue
-        if len(r.text) < 10:
-            rejected += 1
-            continue
-        candidates.append(r)
+    candidates = []  # (group, review)
+    for g, (reviews, _) in enumerate(groups):
+        for r in reviews:
+            if SPAM_RE.search(r.text):
+                rejected[g] += 1
+                continue
+            if len(r.text) < 10:
+                rejected[g] += 1
+                continue
+            candidates.append((g, r))
         
-    if not candidates:
-        return [], rejected
-
-    print(f"[Classifier] Phase 1 passed: {len(candidates)} candidates.")
+    if candidates:
+        print(f"[Classifier] Phase 1 passed: {len(candidates)} candidates across {len(groups)} product(s).")
 
     # 2. PHASE 2: COMPRESSION
-    candidate_texts = [r.text for r in candidates]
-    summaries = _summarize_local(candidate_texts)
-    
-    # 3. PHASE 3: VERIFICATION (Dynamic)
-    print(f"[Classifier] Verifying relevance for '{product_name}'...")
-    # PASS PRODUCT NAME HERE
-    decisions = _verify_with_groq(summaries, product_name)
+    candidate_texts = [r.text for _, r in candidates]
+    summaries = _summarize_local(candidate_texts, raise_if_all_stopped)
+    raise_if_all_stopped()
     
-    verified_reviews = []
-    for i, decision in enumerate(decisions):
-        if decision:
-            verified_reviews.append(candidates[i])
-        else:
-            rejected += 1
-            print(f"[Classifier] Groq rejected: {summaries[i][:50]}...")
-
-    if not verified_reviews:
-        return [], rejected
+    # 3. PHASE 3: VERIFICATION (Dynamic) — the prompt is product-specific
+    verified_reviews = []  # (group, review)
+    for g, (_, product_name) in enumerate(groups):
+        idx = [i for i, (cg, _) in enumerate(candidates) if cg == g]
+        if not idx or stopped(g):
+            continue
+        print(f"[Classifier] Verifying relevance for '{product_name}'...")
+        # PASS PRODUCT NAME HERE
+        with span("groq.verify", product=product_name, summaries=len(idx)):
+            decisions = _verify_with_groq([summaries[i] for i in idx], product_name)
+        for i, decision in zip(idx, decisions):
+            if decision:
+                verified_reviews.append(candidates[i])
+            else:
+                rejected[g] += 1
+                print(f"[Classifier] Groq rejected: {summaries[i][:50]}...")
 
     # 4. PHASE 4: SENTIMENT
-    final_texts = [r.text[:512] for r in verified_reviews]
-    try:
-        sentiment_results = _sentiment_pipe(final_texts, batch_size=8)
-    except Exception:
-        sentiment_results = [[{"label": "neutral", "score": 0.5}]] * len(verified_reviews)
+    raise_if_all_stopped()
+    verified_reviews = [(g, r) for g, r in verified_reviews if not stopped(g)]
+    final_texts = [r.text[:512] for _, r in verified_reviews]
+    sentiment_results = []
+    for start in range(0, len(final_texts), SENTIMENT_BATCH_SIZE):
+        raise_if_all_stopped()
+        batch = final_texts[start:start + SENTIMENT_BATCH_SIZE]
+        try:
+            with span("sentiment.batch", texts=len(batch)):
+                sentiment_results.extend(_sentiment_pipe(batch, batch_size=SENTIMENT_BATCH_SIZE))
+        except Exception:
+            sentiment_results.extend([[{"label": "neutral", "score": 0.5}]] * len(batch))
 
     # 5. CONSTRUCT OUTPUT
-    for i, review in enumerate(verified_reviews):
-        res = sentiment_results[i]
+    for (g, review), res in zip(verified_reviews, sentiment_results):
         top = res[0] if isinstance(res, list) else res
         
         q_score = _quality_score(review.text, review.upvotes, review.source)
         
-        clean.append(ClassifiedReview(
+        clean[g].append(ClassifiedReview(
             **review.model_dump(),
             is_genuine=True,
             quality_score=round(q_score, 3),
@@ -199,4 +249,4 @@ def classify_reviews(reviews: list[RawReview], product_name: str, min_quality: f
             sentiment_score=round(top.get("score", 0.5), 3),
         ))
 
-    return clean, rejected
\ No newline at end of file
+    return [None if stopped(g) else (clean[g], rejected[g]) for g in range(len(groups))]
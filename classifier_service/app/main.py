@@ -1,10 +1,42 @@
-from fastapi import FastAPI
-from .models import ClassifyRequest, ClassifyResponse
-from .classifier import classify_reviews
+import os
+import json
+import asyncio
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse, JSONResponse
+from contextlib import ExitStack
+from .models import ClassifyRequest, ClassifyResponse, ClassifyBatchRequest
+from .classifier import classify_reviews, classify_review_groups
+from pie_shared.cancellation import cancellations, JobCancelled
+from pie_shared.tracing import TraceMiddleware, drain
+from pie_shared.load import LoadMiddleware, load
+from pie_shared.wire import CodecRoute, CodecResponse
 # FIXED: Only import aggregation, not scoring (classifier does scoring now)
 from .sentiment import aggregate_sentiment
 
-app = FastAPI(title="Classifier Service")
+app = FastAPI(title="Classifier Service", default_response_class=CodecResponse)
+# msgpack/zstd bodies on request; JSON stays the default
+app.router.route_class = CodecRoute
+app.add_middleware(TraceMiddleware)
+app.add_middleware(LoadMiddleware)
+
+@app.exception_handler(JobCancelled)
+async def job_cancelled_handler(request: Request, exc: JobCancelled):
+    return JSONResponse(status_code=409, content={"detail": "Job was cancelled"})
+
+# Reviews per frame on /classify/stream
+CLASSIFY_STREAM_BATCH = int(os.getenv("CLASSIFY_STREAM_BATCH", "16"))
+# Reviews accepted but not yet through the models at which the service reports itself saturated
+CLASSIFIER_MAX_BACKLOG_REVIEWS = int(os.getenv("CLASSIFIER_MAX_BACKLOG_REVIEWS", "1024"))
+load.limit("reviews", CLASSIFIER_MAX_BACKLOG_REVIEWS)
+
+def _sentiment_summary(clean) -> dict:
+    # Calculate Aggregate Stats (Math only, no AI)
+    if clean:
+        scores_list = [(r.sentiment, r.sentiment_score) for r in clean]
+        weights = [r.quality_score for r in clean]
+        return aggregate_sentiment(scores_list, weights)
+    # Fallback if everything was rejected
+    return aggregate_sentiment([], [])
 
 @app.post("/classify", response_model=ClassifyResponse)
 async def classify(req: ClassifyRequest):
@@ -12,15 +44,13 @@ async def classify(req: ClassifyRequest):
 
     # Step 1: Run the full Hybrid Pipeline (Filter -> Compress -> Verify -> Score)
     # clean is a list of ClassifiedReview objects (which ALREADY have sentiment data)
-    clean, rejected = classify_reviews(req.reviews, req.product_name)
+    # Runs in a thread so /cancel stays responsive; the token stops it between model batches
+    with cancellations.track(req.job_id) as token, load.track("reviews", len(req.reviews)):
+        clean, rejected = await token.run(asyncio.to_thread(
+            classify_reviews, req.reviews, req.product_name, stop=token.event
+        ))
     # Step 2: Calculate Aggregate Stats (Math only, no AI)
-    if clean:
-        scores_list = [(r.sentiment, r.sentiment_score) for r in clean]
-        weights = [r.quality_score for r in clean]
-        sentiment_summary = aggregate_sentiment(scores_list, weights)
-    else:
-        # Fallback if everything was rejected
-        sentiment_summary = aggregate_sentiment([], [])
+    sentiment_summary = _sentiment_summary(clean)
 
     print(
         f"[Main] Success: {len(clean)} accepted, {rejected} rejected | "
@@ -34,6 +64,99 @@ async def classify(req: ClassifyRequest):
         sentiment_summary=sentiment_summary,
     )
 
+@app.post("/classify/batch")
+async def classify_batch(req: ClassifyBatchRequest):
+    """
+    /classify for several jobs in one call. Summarization and sentiment run
+    as shared model batches across every item. Results come back in request
+    order; an item cancelled via /cancel comes back as {"job_id", "cancelled": true}.
+    """
+    print(f"[Main] Batch of {len(req.items)} jobs, {sum(len(i.reviews) for i in req.items)} reviews")
+
+    with ExitStack() as stack:
+        tokens = [stack.enter_context(cancellations.track(item.job_id)) for item in req.items]
+        stack.enter_context(load.track("reviews", sum(len(i.reviews) for i in req.items)))
+        groups = [(item.reviews, item.product_name) for item in req.items]
+        try:
+            results = await asyncio.to_thread(
+                classify_review_groups, groups, stops=[t.event for t in tokens]
+            )
+        except JobCancelled:
+            results = [None] * len(req.items)
+
+    response = []
+    for item, result in zip(req.items, results):
+        if result is None:
+            response.append({"job_id": item.job_id, "cancelled": True})
+            continue
+        clean, rejected = result
+        response.append(ClassifyResponse(
+            job_id=item.job_id,
+            reviews=clean,
+            rejected_count=rejected,
+            sentiment_summary=_sentiment_summary(clean),
+        ).model_dump())
+    return {"results": response}
+
+@app.post("/classify/stream")
+async def classify_stream(req: ClassifyRequest):
+    """
+    NDJSON variant of /classify. Classifies in chunks of CLASSIFY_STREAM_BATCH
+    and emits a `reviews` frame per chunk, then a final `summary` frame.
+    """
+    print(f"[Main] Streaming {len(req.reviews)} reviews for job {req.job_id}")
+
+    async def frames():
+        clean_all = []
+        rejected_all = 0
+        with cancellations.track(req.job_id) as token:
+            for start in range(0, len(req.reviews), CLASSIFY_STREAM_BATCH):
+                chunk = req.reviews[start:start + CLASSIFY_STREAM_BATCH]
+                try:
+                    # Model inference is blocking — keep the event loop serving other requests
+                    with load.track("reviews", len(req.reviews) - start):
+                        clean, rejected = await token.run(asyncio.to_thread(
+                            classify_reviews, chunk, req.product_name, stop=token.event
+                        ))
+                except JobCancelled:
+                    print(f"[Main] Job {req.job_id} cancelled, stopping classification")
+                    yield json.dumps({"type": "cancelled", "job_id": req.job_id}) + "\n"
+                    return
+                clean_all.extend(clean)
+                rejected_all += rejected
+                yield json.dumps({
+                    "type": "reviews",
+                    "reviews": [r.model_dump() for r in clean],
+                    "rejected_count": rejected,
+                }) + "\n"
+
+        yield json.dumps({
+            "type": "summary",
+            "job_id": req.job_id,
+            "rejected_count": rejected_all,
+            "sentiment_summary": _sentiment_summary(clean_all),
+        }) + "\n"
+
+    return StreamingResponse(frames(), media_type="application/x-ndjson")
+
+@app.post("/cancel/{job_id}")
+async def cancel(job_id: str):
+    """Stop classifying for `job_id` after the current model batch."""
+    stopped = cancellations.cancel(job_id)
+    if stopped:
+        print(f"[Main] Cancelled {stopped} request(s) for job {job_id}")
+    return {"job_id": job_id, "cancelled": stopped}
+
+@app.get("/traces/{trace_id}")
+def get_trace(trace_id: str):
+    """Spans recorded for `trace_id`. Drained on read — the gateway stores them per job."""
+    return {"spans": drain(trace_id)}
+
+@app.get("/load")
+def get_load():
+    """Live load for the gateway's admission control."""
+    return load.snapshot()
+
 @app.get("/health")
 def health():
     return {"status": "ok"}
\ No newline at end of file
@@ -25,6 +25,11 @@ class ClassifyRequest(BaseModel):
     job_id: str
 
 
+class ClassifyBatchRequest(BaseModel):
+    # One entry per job; model work is shared across all of them
+    items: list[ClassifyRequest]
+
+
 class SentimentSummary(BaseModel):
     overall_label: str            # "positive" | "neutral" | "negative"
     weighted_score: float         # 0.0 – 10.0
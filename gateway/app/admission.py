@@ -0,0 +1,144 @@
+"""
+admission.py — admission control and backpressure from downstream load.
+Every LOAD_POLL_SECONDS the gateway reads GET /load from each service.
+New jobs get an ETA from the queue ahead of them, the worker slots and the
+recent pipeline duration, stretched while a service is saturated. Jobs that
+would wait longer than ADMISSION_MAX_WAIT_SECONDS (bulk: ..._BULK_SECONDS)
+are rejected with 503 + Retry-After instead of piling up and timing out.
+Workers also stop claiming while a service is saturated, so queued jobs wait
+in the queue rather than degrade the jobs already running.
+"""
+import os
+import math
+import time
+import asyncio
+from datetime import datetime
+from fastapi import HTTPException
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from .db import Job, JobSpan, JobStatus
+from .clients import replica_clients, SERVICE_REPLICAS
+from .queue_manager import PRIORITY_INTERACTIVE
+from dotenv import load_dotenv
+load_dotenv()
+
+ADMISSION_CONTROL = os.getenv("ADMISSION_CONTROL", "1") == "1"
+LOAD_POLL_SECONDS  = float(os.getenv("LOAD_POLL_SECONDS", "2"))
+# A snapshot older than this is ignored (service down or slow to answer)
+LOAD_STALE_SECONDS = float(os.getenv("LOAD_STALE_SECONDS", "10"))
+ADMISSION_MAX_WAIT_SECONDS      = float(os.getenv("ADMISSION_MAX_WAIT_SECONDS", "600"))
+ADMISSION_MAX_WAIT_BULK_SECONDS = float(os.getenv("ADMISSION_MAX_WAIT_BULK_SECONDS", "3600"))
+# Pipeline slots across all workers, and the job duration assumed before any run was traced
+ADMISSION_WORKER_SLOTS  = int(os.getenv("ADMISSION_WORKER_SLOTS", os.getenv("WORKER_CONCURRENCY", "4")))
+ADMISSION_DEFAULT_JOB_SECONDS = float(os.getenv("ADMISSION_DEFAULT_JOB_SECONDS", "120"))
+# Workers hold off claiming at or above this downstream saturation (1.0 = at capacity)
+WORKER_PAUSE_SATURATION = float(os.getenv("WORKER_PAUSE_SATURATION", "1.0"))
+
+RECENT_RUNS = 50
+JOB_SECONDS_TTL = 60.0
+
+class AdmissionController:
+    def __init__(self):
+        self._snapshots: dict[tuple[str, str], tuple[float, dict]] = {}
+        self._job_seconds = (0.0, ADMISSION_DEFAULT_JOB_SECONDS)
+        self._poller: asyncio.Task | None = None
+
+    def start(self):
+        """Begin polling /load. Safe to call from both the API and the worker."""
+        if self._poller is None or self._poller.done():
+            self._poller = asyncio.create_task(self._poll_forever())
+
+    def stop(self):
+        if self._poller:
+            self._poller.cancel()
+
+    async def _poll_forever(self):
+        while True:
+            await self.refresh()
+            await asyncio.sleep(LOAD_POLL_SECONDS)
+
+    async def refresh(self):
+        targets = [(s, c) for s in SERVICE_REPLICAS for c in replica_clients(s)]
+        results = await asyncio.gather(
+            *(client.get("/load", timeout=2.0) for _, client in targets),
+            return_exceptions=True,
+        )
+        now = time.monotonic()
+        for (service, client), resp in zip(targets, results):
+            if isinstance(resp, Exception) or resp.status_code != 200:
+                continue  # goes stale, then stops counting
+            self._snapshots[(service, str(client.base_url))] = (now, resp.json())
+
+    def services(self) -> dict[str, dict]:
+        """Per service, its least loaded replica — calls are spread across replicas."""
+        cutoff = time.monotonic() - LOAD_STALE_SECONDS
+        best: dict[str, dict] = {}
+        for (service, _), (at, snap) in self._snapshots.items():
+            if at >= cutoff and snap.get("saturation", 0.0) < best.get(service, {}).get("saturation", float("inf")):
+                best[service] = snap
+        return best
+
+    def saturation(self) -> float:
+        """The busiest service's saturation; 0 when nothing is known."""
+        return max((snap.get("saturation", 0.0) for snap in self.services().values()), default=0.0)
+
+    def saturated(self) -> bool:
+        return ADMISSION_CONTROL and self.saturation() >= WORKER_PAUSE_SATURATION
+
+    async def job_seconds(self, db: AsyncSession) -> float:
+        """Mean duration of recent traced pipeline runs."""
+        fetched_at, seconds = self._job_seconds
+        if time.monotonic() - fetched_at < JOB_SECONDS_TTL:
+            return seconds
+        recent = (
+            select(JobSpan.duration_ms)
+            .where(JobSpan.service == "gateway", JobSpan.name == "pipeline")
+            .order_by(JobSpan.id.desc())
+            .limit(RECENT_RUNS)
+            .subquery()
+        )
+        mean_ms = await db.scalar(select(func.avg(recent.c.duration_ms)))
+        if mean_ms:
+            seconds = mean_ms / 1000
+        self._job_seconds = (time.monotonic(), seconds)
+        return seconds
+
+    async def estimate(self, db: AsyncSession, priority: int, count: int = 1) -> float:
+        """Seconds until the last of `count` new jobs at `priority` would start."""
+        ahead = select(func.count()).where(
+            Job.status == JobStatus.QUEUED,
+            Job.source_job_id.is_(None),
+            Job.lease_owner.is_(None),
+        )
+        if priority >= PRIORITY_INTERACTIVE:
+            # Interactive jobs are claimed first, so only interactive ones are ahead of them
+            ahead = ahead.where(Job.priority >= PRIORITY_INTERACTIVE)
+        queued = await db.scalar(ahead)
+        # A lease that ran out belongs to a dead worker; its job will be reclaimed, not finished
+        running = await db.scalar(select(func.count()).where(
+            Job.lease_owner.is_not(None),
+            Job.lease_expires_at > datetime.utcnow(),
+        ))
+        slots = max(ADMISSION_WORKER_SLOTS, 1)
+        waves = math.ceil(max(0, running + queued + count - slots) / slots)
+        saturation = self.saturation()
+        if saturation >= WORKER_PAUSE_SATURATION:
+            waves = max(waves, 1)  # nothing starts until the load drops
+        return waves * await self.job_seconds(db) * max(1.0, saturation)
+
+    async def admit(self, db: AsyncSession, priority: int, count: int = 1) -> int | None:
+        """ETA in seconds for new jobs, or 503 with Retry-After when the wait is too long."""
+        if not ADMISSION_CONTROL:
+            return None
+        eta = await self.estimate(db, priority, count)
+        max_wait = ADMISSION_MAX_WAIT_SECONDS if priority >= PRIORITY_INTERACTIVE else ADMISSION_MAX_WAIT_BULK_SECONDS
+        if eta > max_wait:
+            retry_after = max(1, math.ceil(eta - max_wait))
+            raise HTTPException(
+                status_code=503,
+                detail=f"Over capacity: estimated wait {eta:.0f}s exceeds {max_wait:.0f}s. Retry later.",
+                headers={"Retry-After": str(retry_after)},
+            )
+        return math.ceil(eta)
+
+admission = AdmissionController()
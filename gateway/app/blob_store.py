@@ -0,0 +1,42 @@
+"""
+blob_store.py — content-addressed store for large job payloads.
+Values are canonical JSON, zstd-compressed and keyed by their sha256, so a
+result shared by cached and coalesced jobs is stored once. Job rows keep
+only the reference ("sha256:<hex>") and stay small for /status reads.
+"""
+import os
+import json
+import hashlib
+import zstandard
+from datetime import datetime
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+from .db import engine, Blob
+
+BLOB_ZSTD_LEVEL = int(os.getenv("BLOB_ZSTD_LEVEL", "9"))  # written once, read many
+
+REF_PREFIX = "sha256:"
+
+_compressor = zstandard.ZstdCompressor(level=BLOB_ZSTD_LEVEL)
+_decompressor = zstandard.ZstdDecompressor()
+
+async def put_json(data) -> str:
+    """Store `data` and return its reference. Storing the same value twice is free."""
+    raw = json.dumps(data, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    digest = hashlib.sha256(raw).hexdigest()
+    stmt = insert(Blob).values(
+        digest=digest, size=len(raw), payload=_compressor.compress(raw), created_at=datetime.utcnow()
+    ).on_conflict_do_nothing(index_elements=[Blob.digest])
+    async with engine.begin() as conn:
+        await conn.execute(stmt)
+    return REF_PREFIX + digest
+
+async def get_json(ref: str):
+    """Value stored under `ref`, or None if it is unknown."""
+    if not ref.startswith(REF_PREFIX):
+        raise ValueError(f"Not a blob reference: {ref!r}")
+    async with engine.connect() as conn:
+        payload = await conn.scalar(select(Blob.payload).where(Blob.digest == ref[len(REF_PREFIX):]))
+    if payload is None:
+        return None
+    return json.loads(_decompressor.decompress(payload))
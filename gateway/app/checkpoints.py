@@ -0,0 +1,47 @@
+"""
+checkpoints.py — per-stage results persisted so a failed or interrupted job
+resumes from its last completed stage instead of re-scraping everything.
+Payloads are zlib-compressed JSON keyed by (job_id, stage).
+"""
+import json
+import zlib
+from datetime import datetime
+from sqlalchemy import select, delete
+from sqlalchemy.dialects.sqlite import insert
+from .db import engine, JobCheckpoint
+
+# Stage names, in pipeline order
+SCRAPE   = "scrape_result"
+CLASSIFY = "classify_result"
+ANALYSIS = "analysis_result"
+STAGES = [SCRAPE, CLASSIFY, ANALYSIS]
+
+async def save_checkpoint(job_id: str, stage: str, data: dict):
+    payload = zlib.compress(json.dumps(data).encode("utf-8"), 6)
+    stmt = insert(JobCheckpoint).values(
+        job_id=job_id, stage=stage, payload=payload, created_at=datetime.utcnow()
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[JobCheckpoint.job_id, JobCheckpoint.stage],
+        set_={"payload": stmt.excluded.payload, "created_at": stmt.excluded.created_at},
+    )
+    async with engine.begin() as conn:
+        await conn.execute(stmt)
+
+async def load_checkpoints(job_id: str) -> dict[str, dict]:
+    """{stage: data} for every stage this job has completed."""
+    async with engine.connect() as conn:
+        rows = await conn.execute(
+            select(JobCheckpoint.stage, JobCheckpoint.payload).where(JobCheckpoint.job_id == job_id)
+        )
+        return {stage: json.loads(zlib.decompress(payload)) for stage, payload in rows}
+
+async def completed_stages(job_id: str) -> list[str]:
+    async with engine.connect() as conn:
+        rows = await conn.execute(select(JobCheckpoint.stage).where(JobCheckpoint.job_id == job_id))
+        done = set(rows.scalars())
+    return [s for s in STAGES if s in done]
+
+async def clear_checkpoints(job_id: str):
+    async with engine.begin() as conn:
+        await conn.execute(delete(JobCheckpoint).where(JobCheckpoint.job_id == job_id))
@@ -0,0 +1,85 @@
+"""
+classify_batcher.py — merges concurrent classifier calls into /classify/batch.
+Pipelines running side by side (e.g. the products of one /analyze/batch)
+hand their reviews to a shared batcher. Calls arriving within
+CLASSIFY_BATCH_WINDOW_MS go out as one request, so the classifier runs
+DistilBART and the sentiment model on larger batches and the per-request
+overhead is paid once. Set the window to 0 to call the classifier per job.
+Only one-shot classification is batched; streamed pipelines keep their own
+/classify/stream call so each scraper frame is classified as it arrives.
+"""
+import os
+import asyncio
+from pie_shared import wire
+from . import resilience
+from pie_shared.tracing import TRACE_HEADER, PARENT_HEADER, current_trace_ids, current_span_id
+from dotenv import load_dotenv
+load_dotenv()
+
+CLASSIFY_BATCH_WINDOW_MS   = float(os.getenv("CLASSIFY_BATCH_WINDOW_MS", "50"))
+CLASSIFY_BATCH_MAX_REVIEWS = int(os.getenv("CLASSIFY_BATCH_MAX_REVIEWS", "256"))
+CLASSIFY_BATCHING = CLASSIFY_BATCH_WINDOW_MS > 0
+
+class ClassifyBatcher:
+    def __init__(self, window_ms: float = CLASSIFY_BATCH_WINDOW_MS, max_reviews: int = CLASSIFY_BATCH_MAX_REVIEWS):
+        self.window = window_ms / 1000
+        self.max_reviews = max_reviews
+        self._pending: list[tuple[dict, tuple, asyncio.Future]] = []
+        self._pending_reviews = 0
+        self._timer: asyncio.TimerHandle | None = None
+        self._in_flight: set[asyncio.Task] = set()
+
+    async def classify(self, job_id: str, product_name: str, reviews: list[dict]) -> dict:
+        """Same result shape as POST /classify."""
+        future = asyncio.get_running_loop().create_future()
+        item = {"job_id": job_id, "product_name": product_name, "reviews": reviews}
+        self._pending.append((item, (current_trace_ids(), current_span_id()), future))
+        self._pending_reviews += len(reviews)
+        if self._pending_reviews >= self.max_reviews:
+            self._dispatch()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.window, self._dispatch)
+        return await future
+
+    def _dispatch(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending, self._pending_reviews = self._pending, [], 0
+        if batch:
+            task = asyncio.create_task(self._send(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _send(self, batch: list[tuple[dict, tuple, asyncio.Future]]):
+        # Classifier spans for a shared call belong to every job's trace
+        trace_ids = list(dict.fromkeys(t for _, (ids, _), _ in batch for t in ids))
+        headers = {TRACE_HEADER: ",".join(trace_ids)} if trace_ids else {}
+        if len(batch) == 1 and batch[0][1][1]:
+            headers[PARENT_HEADER] = batch[0][1][1]
+        try:
+            resp = await resilience.post(
+                "classifier", "/classify/batch",
+                json={"items": [item for item, _, _ in batch]},
+                headers=headers,
+                timeout=300.0,
+                idempotent=True,
+            )
+            resp.raise_for_status()
+            results = wire.read(resp)["results"]
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        print(f"[ClassifyBatcher] Classified {len(batch)} job(s) in one call")
+        for (_, _, future), result in zip(batch, results):
+            if future.done():
+                continue  # caller was cancelled meanwhile
+            if result.get("cancelled"):
+                future.set_exception(RuntimeError("Classifier stopped: job cancelled"))
+            else:
+                future.set_result(result)
+
+classify_batcher = ClassifyBatcher()
@@ -0,0 +1,80 @@
+"""
+clients.py — one long-lived httpx.AsyncClient per downstream service replica.
+Connections are kept alive and reused across stages and jobs instead of
+paying a TCP/TLS handshake on every call. A service URL may list several
+comma-separated replicas; resilience.py spreads calls across them.
+"""
+import os
+import asyncio
+import httpx
+from pie_shared.tracing import TRACE_HEADER, PARENT_HEADER, current_trace_ids, current_span_id
+from dotenv import load_dotenv
+load_dotenv()
+
+SCRAPER_URL    = os.getenv("SCRAPER_URL",    "http://127.0.0.1:8001") #"http://scraper_service:8001"
+CLASSIFIER_URL = os.getenv("CLASSIFIER_URL", "http://127.0.0.1:8002") #"http://classifier_service:8002"
+ANALYSIS_URL   = os.getenv("ANALYSIS_URL",   "http://127.0.0.1:8003") #"http://analysis_service:8003"
+
+SERVICE_URLS = {
+    "scraper":    SCRAPER_URL,
+    "classifier": CLASSIFIER_URL,
+    "analysis":   ANALYSIS_URL,
+}
+SERVICE_REPLICAS = {
+    service: [u.strip().rstrip("/") for u in urls.split(",") if u.strip()]
+    for service, urls in SERVICE_URLS.items()
+}
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE   = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+# A replica that doesn't accept the connection quickly is down; fail over instead of waiting
+HTTP_CONNECT_TIMEOUT  = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3"))
+
+_clients: dict[str, httpx.AsyncClient] = {}
+
+def get_client(service: str, replica: int = 0) -> httpx.AsyncClient:
+    """Shared client for one replica of `service`. Callers pass a per-request timeout."""
+    base_url = SERVICE_REPLICAS[service][replica]
+    client = _clients.get(base_url)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            base_url=base_url,
+            http2=True,  # negotiated via ALPN on https:// URLs
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(120.0, connect=HTTP_CONNECT_TIMEOUT),
+            event_hooks={"request": [_propagate_trace]},
+        )
+        _clients[base_url] = client
+    return client
+
+def replica_clients(service: str) -> list[httpx.AsyncClient]:
+    return [get_client(service, i) for i in range(len(SERVICE_REPLICAS[service]))]
+
+async def _propagate_trace(request: httpx.Request):
+    # Callers serving several jobs (classify_batcher) set the header themselves
+    trace_ids = current_trace_ids()
+    if trace_ids and TRACE_HEADER not in request.headers:
+        request.headers[TRACE_HEADER] = ",".join(trace_ids)
+        if current_span_id():
+            request.headers[PARENT_HEADER] = current_span_id()
+
+async def cancel_downstream(job_id: str):
+    """Ask every replica to abort in-flight work for `job_id` (best effort)."""
+    targets = [(service, client) for service in SERVICE_REPLICAS for client in replica_clients(service)]
+    results = await asyncio.gather(
+        *(client.post(f"/cancel/{job_id}", timeout=5.0) for _, client in targets),
+        return_exceptions=True,
+    )
+    for (service, client), result in zip(targets, results):
+        if isinstance(result, Exception):
+            print(f"[Clients] Cancel for {job_id} not delivered to {service} ({client.base_url}): {result}")
+
+async def close_clients():
+    for client in _clients.values():
+        await client.aclose()
+    _clients.clear()
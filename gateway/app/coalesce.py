@@ -0,0 +1,70 @@
+"""
+coalesce.py — single-flight for /analyze.
+A request for a product that is already being researched attaches to the
+running job instead of starting another scrape → classify → analyze run.
+Two submissions racing past find_inflight_leader are settled by the
+ux_jobs_inflight_leader unique index: the loser attaches to the winner.
+A cancelled leader keeps running while followers wait on it, so it stays
+the product's in-flight run until they finish or are cancelled too.
+"""
+from sqlalchemy import select, or_, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from .db import Job, JobStatus
+from .queue_manager import TERMINAL_STATUSES, has_live_followers
+
+def _normalize_name(product_name: str) -> str:
+    return " ".join(product_name.casefold().split())
+
+def product_key(product_name: str, mau: int | None, arpu: float | None) -> str:
+    """'  Notion ', 'notion' and 'NOTION' are the same research job."""
+    name = _normalize_name(product_name)
+    mau_part = "" if mau is None else str(mau)
+    arpu_part = "" if arpu is None else f"{arpu:g}"
+    return f"{name}|{mau_part}|{arpu_part}"
+
+def product_key_range(product_name: str) -> tuple[str, str]:
+    """[lo, hi) over dedup_key covering every mau/arpu variant of a product (index-friendly)."""
+    name = _normalize_name(product_name)
+    return f"{name}|", f"{name}}}"  # '}' sorts right after '|'
+
+async def find_inflight_leader(db: AsyncSession, key: str) -> Job | None:
+    """Oldest job whose pipeline run for `key` is still going."""
+    result = await db.execute(
+        select(Job)
+        .where(
+            Job.dedup_key == key,
+            Job.source_job_id.is_(None),
+            or_(
+                Job.status.not_in(TERMINAL_STATUSES),
+                and_(Job.status == JobStatus.CANCELLED, has_live_followers()),
+            ),
+        )
+        .order_by(Job.created_at)
+        .limit(1)
+    )
+    return result.scalar_one_or_none()
+
+async def live_follower(db: AsyncSession, leader_id: str) -> Job | None:
+    """Latest-updated unfinished follower — the row that still tracks a cancelled leader's run."""
+    return await db.scalar(
+        select(Job)
+        .where(Job.source_job_id == leader_id, Job.status.not_in(TERMINAL_STATUSES))
+        .order_by(Job.updated_at.desc())
+        .limit(1)
+    )
+
+async def sync_with_leader(db: AsyncSession, follower: Job, leader: Job):
+    """
+    Close the attach race: if the leader finished between our lookup and our
+    insert, its final status write missed this row — copy it over now.
+    """
+    await db.refresh(leader)
+    # A cancelled leader row doesn't stop the run while followers are attached
+    if leader.status in (JobStatus.DONE, JobStatus.FAILED):
+        follower.status = leader.status
+        follower.stage = leader.stage
+        follower.progress_pct = leader.progress_pct
+        follower.error = leader.error
+        follower.report_path = leader.report_path
+        follower.result_ref = leader.result_ref
+        await db.commit()
@@ -1,20 +1,16 @@
-import os
+import logging
 from enum import Enum
 from fastapi.concurrency import asynccontextmanager
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
-from sqlalchemy import String, Integer, Text, DateTime, JSON, Float
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy import String, Integer, Text, DateTime, JSON, Float, Boolean, LargeBinary, Index, inspect, text
 from datetime import datetime
 
-from pathlib import Path
+# One tuned, pooled engine for the API and the workers (see storage.py)
+from .storage import engine, AsyncSessionLocal, DATABASE_PATH
 
-BASE_DIR = Path(__file__).resolve().parent.parent
-DATABASE_PATH = BASE_DIR / "data" / "research.db"
-DATABASE_PATH.parent.mkdir(parents=True, exist_ok=True)
-DATABASE_URL = f"sqlite+aiosqlite:///{DATABASE_PATH}"
-
-engine = create_async_engine(DATABASE_URL, echo=False)
-AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+log = logging.getLogger(__name__)
 
 class Base(DeclarativeBase):
     pass
@@ -30,6 +26,20 @@ class JobStatus(str, Enum):
 
 class Job(Base):
     __tablename__ = "jobs"
+    __table_args__ = (
+        # GET /jobs: newest first, optionally by status or product (keyset on created_at, job_id)
+        Index("ix_jobs_created", "created_at", "job_id"),
+        Index("ix_jobs_status_created", "status", "created_at"),
+        Index("ix_jobs_dedup_created", "dedup_key", "created_at"),
+        # Queue claims, coalesced-follower lookups and retention sweeps
+        Index("ix_jobs_claim", "source_job_id", "priority", "created_at"),
+        Index("ix_jobs_status_updated", "status", "updated_at"),
+        # At most one unfinished leader per product, so two concurrent submissions can't both start a run
+        Index(
+            "ux_jobs_inflight_leader", "dedup_key", unique=True,
+            sqlite_where=text("source_job_id IS NULL AND status NOT IN ('done', 'failed', 'cancelled')"),
+        ),
+    )
 
     job_id: Mapped[str] = mapped_column(String, primary_key=True)
     product_name: Mapped[str] = mapped_column(String)
@@ -38,7 +48,9 @@ class Job(Base):
     progress_pct: Mapped[int] = mapped_column(Integer, default=0)
     error: Mapped[str | None] = mapped_column(Text, nullable=True)
     report_path: Mapped[str | None] = mapped_column(String, nullable=True)
-    result_json: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    # Legacy inline result, kept readable for old rows. New results go to the blob store.
+    result_json: Mapped[dict | None] = mapped_column(JSON, nullable=True, deferred=True)
+    result_ref: Mapped[str | None] = mapped_column(String, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -46,9 +58,89 @@ class Job(Base):
     # FIX: Changed mapped_column(Integer) to mapped_column(Float) for ARPU
     arpu: Mapped[float | None] = mapped_column(Float, nullable=True)
 
+    # Queue bookkeeping — a worker owns the job until lease_expires_at
+    lease_owner: Mapped[str | None] = mapped_column(String, nullable=True)
+    lease_expires_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    attempts: Mapped[int] = mapped_column(Integer, default=0, server_default=text("0"))
+
+    # Single-flight: jobs with the same dedup_key share one execution.
+    # source_job_id points at the job whose run produces this job's results.
+    dedup_key: Mapped[str | None] = mapped_column(String, nullable=True)
+    source_job_id: Mapped[str | None] = mapped_column(String, nullable=True)
+    # Cache hits point at their source too, but are finished rows its later writes must not touch
+    from_cache: Mapped[bool] = mapped_column(Boolean, default=False, server_default=text("0"))
+
+    # Scheduling — higher priority runs first, then fair share across tenants
+    tenant: Mapped[str] = mapped_column(String, default="anonymous", server_default=text("'anonymous'"))
+    priority: Mapped[int] = mapped_column(Integer, default=0, server_default=text("0"))
+
+    # Set on jobs submitted together through POST /analyze/batch
+    batch_id: Mapped[str | None] = mapped_column(String, nullable=True, index=True)
+
+class JobCheckpoint(Base):
+    """Compressed output of a finished pipeline stage, used to resume a job."""
+    __tablename__ = "job_checkpoints"
+
+    job_id: Mapped[str] = mapped_column(String, primary_key=True)
+    stage: Mapped[str] = mapped_column(String, primary_key=True)
+    payload: Mapped[bytes] = mapped_column(LargeBinary)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+class Blob(Base):
+    """Content-addressed, zstd-compressed payloads (see blob_store.py)."""
+    __tablename__ = "blobs"
+
+    digest: Mapped[str] = mapped_column(String, primary_key=True)  # sha256 of the uncompressed bytes
+    size: Mapped[int] = mapped_column(Integer)                     # uncompressed size
+    payload: Mapped[bytes] = mapped_column(LargeBinary)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+class JobSpan(Base):
+    """One timed step of a pipeline run, from any service (see trace_store.py)."""
+    __tablename__ = "job_spans"
+    __table_args__ = (Index("ix_job_spans_job", "job_id", "trace_id"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    job_id: Mapped[str] = mapped_column(String)
+    trace_id: Mapped[str] = mapped_column(String)
+    span_id: Mapped[str] = mapped_column(String)
+    parent_id: Mapped[str | None] = mapped_column(String, nullable=True)
+    service: Mapped[str] = mapped_column(String)
+    name: Mapped[str] = mapped_column(String)
+    start: Mapped[float] = mapped_column(Float)       # unix seconds
+    duration_ms: Mapped[float] = mapped_column(Float)
+    attrs: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+
+def _add_missing_columns(conn):
+    """create_all() never alters existing tables, so add new columns by hand."""
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(conn.dialect)}"
+            if column.server_default is not None:
+                ddl += f" DEFAULT {column.server_default.arg.text}"
+            conn.execute(text(ddl))
+            log.info("Added column %s.%s", table.name, column.name)
+        for index in table.indexes:
+            try:
+                index.create(conn, checkfirst=True)
+            except IntegrityError as e:
+                # Queue claims and coalescing rely on these indexes; never run without them
+                log.error("Cannot create index %s: existing %s rows violate it", index.name, table.name)
+                raise RuntimeError(
+                    f"Index {index.name} cannot be created over the existing {table.name} rows; "
+                    "resolve the conflicting rows and restart"
+                ) from e
+
 async def init_db():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_add_missing_columns)
 
 async def get_db():
     async with AsyncSessionLocal() as session:
@@ -0,0 +1,42 @@
+"""
+events.py — in-process pub/sub for job progress.
+_update_job publishes every status/stage/progress change; SSE streams on
+/status/{job_id}/stream subscribe here instead of polling the database.
+
+Only workers embedded in the API process publish here. Streams fall back
+to an occasional DB read so they also work with standalone workers.
+"""
+import asyncio
+from collections import defaultdict
+from contextlib import contextmanager
+
+SUBSCRIBER_BUFFER = 32
+
+class JobEvents:
+    def __init__(self):
+        self._subscribers: dict[str, set[asyncio.Queue]] = defaultdict(set)
+
+    def publish(self, job_id: str, event: dict):
+        for queue in self._subscribers.get(job_id, ()):
+            if queue.full():
+                # Slow consumer — progress snapshots supersede each other, drop the oldest
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    @contextmanager
+    def subscribe(self, *job_ids: str):
+        """Yields one queue receiving events for any of `job_ids`."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_BUFFER)
+        for job_id in job_ids:
+            self._subscribers[job_id].add(queue)
+        try:
+            yield queue
+        finally:
+            for job_id in job_ids:
+                subs = self._subscribers.get(job_id)
+                if subs is not None:
+                    subs.discard(queue)
+                    if not subs:
+                        del self._subscribers[job_id]
+
+job_events = JobEvents()
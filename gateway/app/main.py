@@ -1,14 +1,21 @@
 import uuid
 import os
-from fastapi import BackgroundTasks, FastAPI, Depends, HTTPException, BackgroundTasks
-from fastapi.responses import FileResponse
+import json
+import base64
+from datetime import datetime
+import asyncio
+from collections import Counter
+from fastapi import FastAPI, Depends, HTTPException, Request, BackgroundTasks, Query
+from fastapi.responses import FileResponse, StreamingResponse, Response, JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, func, or_, and_
+from sqlalchemy.exc import IntegrityError
 from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import RedirectResponse
-from .db import init_db, get_db, Job
-from .models import AnalyzeRequest, JobResponse, StatusResponse, JobStatus
+from .db import init_db, get_db, Job, AsyncSessionLocal
+from .models import AnalyzeRequest, JobResponse, StatusResponse, JobStatus, JobPriority
+from .models import BatchAnalyzeRequest, BatchResponse, BatchStatusResponse, JobSummary, JobListResponse
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -24,14 +31,66 @@ limiter = Limiter(key_func=get_remote_address)
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)'''
 
-#from .queue_manager import enqueue_analysis
-from .pipeline import run_pipeline
+from .worker import Worker
+from .clients import close_clients, cancel_downstream, SERVICE_REPLICAS
+from . import resilience
+from .report_cache import report_cache
+from pie_shared.http_ranges import not_modified, requested_range
+from .status_writer import status_writer
+from .coalesce import product_key, product_key_range, find_inflight_leader, live_follower, sync_with_leader
+from .result_cache import find_cached_result, job_from_cache
+from .events import job_events
+from .checkpoints import completed_stages
+from .blob_store import get_json
+from .retention import run_retention
+from .trace_store import load_waterfall
+from .queue_manager import PRIORITY_INTERACTIVE, PRIORITY_BULK
+from .admission import admission
+from pie_shared.wire import CodecRoute, CodecResponse
+
+# Single-container deploys run the queue consumer inside the API process.
+# Set GATEWAY_EMBEDDED_WORKER=0 when running `python -m app.worker` separately.
+EMBEDDED_WORKER = os.getenv("GATEWAY_EMBEDDED_WORKER", "1") == "1"
+
+# How long an SSE stream waits for an in-process event before re-reading the
+# job row (covers standalone workers, whose events never reach this process)
+SSE_FALLBACK_POLL_SECONDS = float(os.getenv("SSE_FALLBACK_POLL_SECONDS", "5"))
+FINISHED_STATUSES = (JobStatus.DONE, JobStatus.FAILED, JobStatus.CANCELLED)
+
+# Proxy report PDFs through the gateway (ETag/Range/LRU). 0 = redirect to the analysis service.
+REPORT_PROXY = os.getenv("REPORT_PROXY", "1") == "1"
+REPORT_CACHE_CONTROL = os.getenv("REPORT_CACHE_CONTROL", "private, max-age=300, must-revalidate")
+
+PRIORITIES = {JobPriority.INTERACTIVE: PRIORITY_INTERACTIVE, JobPriority.BULK: PRIORITY_BULK}
+
+def _tenant(request: Request) -> str:
+    """Fair-share bucket: the X-Client-Id header, else the caller's IP."""
+    client_id = request.headers.get("X-Client-Id", "").strip()
+    if client_id:
+        return client_id[:64]
+    return request.client.host if request.client else "anonymous"
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await init_db()
+    worker_task = None
+    if EMBEDDED_WORKER:
+        worker = Worker()
+        worker_task = asyncio.create_task(worker.run())
+    retention_task = asyncio.create_task(run_retention())
+    admission.start()
     yield
+    admission.stop()
+    retention_task.cancel()
+    if worker_task:
+        worker.stop()
+        worker_task.cancel()
+    await status_writer.close()
+    await close_clients()
 
-app = FastAPI(title="Product Research Engine", lifespan=lifespan)
+app = FastAPI(title="Product Research Engine", lifespan=lifespan, default_response_class=CodecResponse)
+# msgpack/zstd bodies on request; JSON stays the default
+app.router.route_class = CodecRoute
 origins = [
     "http://localhost:3000",
     "http://localhost:5173",
@@ -47,12 +106,60 @@ app.add_middleware(
     allow_headers=["*"],               # Allows all headers
 )
 
+@app.exception_handler(resilience.ServiceUnavailable)
+async def service_unavailable_handler(request: Request, exc: resilience.ServiceUnavailable):
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
+
 @app.post("/analyze", response_model=JobResponse)
 #@limiter.limit("3/hour")  # Limit: 3 requests per hour per user
-async def analyze(req: AnalyzeRequest,background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_db)):
-    #request: Request, # SlowAPI requires the 'request' parameter
+async def analyze(req: AnalyzeRequest, request: Request, db: AsyncSession = Depends(get_db)):
     #_auth = Depends(verify_api_key) # Locks the route
+    return await _submit(db, req, _tenant(request), PRIORITIES[req.priority])
+
+@app.post("/analyze/batch", response_model=BatchResponse)
+async def analyze_batch(req: BatchAnalyzeRequest, request: Request, db: AsyncSession = Depends(get_db)):
+    """Queues every product under one batch id. Poll /batch/{batch_id} for aggregate progress."""
+    batch_id = str(uuid.uuid4())
+    tenant = _tenant(request)
+    priority = PRIORITIES[req.priority]
+    # All or nothing: admit the whole batch as if none of it were cached
+    eta = await admission.admit(db, priority, len(req.products))
+    # Sequential on purpose: a product listed twice coalesces onto its first copy
+    jobs = [await _submit(db, item, tenant, priority, batch_id, eta) for item in req.products]
+    return BatchResponse(batch_id=batch_id, jobs=jobs)
+
+async def _submit(
+    db: AsyncSession, req: AnalyzeRequest, tenant: str, priority: int,
+    batch_id: str | None = None, eta: int | None = None,
+) -> JobResponse:
     job_id = str(uuid.uuid4())
+    key = product_key(req.product_name, req.monthly_active_users, req.avg_revenue_per_user)
+
+    # Researched recently? Hand back a finished job pointing at the cached result.
+    if not req.force_refresh:
+        cached = await find_cached_result(db, key)
+        if cached:
+            job = job_from_cache(job_id, cached, req.monthly_active_users, req.avg_revenue_per_user)
+            job.tenant = tenant
+            job.batch_id = batch_id
+            db.add(job)
+            await db.commit()
+            return JobResponse(
+                job_id=job_id,
+                status=JobStatus.DONE,
+                message=f"Served from cache (analysis finished {cached.updated_at:%Y-%m-%d %H:%M} UTC). "
+                        f"Send force_refresh=true to re-run.",
+            )
+
+    # Same product already running? Ride on that execution instead of starting another.
+    leader = await find_inflight_leader(db, key)
+    if leader:
+        return await _attach(db, job_id, req, key, leader, tenant, priority, batch_id)
+
+    # Only new executions add load downstream; cache hits and followers are free
+    if batch_id is None:
+        eta = await admission.admit(db, priority)
+
     job = Job(
         job_id=job_id,
         product_name=req.product_name,
@@ -60,34 +167,70 @@ async def analyze(req: AnalyzeRequest,background_tasks: BackgroundTasks, db: Asy
         stage="Queued — waiting for worker",
         mau=req.monthly_active_users,
         arpu=req.avg_revenue_per_user,
+        dedup_key=key,
+        tenant=tenant,
+        priority=priority,
+        batch_id=batch_id,
     )
+    # The row itself is the queue entry — a worker leases it from the jobs table
     db.add(job)
-    await db.commit()
+    try:
+        await db.commit()
+    except IntegrityError:
+        # A concurrent submission for the same product became the leader first
+        # (ux_jobs_inflight_leader) — ride on its run instead
+        await db.rollback()
+        leader = await find_inflight_leader(db, key)
+        if leader is None:
+            raise
+        return await _attach(db, job_id, req, key, leader, tenant, priority, batch_id)
 
-    # Push to RQ
-    background_tasks.add_task(
-        run_pipeline, 
-        job_id, 
-        req.product_name, 
-        req.monthly_active_users, 
-        req.avg_revenue_per_user
-    )
     return JobResponse(
         job_id=job_id,
         status=JobStatus.QUEUED,
         message=f"Job queued. Poll /status/{job_id} for updates.",
+        eta_seconds=eta,
     )
 
-@app.get("/status/{job_id}", response_model=StatusResponse)
-async def get_status(job_id: str, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Job).where(Job.job_id == job_id))
-    job = result.scalar_one_or_none()
-    if not job:
-        raise HTTPException(status_code=404, detail="Job not found")
+async def _attach(
+    db: AsyncSession, job_id: str, req: AnalyzeRequest, key: str, leader: Job,
+    tenant: str, priority: int, batch_id: str | None,
+) -> JobResponse:
+    state = leader
+    if leader.status == JobStatus.CANCELLED:
+        # The leader's row stopped tracking its run when it was cancelled; a live follower's still does
+        state = await live_follower(db, leader.job_id) or Job(
+            status=JobStatus.QUEUED, stage="Queued — waiting for worker", progress_pct=0,
+        )
+    job = Job(
+        job_id=job_id,
+        product_name=req.product_name,
+        status=state.status,
+        stage=state.stage,
+        progress_pct=state.progress_pct,
+        mau=req.monthly_active_users,
+        arpu=req.avg_revenue_per_user,
+        dedup_key=key,
+        source_job_id=leader.job_id,
+        tenant=tenant,
+        priority=priority,
+        batch_id=batch_id,
+    )
+    # Someone is now waiting interactively on a queued bulk run — move it up
+    leader.priority = max(leader.priority, priority)
+    db.add(job)
+    await db.commit()
+    await sync_with_leader(db, job, leader)
+    return JobResponse(
+        job_id=job_id,
+        status=job.status,
+        message=f"Attached to running analysis of '{leader.product_name}'. Poll /status/{job_id} for updates.",
+    )
 
-    report_url = f"/report/{job_id}" if job.status == JobStatus.DONE else None
+def _status_response(job: Job) -> StatusResponse:
+    report_url = f"/report/{job.job_id}" if job.status == JobStatus.DONE else None
     return StatusResponse(
-        job_id=job_id,
+        job_id=job.job_id,
         status=job.status,
         stage=job.stage,
         progress_pct=job.progress_pct,
@@ -95,29 +238,228 @@ async def get_status(job_id: str, db: AsyncSession = Depends(get_db)):
         report_url=report_url,
     )
 
-@app.get("/report/{job_id}")
-async def get_report(job_id: str, db: AsyncSession = Depends(get_db)):
-    analysis_url = os.getenv("ANALYSIS_URL", "http://127.0.0.1:8003").rstrip("/")
-    return RedirectResponse(f"{analysis_url}/report/{job_id}")
+@app.get("/batch/{batch_id}", response_model=BatchStatusResponse)
+async def get_batch(batch_id: str, db: AsyncSession = Depends(get_db)):
+    result = await db.execute(select(Job).where(Job.batch_id == batch_id).order_by(Job.created_at))
+    jobs = result.scalars().all()
+    if not jobs:
+        raise HTTPException(status_code=404, detail="Batch not found")
 
-@app.get("/result/{job_id}")
-async def get_result_json(job_id: str, db: AsyncSession = Depends(get_db)):
-    """Machine-readable JSON result."""
+    finished = [j for j in jobs if j.status in FINISHED_STATUSES]
+    progress = sum(100 if j in finished else j.progress_pct for j in jobs) // len(jobs)
+    return BatchStatusResponse(
+        batch_id=batch_id,
+        total=len(jobs),
+        finished=len(finished),
+        progress_pct=progress,
+        counts=dict(Counter(JobStatus(j.status).value for j in jobs)),
+        jobs=[_status_response(j) for j in jobs],
+    )
+
+@app.get("/jobs", response_model=JobListResponse)
+async def list_jobs(
+    status: list[JobStatus] | None = Query(None),
+    product: str | None = None,
+    created_after: datetime | None = None,
+    created_before: datetime | None = None,
+    cursor: str | None = None,
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Newest jobs first. Filters combine; `status` may repeat. Pages are keyset
+    based on (created_at, job_id), so deep pages cost the same as the first.
+    """
+    stmt = select(*(getattr(Job, f) for f in JobSummary.model_fields))
+    if status:
+        stmt = stmt.where(Job.status.in_([s.value for s in status]))
+    if product:
+        lo, hi = product_key_range(product)
+        stmt = stmt.where(Job.dedup_key >= lo, Job.dedup_key < hi)
+    if created_after:
+        stmt = stmt.where(Job.created_at >= created_after)
+    if created_before:
+        stmt = stmt.where(Job.created_at < created_before)
+    if cursor:
+        after_created, after_id = _decode_cursor(cursor)
+        stmt = stmt.where(or_(
+            Job.created_at < after_created,
+            and_(Job.created_at == after_created, Job.job_id < after_id),
+        ))
+    stmt = stmt.order_by(Job.created_at.desc(), Job.job_id.desc()).limit(limit + 1)
+
+    rows = (await db.execute(stmt)).mappings().all()
+    jobs = [JobSummary(**row) for row in rows[:limit]]
+    next_cursor = _encode_cursor(jobs[-1]) if len(rows) > limit else None
+    return JobListResponse(jobs=jobs, next_cursor=next_cursor)
+
+@app.get("/jobs/{job_id}/trace")
+async def get_job_trace(job_id: str, trace_id: str | None = None, db: AsyncSession = Depends(get_db)):
+    """
+    Latency waterfall of the job's latest run (or of `trace_id`): every span
+    from every service with its offset from the run's start, plus the leaf
+    steps that took longest.
+    """
+    job = await db.get(Job, job_id)
+    if not job:
+        raise HTTPException(404, "Job not found")
+    # Coalesced and cached jobs were produced by their source job's run
+    waterfall = await load_waterfall(db, job.source_job_id or job_id, trace_id)
+    if waterfall is None:
+        raise HTTPException(404, "No trace recorded for this job yet")
+    return waterfall
+
+def _encode_cursor(job: JobSummary) -> str:
+    raw = f"{job.created_at.isoformat()}|{job.job_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def _decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        created, job_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(created), job_id
+    except ValueError:
+        raise HTTPException(400, "Invalid cursor")
+
+@app.get("/status/{job_id}", response_model=StatusResponse)
+async def get_status(job_id: str, db: AsyncSession = Depends(get_db)):
+    result = await db.execute(select(Job).where(Job.job_id == job_id))
+    job = result.scalar_one_or_none()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return _status_response(job)
+
+@app.get("/status/{job_id}/stream")
+async def stream_status(job_id: str, request: Request, db: AsyncSession = Depends(get_db)):
+    """
+    Server-Sent Events: one `status` event per stage/progress change,
+    closing once the job finishes. Replaces polling /status/{job_id}.
+    """
     result = await db.execute(select(Job).where(Job.job_id == job_id))
     job = result.scalar_one_or_none()
     if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    state = _status_response(job)
+    # Coalesced jobs hear about their progress on the source job's channel
+    channels = {job_id, job.source_job_id} - {None}
+
+    async def event_stream():
+        nonlocal state
+        yield _sse(state)
+        with job_events.subscribe(*channels) as events:
+            while state.status not in FINISHED_STATUSES:
+                if await request.is_disconnected():
+                    return
+                try:
+                    event = await asyncio.wait_for(events.get(), timeout=SSE_FALLBACK_POLL_SECONDS)
+                    if event.get("job_id", job_id) != job_id:
+                        continue  # row-specific event (e.g. a cancel) for another job
+                    fields = {k: v for k, v in event.items() if k in StatusResponse.model_fields and k != "job_id"}
+                    new_state = StatusResponse(**{**state.model_dump(), **fields})
+                    if new_state.status == JobStatus.DONE:
+                        new_state.report_url = f"/report/{job_id}"
+                except asyncio.TimeoutError:
+                    async with AsyncSessionLocal() as session:
+                        fresh = await session.get(Job, job_id)
+                    if fresh is None:
+                        return
+                    new_state = _status_response(fresh)
+
+                if new_state != state:
+                    state = new_state
+                    yield _sse(state)
+                else:
+                    yield ": keep-alive\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+def _sse(state: StatusResponse) -> str:
+    return f"event: status\ndata: {state.model_dump_json()}\n\n"
+
+@app.get("/report/{job_id}")
+async def get_report(job_id: str, request: Request, db: AsyncSession = Depends(get_db)):
+    result = await db.execute(select(Job.source_job_id).where(Job.job_id == job_id))
+    # Coalesced jobs share the PDF written under their source job's id
+    report_job_id = result.scalar_one_or_none() or job_id
+    if not REPORT_PROXY:
+        return RedirectResponse(f"{SERVICE_REPLICAS['analysis'][0]}/report/{report_job_id}")
+
+    # Served from here so repeat downloads are a 304 or an LRU hit, not a cross-service transfer
+    updated_at = await db.scalar(select(Job.updated_at).where(Job.job_id == report_job_id))
+    if updated_at is None:
+        raise HTTPException(404, "Report not found")
+    key = (report_job_id, updated_at)
+    entry = report_cache.get(key)
+    if entry is None:
+        resp = await resilience.get("analysis", f"/report/{report_job_id}", timeout=60.0, idempotent=True)
+        if resp.status_code == 404:
+            raise HTTPException(404, "Report not found")
+        resp.raise_for_status()
+        entry = report_cache.put(key, resp.content)
+    data, etag = entry
+
+    headers = {"ETag": etag, "Cache-Control": REPORT_CACHE_CONTROL, "Accept-Ranges": "bytes"}
+    if not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    byte_range = requested_range(request, etag, len(data))
+    if byte_range is None:
+        return Response(data, media_type="application/pdf", headers=headers)
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{len(data)}"
+    return Response(data[start:end + 1], status_code=206, media_type="application/pdf", headers=headers)
+
+@app.get("/result/{job_id}")
+async def get_result_json(job_id: str, fields: str | None = None, db: AsyncSession = Depends(get_db)):
+    """
+    Machine-readable JSON result.
+    ?fields=risk,competitor returns only those top-level keys.
+    """
+    result = await db.execute(select(Job.result_ref, Job.result_json).where(Job.job_id == job_id))
+    row = result.first()
+    if not row:
         raise HTTPException(404, "Job not found")
-    if not job.result_json:
+    ref, legacy = row
+    if ref:
+        data = await get_json(ref)
+    else:
+        # Rows written before the blob store hold a JSON-encoded string
+        data = json.loads(legacy) if isinstance(legacy, str) else legacy
+    if not data:
         raise HTTPException(400, "No result yet")
-    return job.result_json
+
+    if fields:
+        wanted = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = [f for f in wanted if f not in data]
+        if unknown:
+            raise HTTPException(400, f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(data)}")
+        data = {f: data[f] for f in wanted}
+    return data
+
+@app.get("/load")
+async def get_load(db: AsyncSession = Depends(get_db)):
+    """Downstream load as last polled, and the ETA a new job would get right now."""
+    return {
+        "saturation": admission.saturation(),
+        "services": admission.services(),
+        "circuit_breakers": resilience.breaker_states(),
+        "eta_seconds": {
+            "interactive": round(await admission.estimate(db, PRIORITY_INTERACTIVE)),
+            "bulk": round(await admission.estimate(db, PRIORITY_BULK)),
+        },
+    }
 
 @app.get("/health")
 async def health():
     return {"status": "I AM THE NEW ONE"}
 
 @app.post("/cancel/{job_id}", response_model=StatusResponse)
-async def cancel_job(job_id: str, db: AsyncSession = Depends(get_db)):
-    """Stops a job by marking it CANCELLED."""
+async def cancel_job(job_id: str, background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_db)):
+    """Stops a job by marking it CANCELLED and aborting its in-flight service calls."""
     result = await db.execute(select(Job).where(Job.job_id == job_id))
     job = result.scalar_one_or_none()
     
@@ -132,6 +474,23 @@ async def cancel_job(job_id: str, db: AsyncSession = Depends(get_db)):
     job.stage = "Analysis stopped by user."
     job.error = "User cancellation"
     await db.commit()
+    job_events.publish(job_id, {
+        "job_id": job_id, "status": job.status, "stage": job.stage, "error": job.error,
+    })
+
+    # The run keeps going while other coalesced jobs still wait on it
+    run_id = job.source_job_id or job.job_id
+    live = await db.scalar(
+        select(func.count())
+        .select_from(Job)
+        .where(
+            or_(Job.job_id == run_id, Job.source_job_id == run_id),
+            Job.status != JobStatus.CANCELLED,
+            Job.from_cache.is_(False),
+        )
+    )
+    if not live:
+        background_tasks.add_task(cancel_downstream, run_id)
     
     return StatusResponse(
         job_id=job.job_id,
@@ -139,4 +498,68 @@ async def cancel_job(job_id: str, db: AsyncSession = Depends(get_db)):
         stage=job.stage,
         progress_pct=job.progress_pct,
         error=job.error
-    )
\ No newline at end of file
+    )
+
+@app.post("/retry/{job_id}", response_model=StatusResponse)
+async def retry_job(job_id: str, db: AsyncSession = Depends(get_db)):
+    """
+    Re-queues a failed or cancelled job. It resumes from its last completed stage.
+    A coalesced job whose shared run has since finished just takes that run's result.
+    """
+    job = await db.get(Job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    if job.status not in [JobStatus.FAILED, JobStatus.CANCELLED]:
+        raise HTTPException(status_code=400, detail="Only failed or cancelled jobs can be retried")
+
+    # A coalesced job is retried by re-running the job it was attached to
+    runner = await db.get(Job, job.source_job_id) if job.source_job_id else job
+    if runner is None:
+        raise HTTPException(
+            status_code=409,
+            detail="The run this job was attached to has been archived; submit a new analysis",
+        )
+    # A cancelled leader's run keeps going while other jobs wait on it
+    tracker = await live_follower(db, runner.job_id) if runner.status == JobStatus.CANCELLED else None
+    if runner.status == JobStatus.DONE:
+        # The shared run finished after this job was cancelled — hand over its result
+        job.status = runner.status
+        job.stage = runner.stage
+        job.progress_pct = runner.progress_pct
+        job.error = None
+        job.result_ref = runner.result_ref
+        job.report_path = runner.report_path
+    elif runner.status in (JobStatus.FAILED, JobStatus.CANCELLED) and tracker is None:
+        stages = await completed_stages(runner.job_id)
+        stage = f"Queued — resuming after {stages[-1]}" if stages else "Queued — waiting for worker"
+        for row in {runner, job}:
+            row.status = JobStatus.QUEUED
+            row.stage = stage
+            row.progress_pct = 0
+            row.error = None
+        runner.attempts = 0
+        runner.lease_owner = None
+        runner.lease_expires_at = None
+    else:
+        # Source run is still going — just re-attach
+        state = tracker or runner
+        job.status = state.status
+        job.stage = state.stage
+        job.progress_pct = state.progress_pct
+        job.error = None
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Another submission started a new run for this product meanwhile
+        await db.rollback()
+        raise HTTPException(
+            status_code=409,
+            detail="This product is already being analysed again; submit a new analysis to attach to that run",
+        )
+    job_events.publish(job_id, {
+        "job_id": job_id, "status": job.status, "stage": job.stage,
+        "progress_pct": job.progress_pct, "error": None,
+    })
+
+    return _status_response(job)
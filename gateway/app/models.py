@@ -1,6 +1,7 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional
 from enum import Enum
+from datetime import datetime
 
 class JobStatus(str, Enum):
     QUEUED = "queued"
@@ -11,16 +12,35 @@ class JobStatus(str, Enum):
     DONE = "done"
     FAILED = "failed"
     CANCELLED = "cancelled"
+
+class JobPriority(str, Enum):
+    INTERACTIVE = "interactive"  # someone is waiting on the result
+    BULK = "bulk"                # backfills — run on spare capacity
+
 class AnalyzeRequest(BaseModel):
     product_name: str
     # Optional financial context — improves risk numbers
     monthly_active_users: Optional[int] = None
     avg_revenue_per_user: Optional[float] = None
+    # Skip the result cache and run a fresh analysis
+    force_refresh: bool = False
+    priority: JobPriority = JobPriority.INTERACTIVE
 
 class JobResponse(BaseModel):
     job_id: str
     status: JobStatus
     message: str
+    # Estimated seconds until a queued job starts
+    eta_seconds: Optional[int] = None
+
+class BatchAnalyzeRequest(BaseModel):
+    products: list[AnalyzeRequest] = Field(min_length=1, max_length=200)
+    # Applies to every product in the batch (per-item priority is ignored)
+    priority: JobPriority = JobPriority.BULK
+
+class BatchResponse(BaseModel):
+    batch_id: str
+    jobs: list[JobResponse]
 
 class StatusResponse(BaseModel):
     job_id: str
@@ -28,4 +48,29 @@ class StatusResponse(BaseModel):
     stage: str
     progress_pct: int
     error: Optional[str] = None
-    report_url: Optional[str] = None
\ No newline at end of file
+    report_url: Optional[str] = None
+
+class JobSummary(BaseModel):
+    job_id: str
+    product_name: str
+    status: JobStatus
+    stage: str
+    progress_pct: int
+    tenant: str
+    batch_id: Optional[str] = None
+    source_job_id: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
+class JobListResponse(BaseModel):
+    jobs: list[JobSummary]
+    # Pass back as ?cursor= for the next (older) page; None on the last page
+    next_cursor: Optional[str] = None
+
+class BatchStatusResponse(BaseModel):
+    batch_id: str
+    total: int
+    finished: int
+    progress_pct: int                 # mean over jobs; finished jobs count as 100
+    counts: dict[str, int]            # jobs per status
+    jobs: list[StatusResponse]
\ No newline at end of file
@@ -1,78 +1,181 @@
 """
-pipeline.py — RQ worker task.
+pipeline.py — queue worker task (see worker.py).
 Orchestrates scraper → classifier → analysis service calls.
 Updates job status in DB at each stage.
 """
 import os
-import httpx
 import asyncio
-import sqlalchemy
-from sqlalchemy import create_engine, text
-from .db import get_db_context, Job, JobStatus # Ensure you have a way to get DB context outside request
-from sqlalchemy import select
-from datetime import datetime
+from pie_shared import wire
+from . import resilience
+from .status_writer import status_writer
+from .classify_batcher import classify_batcher, CLASSIFY_BATCHING
+from .blob_store import put_json
+from pie_shared.tracing import start_trace, span
+from .trace_store import persist_trace
+from .checkpoints import load_checkpoints, save_checkpoint, clear_checkpoints, SCRAPE, CLASSIFY, ANALYSIS
 import json
-from pathlib import Path
 from dotenv import load_dotenv
 load_dotenv()
 
-BASE_DIR = Path(__file__).resolve().parent.parent
-DATABASE_PATH = BASE_DIR / "data" / "research.db"
-
-#HF_TOKEN = os.getenv("HF_TOKEN")
-DATABASE_URL = f"sqlite:///{DATABASE_PATH}"
-# Sync engine for the RQ worker (RQ runs sync functions)
-if "+aiosqlite" in DATABASE_URL:
-    DATABASE_URL = DATABASE_URL.replace("+aiosqlite", "")
-
-SCRAPER_URL    = os.getenv("SCRAPER_URL",    "http://127.0.0.1:8001") #"http://scraper_service:8001"
-CLASSIFIER_URL = os.getenv("CLASSIFIER_URL", "http://127.0.0.1:8002") #"http://classifier_service:8002"
-ANALYSIS_URL   = os.getenv("ANALYSIS_URL",   "http://127.0.0.1:8003") #"http://analysis_service:8003"
-
-engine = create_engine(DATABASE_URL)
-def check_if_cancelled(job_id: str) -> bool:
-    with engine.connect() as conn:
-        result = conn.execute(
-            text("SELECT status FROM jobs WHERE job_id = :job_id"),
-            {"job_id": job_id}
-        ).fetchone()
-        return result is not None and result[0] == JobStatus.CANCELLED
-def _update_job(job_id: str, **kwargs):
-    kwargs["updated_at"] = datetime.utcnow()
-
-    # 🔥 CRITICAL FIX — serialize dicts for SQLite
-    if "result_json" in kwargs and isinstance(kwargs["result_json"], dict):
-        kwargs["result_json"] = json.dumps(kwargs["result_json"])
-
-    set_clause = ", ".join(f"{k} = :{k}" for k in kwargs)
-
-    with engine.connect() as conn:
-        conn.execute(
-            text(f"UPDATE jobs SET {set_clause} WHERE job_id = :job_id"),
-            {**kwargs, "job_id": job_id},
-        )
-        conn.commit()
+# Overlap scraping and classification via the NDJSON /scrape/stream and
+# /classify/stream endpoints. Set to 0 to use the one-shot endpoints, whose
+# classifier calls go through classify_batcher when CLASSIFY_BATCHING is on.
+PIPELINE_STREAMING = os.getenv("PIPELINE_STREAMING", "1") == "1"
+# Run analysis and the report in one /analyze_and_report call. With 0 the
+# report is requested separately, by job_id only (the analysis service caches the rest).
+ANALYZE_AND_REPORT = os.getenv("ANALYZE_AND_REPORT", "1") == "1"
+
+async def check_if_cancelled(job_id: str) -> bool:
+    """A coalesced run stops only once every attached job is cancelled."""
+    # Answered from memory; status_writer refreshes the flags every flush tick
+    return status_writer.is_cancelled(job_id)
+async def _update_job(job_id: str, **kwargs):
+    # The result goes to the blob store; the row only keeps its reference
+    if "result" in kwargs:
+        kwargs["result_ref"] = await put_json(kwargs.pop("result"))
+
+    # Buffered; written in batches by status_writer (final statuses immediately)
+    await status_writer.update(job_id, **kwargs)
+
+async def _scrape_and_classify_streamed(job_id: str, product_name: str) -> tuple[dict, dict]:
+    """
+    Stages 1+2 overlapped. Every per-source frame from /scrape/stream goes
+    to the classifier as soon as it arrives; the final `clusters` frame then
+    decides which classified reviews survive semantic dedup.
+    Returns (scrape_result, classify_result) shaped like the one-shot endpoints.
+    """
+    classify_tasks = []
+    clusters = []
+    try:
+        async with resilience.stream(
+            "scraper", "POST", "/scrape/stream", json={"product_name": product_name, "job_id": job_id}, timeout=120.0
+        ) as resp:
+            resp.raise_for_status()
+            async for line in resp.aiter_lines():
+                if not line:
+                    continue
+                frame = json.loads(line)
+                if frame["type"] == "cancelled":
+                    raise RuntimeError("Scraper stopped: job cancelled")
+                if frame["type"] == "reviews" and frame["reviews"]:
+                    classify_tasks.append(asyncio.create_task(
+                        _classify_streamed(job_id, product_name, frame["reviews"])
+                    ))
+                    await _update_job(
+                        job_id,
+                        stage=f"Scraped {len(frame['reviews'])} items from {frame['source']}. Classifying while other sources finish...",
+                        progress_pct=min(10 + 5 * len(classify_tasks), 30),
+                    )
+                elif frame["type"] == "clusters":
+                    clusters = frame["reviews"]
+
+        classified = [r for batch in await asyncio.gather(*classify_tasks) for r in batch]
+    finally:
+        for task in classify_tasks:
+            task.cancel()
+
+    # Cluster representatives are the original review texts, so match on text
+    # and carry over the cluster's aggregated metadata.
+    by_text = {r["text"]: r for r in classified}
+    clean_reviews = [
+        {**by_text[c["text"]], "url": c["url"], "date": c["date"], "upvotes": c["upvotes"]}
+        for c in clusters
+        if c["text"] in by_text
+    ]
+    return {"reviews": clusters}, {"reviews": clean_reviews}
+
+async def _classify_streamed(job_id: str, product_name: str, reviews: list[dict]) -> list[dict]:
+    clean = []
+    async with resilience.stream(
+        "classifier",
+        "POST",
+        "/classify/stream",
+        json={"reviews": reviews, "job_id": job_id, "product_name": product_name},
+        timeout=180.0,
+    ) as resp:
+        resp.raise_for_status()
+        async for line in resp.aiter_lines():
+            if not line:
+                continue
+            frame = json.loads(line)
+            if frame["type"] == "cancelled":
+                raise RuntimeError("Classifier stopped: job cancelled")
+            if frame["type"] == "reviews":
+                clean.extend(frame["reviews"])
+    return clean
+
+async def _generate_report(job_id: str, product_name: str, analysis_result: dict, clean_reviews: list[dict]) -> dict:
+    # Idempotent: the PDF is written under the job id, a retry overwrites it
+    resp = await resilience.post(
+        "analysis", "/generate_report", json={"job_id": job_id}, timeout=120.0, idempotent=True
+    )
+    if resp.status_code == 404:
+        # Not in that replica's job cache (restart, expiry, other replica) — send everything
+        resp = await resilience.post("analysis", "/generate_report", json={
+            "job_id": job_id,
+            "product_name": product_name,
+            "analysis_result": analysis_result,
+            "reviews": clean_reviews,
+        }, timeout=120.0, idempotent=True)
+    resp.raise_for_status()
+    return wire.read(resp)
+
+async def run_pipeline(job_id: str, product_name: str, mau: int | None, arpu: float | None):
+    """Runs the stages under a fresh trace and stores the run's spans afterwards."""
+    trace_id = start_trace()
+    try:
+        with span("pipeline", job_id=job_id, product=product_name):
+            await _run_stages(job_id, product_name, mau, arpu)
+    finally:
+        try:
+            await persist_trace(job_id, trace_id)
+        except Exception as e:
+            print(f"[{job_id}] Could not store trace {trace_id}: {e}")
 
-def run_pipeline(job_id: str, product_name: str, mau: int | None, arpu: float | None):
+async def _run_stages(job_id: str, product_name: str, mau: int | None, arpu: float | None):
     """
-    Main RQ task. Runs synchronously, calls microservices via httpx.
+    Main worker task. Runs on the worker's event loop and calls the
+    microservices through the shared pooled clients in clients.py.
     Stages:
       1. Scraper Service  → raw reviews
       2. Classifier Service → filtered + scored reviews
       3. Analysis Service → full AnalysisResult
       4. Analysis Service → PDF report
     """
+    await status_writer.watch(job_id)
     try:
-        if check_if_cancelled(job_id):
+        if await check_if_cancelled(job_id):
             return
 
+        # Stages finished by an earlier attempt are loaded, not re-run
+        checkpoints = await load_checkpoints(job_id)
+        scrape_result = checkpoints.get(SCRAPE)
+        classify_result = checkpoints.get(CLASSIFY)
+        analysis_result = checkpoints.get(ANALYSIS)
+        if checkpoints:
+            print(f"[{job_id}] Resuming with checkpoints: {', '.join(checkpoints)}")
+
         # ── STAGE 1: SCRAPING ────────────────────────────────────────
-        _update_job(job_id, status="scraping", stage="Scraping reviews from Reddit, HN, G2...", progress_pct=10)
-        
-        with httpx.Client(timeout=120.0) as client:
-            resp = client.post(f"{SCRAPER_URL}/scrape", json={"product_name": product_name, "job_id": job_id})
-            resp.raise_for_status()
-            scrape_result = resp.json()
+        if scrape_result is None:
+            await _update_job(job_id, status="scraping", stage="Scraping reviews from Reddit, HN, G2...", progress_pct=10)
+
+            if PIPELINE_STREAMING:
+                # Stage 2 runs on each source's batch while slower sources are still fetching
+                with span("stage.scrape_and_classify"):
+                    scrape_result, classify_result = await _scrape_and_classify_streamed(job_id, product_name)
+            else:
+                with span("stage.scrape"):
+                    resp = await resilience.post(
+                        "scraper", "/scrape", json={"product_name": product_name, "job_id": job_id},
+                        timeout=120.0, idempotent=True,
+                    )
+                    resp.raise_for_status()
+                    scrape_result = wire.read(resp)
+
+            if scrape_result.get("reviews"):
+                await save_checkpoint(job_id, SCRAPE, scrape_result)
+                if classify_result is not None:
+                    await save_checkpoint(job_id, CLASSIFY, classify_result)
         
         raw_reviews = scrape_result.get("reviews", [])
         if not raw_reviews:
@@ -80,21 +183,30 @@ def run_pipeline(job_id: str, product_name: str, mau: int | None, arpu: float |
         
         print(f"[{job_id}] Scraping done: {len(raw_reviews)} raw reviews")
         
-        if check_if_cancelled(job_id):
+        if await check_if_cancelled(job_id):
             return
 
-        _update_job(job_id, stage=f"Scraped {len(raw_reviews)} raw items. Classifying...", progress_pct=30)
+        await _update_job(job_id, stage=f"Scraped {len(raw_reviews)} raw items. Classifying...", progress_pct=30)
 
-        if check_if_cancelled(job_id):
+        if await check_if_cancelled(job_id):
             return
 
         # ── STAGE 2: CLASSIFICATION ──────────────────────────────────
-        _update_job(job_id, status="classifying", stage="Filtering spam, classifying quality...", progress_pct=35)
+        await _update_job(job_id, status="classifying", stage="Filtering spam, classifying quality...", progress_pct=35)
 
-        with httpx.Client(timeout=180.0) as client:
-            resp = client.post(f"{CLASSIFIER_URL}/classify", json={"reviews": raw_reviews, "job_id": job_id, "product_name": product_name})
-            resp.raise_for_status()
-            classify_result = resp.json()
+        if classify_result is None:
+            with span("stage.classify"):
+                if CLASSIFY_BATCHING:
+                    classify_result = await classify_batcher.classify(job_id, product_name, raw_reviews)
+                else:
+                    resp = await resilience.post(
+                        "classifier", "/classify",
+                        json={"reviews": raw_reviews, "job_id": job_id, "product_name": product_name},
+                        timeout=180.0, idempotent=True,
+                    )
+                    resp.raise_for_status()
+                    classify_result = wire.read(resp)
+            await save_checkpoint(job_id, CLASSIFY, classify_result)
 
         clean_reviews = classify_result.get("reviews", [])
         if len(clean_reviews) < 5:
@@ -103,64 +215,88 @@ def run_pipeline(job_id: str, product_name: str, mau: int | None, arpu: float |
 
         print(f"[{job_id}] Classification done: {len(clean_reviews)} clean reviews")
 
-        if check_if_cancelled(job_id):
+        if await check_if_cancelled(job_id):
             return
 
-        _update_job(job_id, stage=f"{len(clean_reviews)} quality reviews. Running analysis...", progress_pct=55)
+        await _update_job(job_id, stage=f"{len(clean_reviews)} quality reviews. Running analysis...", progress_pct=55)
 
-        if check_if_cancelled(job_id):
+        if await check_if_cancelled(job_id):
             return
 
 
         # ── STAGE 3: ANALYSIS ────────────────────────────────────────
-        _update_job(job_id, status="analyzing", stage="Running 4 parallel AI agents...", progress_pct=60)
-
-        with httpx.Client(timeout=300.0) as client:
-            resp = client.post(f"{ANALYSIS_URL}/analyze", json={
-                "product_name": product_name,
-                "reviews": clean_reviews,
-                "job_id": job_id,
-                "mau": mau,
-                "arpu": arpu,
-            })
-            resp.raise_for_status()
-            analysis_result = resp.json()
+        gen_result = None
+        analyze_request = {
+            "product_name": product_name,
+            "reviews": clean_reviews,
+            "job_id": job_id,
+            "mau": mau,
+            "arpu": arpu,
+        }
+        if analysis_result is None and ANALYZE_AND_REPORT:
+            await _update_job(job_id, status="analyzing",
+                              stage="Running 4 parallel AI agents and writing the report...", progress_pct=60)
+            with span("stage.analysis_and_report"):
+                # Not idempotent: a retry would pay for the agents' model calls twice
+                resp = await resilience.post("analysis", "/analyze_and_report", json=analyze_request, timeout=420.0)
+                resp.raise_for_status()
+                gen_result = wire.read(resp)
+            analysis_result = gen_result.pop("analysis_result")
+            await save_checkpoint(job_id, ANALYSIS, analysis_result)
+        elif analysis_result is None:
+            await _update_job(job_id, status="analyzing", stage="Running 4 parallel AI agents...", progress_pct=60)
+            with span("stage.analysis"):
+                resp = await resilience.post("analysis", "/analyze", json=analyze_request, timeout=300.0)
+                resp.raise_for_status()
+                analysis_result = wire.read(resp)
+            await save_checkpoint(job_id, ANALYSIS, analysis_result)
 
         print(f"[{job_id}] Analysis done.")
 
-        if check_if_cancelled(job_id):
+        if await check_if_cancelled(job_id):
             return
-        _update_job(job_id, stage="Generating PDF report...", progress_pct=80)
-
 
         # ── STAGE 4: REPORT GENERATION ───────────────────────────────
-        _update_job(job_id, status="generating", stage="Minting PDF...", progress_pct=85)
-
-        with httpx.Client(timeout=120.0) as client:
-            resp = client.post(f"{ANALYSIS_URL}/generate_report", json={
-                "job_id": job_id,
-                "product_name": product_name,
-                "analysis_result": analysis_result,
-                "reviews": clean_reviews,
-            })
-            resp.raise_for_status()
-            gen_result = resp.json()
+        if gen_result is None:
+            await _update_job(job_id, status="generating", stage="Generating PDF report...", progress_pct=85)
+            with span("stage.report"):
+                gen_result = await _generate_report(job_id, product_name, analysis_result, clean_reviews)
 
         report_path = gen_result.get("report_path")
         
-        _update_job(
+        await _update_job(
             job_id,
             status="done",
             stage="Complete",
             progress_pct=100,
             report_path=report_path,
-            result_json=analysis_result,  # stored as JSON text
+            result=analysis_result,
         )
         print(f"[{job_id}] Pipeline complete. Report: {report_path}")
 
+        # Only an unfinished run can resume, so its checkpoints are dead weight now
+        try:
+            await clear_checkpoints(job_id)
+        except Exception as e:
+            print(f"[{job_id}] Could not clear checkpoints: {e}")
+
+    except asyncio.CancelledError:
+        # Worker lost the lease or is shutting down — another worker re-runs the job
+        print(f"[{job_id}] Pipeline interrupted.")
+        status_writer.discard(job_id)
+        raise
     except Exception as e:
+        # POST /cancel also aborts the downstream services, so a cancelled
+        # run usually ends here with a 409 or a `cancelled` frame
+        await status_writer.refresh(job_id)
+        if await check_if_cancelled(job_id):
+            print(f"[{job_id}] Pipeline stopped: job cancelled.")
+            status_writer.discard(job_id)
+            return
         import traceback
         err = traceback.format_exc()
         print(f"[{job_id}] PIPELINE FAILED: {err}")
-        _update_job(job_id, status="failed", stage="Failed", error=str(e), progress_pct=0)
+        await _update_job(job_id, status="failed", stage="Failed", error=str(e), progress_pct=0)
         raise
+    finally:
+        status_writer.unwatch(job_id)
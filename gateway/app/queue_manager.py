@@ -0,0 +1,143 @@
+"""
+queue_manager.py — durable job queue over the `jobs` table.
+
+Workers claim jobs with a lease (visibility timeout). While a worker holds
+the lease it keeps renewing it; if the worker dies the lease runs out and
+another worker picks the job up again, up to JOB_MAX_ATTEMPTS times.
+
+Claim order: interactive before bulk, then the tenant using the least of
+its weighted share, then oldest first. Tenants are capped at a number of
+concurrently running jobs, and bulk jobs never take every slot.
+"""
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, or_, exists, func, case, cast, literal, Float
+from sqlalchemy.orm import aliased
+from .db import engine, Job, JobStatus
+
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "120"))
+JOB_MAX_ATTEMPTS  = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+def _parse_map(raw: str, cast_value) -> dict:
+    """'acme=3,beta=1' → {'acme': 3, 'beta': 1}"""
+    pairs = (item.split("=", 1) for item in raw.split(",") if "=" in item)
+    return {k.strip(): cast_value(v) for k, v in pairs}
+
+PRIORITY_INTERACTIVE = 10
+PRIORITY_BULK        = 0
+
+# Fair share: a tenant with weight 3 gets 3x the running jobs of a weight-1 tenant
+TENANT_WEIGHTS          = _parse_map(os.getenv("TENANT_WEIGHTS", ""), float)
+TENANT_MAX_CONCURRENT   = int(os.getenv("TENANT_MAX_CONCURRENT", "4"))
+TENANT_CONCURRENCY_CAPS = _parse_map(os.getenv("TENANT_CONCURRENCY_CAPS", ""), int)
+# Running bulk jobs across all workers; keeps slots free for interactive work
+BULK_MAX_CONCURRENT     = int(os.getenv("BULK_MAX_CONCURRENT", "3"))
+
+TERMINAL_STATUSES = [JobStatus.DONE, JobStatus.FAILED, JobStatus.CANCELLED]
+
+@dataclass
+class ClaimedJob:
+    job_id: str
+    product_name: str
+    mau: int | None
+    arpu: float | None
+    attempts: int
+
+def has_live_followers(leader=Job):
+    """SQL condition: some unfinished job still waits on `leader`'s run."""
+    follower = aliased(Job)
+    return exists().where(
+        follower.source_job_id == leader.job_id,
+        follower.status.not_in(TERMINAL_STATUSES),
+    )
+
+def _per_tenant(values: dict, default):
+    if not values:
+        return literal(default)
+    return case(values, value=Job.tenant, else_=default)
+
+async def claim_next_job(owner: str, lease_seconds: float = JOB_LEASE_SECONDS) -> ClaimedJob | None:
+    """
+    Atomically lease the next runnable job (see the module docstring for order).
+    Runnable = not finished AND (never leased OR lease expired).
+    A cancelled leader still runs while coalesced followers wait on it.
+    """
+    now = datetime.utcnow()
+    # Running = currently leased. Counted inside the claim so caps hold across workers.
+    running = aliased(Job)
+    is_running = (running.lease_owner.is_not(None), running.lease_expires_at >= now)
+    tenant_running = (
+        select(func.count()).where(running.tenant == Job.tenant, *is_running).scalar_subquery()
+    )
+    bulk_running = (
+        select(func.count()).where(running.priority < PRIORITY_INTERACTIVE, *is_running).scalar_subquery()
+    )
+    share_used = cast(tenant_running, Float) / _per_tenant(TENANT_WEIGHTS, 1.0)
+    next_job = (
+        select(Job.job_id)
+        .where(
+            or_(Job.status.not_in(TERMINAL_STATUSES), has_live_followers()),
+            Job.source_job_id.is_(None),  # followers ride on their leader's run
+            or_(Job.lease_expires_at.is_(None), Job.lease_expires_at < now),
+            tenant_running < _per_tenant(TENANT_CONCURRENCY_CAPS, TENANT_MAX_CONCURRENT),
+            or_(Job.priority >= PRIORITY_INTERACTIVE, bulk_running < BULK_MAX_CONCURRENT),
+        )
+        .order_by(Job.priority.desc(), share_used, Job.created_at)
+        .limit(1)
+        .scalar_subquery()
+    )
+    stmt = (
+        update(Job)
+        .where(Job.job_id == next_job)
+        .values(
+            lease_owner=owner,
+            lease_expires_at=now + timedelta(seconds=lease_seconds),
+            attempts=Job.attempts + 1,
+            updated_at=now,
+        )
+        .returning(Job.job_id, Job.product_name, Job.mau, Job.arpu, Job.attempts)
+    )
+    async with engine.begin() as conn:
+        row = (await conn.execute(stmt)).first()
+    if row is None:
+        return None
+
+    job = ClaimedJob(*row)
+    if job.attempts > JOB_MAX_ATTEMPTS:
+        # Poison job — it keeps killing workers. Park it as failed.
+        await _finish(job.job_id, owner, status=JobStatus.FAILED, stage="Failed",
+                      error=f"Gave up after {JOB_MAX_ATTEMPTS} attempts")
+        return None
+    return job
+
+async def renew_lease(job_id: str, owner: str, lease_seconds: float = JOB_LEASE_SECONDS) -> bool:
+    """Heartbeat. Returns False if the lease was lost to another worker."""
+    stmt = (
+        update(Job)
+        .where(Job.job_id == job_id, Job.lease_owner == owner)
+        .values(lease_expires_at=datetime.utcnow() + timedelta(seconds=lease_seconds))
+    )
+    async with engine.begin() as conn:
+        result = await conn.execute(stmt)
+    return result.rowcount > 0
+
+async def release_job(job_id: str, owner: str):
+    """Drop the lease once the pipeline has written a final status."""
+    await _finish(job_id, owner)
+
+async def _finish(job_id: str, owner: str, **fields):
+    stmt = (
+        update(Job)
+        .where(Job.job_id == job_id, Job.lease_owner == owner)
+        .values(lease_owner=None, lease_expires_at=None, **fields)
+    )
+    async with engine.begin() as conn:
+        result = await conn.execute(stmt)
+        if fields and result.rowcount:
+            # Attached followers share the leader's fate
+            await conn.execute(
+                update(Job)
+                .where(Job.source_job_id == job_id, Job.status != JobStatus.CANCELLED, Job.from_cache.is_(False))
+                .values(**fields)
+            )
@@ -0,0 +1,40 @@
+"""
+report_cache.py — LRU of hot report PDFs held by the gateway.
+Entries are keyed by the job that produced the report plus that job's
+updated_at, so a retried job never serves its previous PDF. Bounded by
+total bytes (REPORT_CACHE_MAX_BYTES, 0 disables).
+"""
+import os
+from collections import OrderedDict
+from pie_shared.http_ranges import strong_etag
+
+REPORT_CACHE_MAX_BYTES = int(os.getenv("REPORT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+class ReportCache:
+    def __init__(self, max_bytes: int = REPORT_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[tuple, tuple[bytes, str]] = OrderedDict()
+        self._size = 0
+
+    def get(self, key: tuple) -> tuple[bytes, str] | None:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: tuple, data: bytes) -> tuple[bytes, str]:
+        """Returns (data, etag); stores it unless it alone exceeds the budget."""
+        entry = (data, strong_etag(data))
+        if len(data) > self.max_bytes:
+            return entry
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._size -= len(old[0])
+        self._entries[key] = entry
+        self._size += len(data)
+        while self._size > self.max_bytes:
+            _, (evicted, _) = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+        return entry
+
+report_cache = ReportCache()
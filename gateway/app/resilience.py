@@ -0,0 +1,263 @@
+"""
+resilience.py — circuit breakers, retries and hedging for service calls.
+Every replica has a circuit breaker: after BREAKER_FAILURE_THRESHOLD
+consecutive failures (connection errors, timeouts, 5xx) it opens and calls
+fail at once with ServiceUnavailable for BREAKER_RESET_SECONDS, then one
+probe call decides whether it closes again. 4xx answers (e.g. the 409 of a
+cancelled job) are the caller's problem and never trip it.
+
+Idempotent calls retry with capped, jittered exponential backoff inside the
+caller's timeout, failing over to another replica where there is one. With
+HEDGING=1 and several replicas, a call still unanswered after the p95
+latency of that endpoint is sent to a second replica; the first answer wins.
+Other calls are sent once, but still move on to another replica when the
+connection itself failed, since then nothing reached the service.
+`json=` payloads are sent in the negotiated wire format (see wire.py); read
+answers with wire.read().
+"""
+import os
+import time
+import random
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+import httpx
+from .clients import get_client, SERVICE_REPLICAS, HTTP_CONNECT_TIMEOUT
+from pie_shared import wire
+from dotenv import load_dotenv
+load_dotenv()
+
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_SECONDS     = float(os.getenv("BREAKER_RESET_SECONDS", "30"))
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "3"))
+RETRY_BASE_DELAY   = float(os.getenv("RETRY_BASE_DELAY", "0.25"))
+RETRY_MAX_DELAY    = float(os.getenv("RETRY_MAX_DELAY", "5"))
+HEDGING = os.getenv("HEDGING", "0") == "1"
+# Hedge delay until an endpoint has enough samples for its own p95
+HEDGE_DEFAULT_DELAY = float(os.getenv("HEDGE_DEFAULT_DELAY", "5"))
+
+RETRYABLE_STATUS = {502, 503, 504}
+LATENCY_SAMPLES = 100
+MIN_SAMPLES_FOR_P95 = 20
+
+class ServiceUnavailable(RuntimeError):
+    """No replica of the service can take the call right now."""
+
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, threshold: int = BREAKER_FAILURE_THRESHOLD, reset_seconds: float = BREAKER_RESET_SECONDS):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+
+    def available(self) -> bool:
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_seconds:
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN:
+            return not self._probing
+        return self.state == self.CLOSED
+
+    def acquire(self) -> bool:
+        """Claim the call slot; while half-open only one probe is let through."""
+        if not self.available():
+            return False
+        if self.state == self.HALF_OPEN:
+            self._probing = True
+        return True
+
+    def release(self):
+        """The call ended without a verdict (e.g. it was cancelled)."""
+        self._probing = False
+
+    def retry_in(self) -> float:
+        return max(0.0, self.opened_at + self.reset_seconds - time.monotonic())
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._probing = False
+        if self.state == self.HALF_OPEN or self.failures >= self.threshold:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+_breakers: dict[str, CircuitBreaker] = {}
+_next_replica: dict[str, int] = {}
+_latencies: dict[tuple[str, str], deque] = {}
+
+def _breaker(service: str, replica: int) -> CircuitBreaker:
+    url = SERVICE_REPLICAS[service][replica]
+    breaker = _breakers.get(url)
+    if breaker is None:
+        breaker = _breakers[url] = CircuitBreaker()
+    return breaker
+
+def breaker_states() -> dict[str, str]:
+    return {url: b.state for url, b in _breakers.items()}
+
+def _replicas(service: str) -> list[int]:
+    """Replicas whose breaker lets a call through, round-robin from the last one used."""
+    count = len(SERVICE_REPLICAS[service])
+    start = _next_replica.get(service, 0)
+    _next_replica[service] = (start + 1) % count
+    order = [(start + i) % count for i in range(count)]
+    allowed = [i for i in order if _breaker(service, i).available()]
+    if not allowed:
+        retry_in = min(_breaker(service, i).retry_in() for i in order)
+        raise ServiceUnavailable(f"{service} unavailable (circuit open, retry in {retry_in:.0f}s)")
+    return allowed
+
+def _timeout(seconds: float) -> httpx.Timeout:
+    """A per-call budget that keeps the short connect timeout, so a dead replica fails over fast."""
+    return httpx.Timeout(seconds, connect=min(HTTP_CONNECT_TIMEOUT, seconds))
+
+def _is_failure(resp: httpx.Response) -> bool:
+    return resp.status_code >= 500
+
+def _hedge_delay(service: str, path: str) -> float:
+    samples = _latencies.get((service, path))
+    if not samples or len(samples) < MIN_SAMPLES_FOR_P95:
+        return HEDGE_DEFAULT_DELAY
+    ordered = sorted(samples)
+    return ordered[int(len(ordered) * 0.95) - 1]
+
+def _record_latency(service: str, path: str, seconds: float):
+    _latencies.setdefault((service, path), deque(maxlen=LATENCY_SAMPLES)).append(seconds)
+
+async def _attempt(service: str, replica: int, method: str, path: str, timeout: float, **kwargs) -> httpx.Response:
+    breaker = _breaker(service, replica)
+    if not breaker.acquire():
+        raise ServiceUnavailable(f"{service} unavailable (circuit open)")
+    started = time.monotonic()
+    try:
+        resp = await get_client(service, replica).request(method, path, timeout=_timeout(timeout), **kwargs)
+    except httpx.TransportError:
+        breaker.record_failure()
+        raise
+    except BaseException:
+        breaker.release()  # e.g. lost a hedge race
+        raise
+    if _is_failure(resp):
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+        _record_latency(service, path.split("?")[0], time.monotonic() - started)
+    return resp
+
+async def _connected(service: str, replicas: list[int], method: str, path: str, deadline: float, **kwargs):
+    """One attempt on the first replica that accepts the connection."""
+    for replica in replicas[:-1]:
+        try:
+            return await _attempt(service, replica, method, path, deadline - time.monotonic(), **kwargs)
+        except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+            print(f"[Resilience] {service} {path}: replica {replica} refused the connection ({type(e).__name__})")
+    return await _attempt(service, replicas[-1], method, path, deadline - time.monotonic(), **kwargs)
+
+async def _hedged(service: str, replicas: list[int], method: str, path: str, timeout: float, **kwargs):
+    """Primary on replicas[0]; a second copy on replicas[1] if the primary is slower than p95."""
+    primary = asyncio.create_task(_attempt(service, replicas[0], method, path, timeout, **kwargs))
+    pending = {primary}
+    result = None
+    try:
+        delay = min(_hedge_delay(service, path), timeout)
+        done, _ = await asyncio.wait(pending, timeout=delay)
+        if done or delay >= timeout:
+            return await primary
+        pending.add(asyncio.create_task(_attempt(service, replicas[1], method, path, timeout - delay, **kwargs)))
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None and not _is_failure(task.result()):
+                    return task.result()
+                result = task
+        return result.result()  # both failed: surface the last outcome
+    finally:
+        for task in pending:
+            task.cancel()
+
+async def request(
+    service: str, method: str, path: str, *, timeout: float, idempotent: bool = False, **kwargs
+) -> httpx.Response:
+    """
+    One logical call to `service`. `timeout` bounds the whole call, retries
+    included. Only idempotent calls are retried or hedged.
+    """
+    if "json" in kwargs:
+        kwargs.update(wire.request_content(kwargs.pop("json"), kwargs.pop("headers", None)))
+    deadline = time.monotonic() + timeout
+    attempts = RETRY_MAX_ATTEMPTS if idempotent else 1
+    for attempt in range(attempts):
+        replicas = _replicas(service)
+        remaining = deadline - time.monotonic()
+        try:
+            if idempotent and HEDGING and len(replicas) > 1:
+                resp = await _hedged(service, replicas, method, path, remaining, **kwargs)
+            else:
+                resp = await _connected(service, replicas, method, path, deadline, **kwargs)
+            if resp.status_code not in RETRYABLE_STATUS or attempt == attempts - 1:
+                return resp
+            reason = f"HTTP {resp.status_code}"
+        except httpx.TransportError as e:
+            if attempt == attempts - 1:
+                raise
+            reason = type(e).__name__
+
+        delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))  # full jitter
+        if time.monotonic() + delay >= deadline:
+            raise ServiceUnavailable(f"{service} {path} failed ({reason}) and the call is out of time")
+        print(f"[Resilience] {service} {path} failed ({reason}), retry {attempt + 1} in {delay:.2f}s")
+        await asyncio.sleep(delay)
+
+async def post(service: str, path: str, **kwargs) -> httpx.Response:
+    return await request(service, "POST", path, **kwargs)
+
+async def get(service: str, path: str, **kwargs) -> httpx.Response:
+    return await request(service, "GET", path, **kwargs)
+
+@asynccontextmanager
+async def stream(service: str, method: str, path: str, *, timeout: float, **kwargs):
+    """
+    Streaming call through the breaker. Fails over to another replica only
+    if the response never started — frames already consumed can't be replayed.
+    """
+    if "json" in kwargs:
+        kwargs.update(wire.request_content(kwargs.pop("json"), kwargs.pop("headers", None)))
+    for replica in _replicas(service):
+        breaker = _breaker(service, replica)
+        if not breaker.acquire():
+            continue
+        try:
+            cm = get_client(service, replica).stream(method, path, timeout=_timeout(timeout), **kwargs)
+            resp = await cm.__aenter__()
+        except httpx.ConnectError:
+            breaker.record_failure()
+            continue
+        except httpx.TransportError:
+            breaker.record_failure()
+            raise
+        except BaseException:
+            breaker.release()
+            raise
+        try:
+            if _is_failure(resp):
+                breaker.record_failure()
+            yield resp
+            if not _is_failure(resp):
+                breaker.record_success()
+        except httpx.TransportError:
+            breaker.record_failure()
+            raise
+        except BaseException:
+            breaker.release()
+            raise
+        finally:
+            await cm.__aexit__(None, None, None)
+        return
+    raise ServiceUnavailable(f"{service} unavailable (no replica accepted the connection)")
@@ -0,0 +1,51 @@
+"""
+result_cache.py — reuse finished analyses.
+A repeat /analyze for a product researched within RESULT_CACHE_TTL_SECONDS
+gets a job that is already `done` and points at the cached report/result.
+"""
+import os
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from .db import Job, JobStatus
+
+RESULT_CACHE_TTL_SECONDS = float(os.getenv("RESULT_CACHE_TTL_SECONDS", "21600"))  # 6h; 0 disables
+
+async def find_cached_result(db: AsyncSession, key: str) -> Job | None:
+    """
+    Freshest completed run for `key` that is still inside the TTL. Only leader
+    rows count: a cache hit's own row must not keep the TTL sliding.
+    """
+    if RESULT_CACHE_TTL_SECONDS <= 0:
+        return None
+    cutoff = datetime.utcnow() - timedelta(seconds=RESULT_CACHE_TTL_SECONDS)
+    result = await db.execute(
+        select(Job)
+        .where(
+            Job.dedup_key == key,
+            Job.source_job_id.is_(None),
+            Job.status == JobStatus.DONE,
+            Job.result_ref.is_not(None),
+            Job.updated_at >= cutoff,
+        )
+        .order_by(Job.updated_at.desc())
+        .limit(1)
+    )
+    return result.scalar_one_or_none()
+
+def job_from_cache(job_id: str, cached: Job, mau: int | None, arpu: float | None) -> Job:
+    """New `done` row sharing the cached run's report and result."""
+    return Job(
+        job_id=job_id,
+        product_name=cached.product_name,
+        status=JobStatus.DONE,
+        stage="Complete (cached)",
+        progress_pct=100,
+        report_path=cached.report_path,
+        result_ref=cached.result_ref,
+        mau=mau,
+        arpu=arpu,
+        dedup_key=cached.dedup_key,
+        source_job_id=cached.job_id,
+        from_cache=True,
+    )
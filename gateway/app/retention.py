@@ -0,0 +1,149 @@
+"""
+retention.py — keeps the gateway database small.
+Every RETENTION_INTERVAL_SECONDS the API process:
+  * drops checkpoints a completed run failed to clear (only failed/cancelled jobs can resume),
+  * archives finished jobs older than JOB_RETENTION_DAYS to zstd NDJSON files
+    under JOB_ARCHIVE_DIR and deletes them (with their spans), batch by batch,
+    one file per batch that only appears once the batch's DELETE committed,
+  * deletes blobs no job references any more.
+Report PDFs live in the analysis service, which prunes its own files.
+"""
+import os
+import json
+import asyncio
+import zstandard
+from pathlib import Path
+from datetime import datetime, timedelta
+from sqlalchemy import select, delete, text
+from .db import engine, Job, JobCheckpoint, JobSpan, JobStatus, Blob
+from .blob_store import REF_PREFIX
+from .storage import BASE_DIR
+
+JOB_RETENTION_DAYS         = float(os.getenv("JOB_RETENTION_DAYS", "30"))  # 0 disables
+RETENTION_INTERVAL_SECONDS = float(os.getenv("RETENTION_INTERVAL_SECONDS", "3600"))
+RETENTION_BATCH_SIZE       = int(os.getenv("RETENTION_BATCH_SIZE", "500"))
+JOB_ARCHIVE_DIR            = os.getenv("JOB_ARCHIVE_DIR", str(BASE_DIR / "data" / "archive"))  # empty = no archive
+
+FINISHED = [JobStatus.DONE, JobStatus.FAILED, JobStatus.CANCELLED]
+ARCHIVED_FIELDS = [
+    "job_id", "product_name", "status", "stage", "error", "report_path", "result_ref",
+    "mau", "arpu", "tenant", "priority", "batch_id", "source_job_id", "attempts",
+    "created_at", "updated_at",
+]
+# A blob is written just before the row that references it
+BLOB_GRACE = timedelta(hours=1)
+PENDING_SUFFIX = ".pending"
+
+async def compact_once() -> dict:
+    now = datetime.utcnow()
+    stats = {"checkpoints": 0, "jobs": 0, "blobs": 0}
+
+    async with engine.begin() as conn:
+        done_jobs = select(Job.job_id).where(Job.status == JobStatus.DONE)
+        result = await conn.execute(delete(JobCheckpoint).where(JobCheckpoint.job_id.in_(done_jobs)))
+        stats["checkpoints"] = result.rowcount
+
+    if JOB_RETENTION_DAYS > 0:
+        if JOB_ARCHIVE_DIR:
+            await _settle_pending_archives()
+        cutoff = now - timedelta(days=JOB_RETENTION_DAYS)
+        while True:
+            pending = None
+            # Short transactions so workers and API writes are never held up for long
+            try:
+                async with engine.begin() as conn:
+                    rows = (await conn.execute(
+                        select(*(getattr(Job, f) for f in ARCHIVED_FIELDS))
+                        .where(
+                            Job.status.in_(FINISHED),
+                            Job.updated_at < cutoff,
+                            Job.lease_owner.is_(None),
+                        )
+                        .order_by(Job.updated_at)
+                        .limit(RETENTION_BATCH_SIZE)
+                    )).mappings().all()
+                    if not rows:
+                        break
+                    job_ids = [r["job_id"] for r in rows]
+                    if JOB_ARCHIVE_DIR:
+                        pending = await asyncio.to_thread(_write_pending, rows, now)
+                    await conn.execute(delete(JobCheckpoint).where(JobCheckpoint.job_id.in_(job_ids)))
+                    await conn.execute(delete(JobSpan).where(JobSpan.job_id.in_(job_ids)))
+                    await conn.execute(delete(Job).where(Job.job_id.in_(job_ids)))
+            except BaseException:
+                # The rows are still there and will be archived again by the next pass
+                if pending:
+                    pending.unlink(missing_ok=True)
+                raise
+            if pending:
+                _publish(pending)
+            stats["jobs"] += len(job_ids)
+            if len(rows) < RETENTION_BATCH_SIZE:
+                break
+
+    async with engine.begin() as conn:
+        referenced = select(Job.result_ref).where(Job.result_ref.is_not(None))
+        result = await conn.execute(
+            delete(Blob).where(
+                (REF_PREFIX + Blob.digest).not_in(referenced),
+                Blob.created_at < now - BLOB_GRACE,
+            )
+        )
+        stats["blobs"] = result.rowcount
+        await conn.execute(text("PRAGMA optimize"))
+    return stats
+
+def _write_pending(rows, now: datetime) -> Path:
+    """
+    Write one batch as zstd NDJSON to `<name>.pending`; _publish renames it once
+    the batch's DELETE has committed. Named after the batch's largest job_id,
+    so re-archiving the same batch can only ever overwrite, never duplicate.
+    """
+    archive_dir = Path(JOB_ARCHIVE_DIR)
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    lines = "".join(json.dumps(dict(r), default=str) + "\n" for r in rows)
+    name = f"jobs-{now:%Y-%m-%d}-{max(r['job_id'] for r in rows)}.ndjson.zst"
+    pending = archive_dir / (name + PENDING_SUFFIX)
+    with open(pending, "wb") as f:
+        f.write(zstandard.ZstdCompressor().compress(lines.encode("utf-8")))
+        f.flush()
+        os.fsync(f.fileno())
+    return pending
+
+def _publish(pending: Path):
+    os.replace(pending, pending.with_name(pending.name[:-len(PENDING_SUFFIX)]))
+
+def _pending_job_ids(pending: Path) -> list[str]:
+    with open(pending, "rb") as f:
+        data = zstandard.ZstdDecompressor().decompressobj().decompress(f.read())
+    return [json.loads(line)["job_id"] for line in data.decode("utf-8").splitlines() if line]
+
+async def _settle_pending_archives():
+    """
+    Finish what a crash interrupted: a pending file whose rows are gone was
+    committed and is published; one whose rows remain is dropped and the rows
+    are archived again.
+    """
+    archive_dir = Path(JOB_ARCHIVE_DIR)
+    if not archive_dir.is_dir():
+        return
+    for pending in archive_dir.glob("*" + PENDING_SUFFIX):
+        job_ids = await asyncio.to_thread(_pending_job_ids, pending)
+        async with engine.connect() as conn:
+            still_there = await conn.scalar(select(Job.job_id).where(Job.job_id.in_(job_ids)).limit(1))
+        if still_there:
+            pending.unlink(missing_ok=True)
+        else:
+            _publish(pending)
+
+async def run_retention():
+    """Background loop started from the API lifespan."""
+    while True:
+        try:
+            stats = await compact_once()
+            if any(stats.values()):
+                print(f"[Retention] Removed {stats['jobs']} jobs, {stats['checkpoints']} checkpoints, "
+                      f"{stats['blobs']} blobs")
+        except Exception as e:
+            print(f"[Retention] Compaction failed: {e}")
+        await asyncio.sleep(RETENTION_INTERVAL_SECONDS)
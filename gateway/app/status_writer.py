@@ -0,0 +1,130 @@
+"""
+status_writer.py — write-behind buffer for job status.
+Pipeline status updates are merged per job in memory and written in one
+batched transaction every STATUS_FLUSH_INTERVAL seconds; final statuses
+are written immediately. The same tick refreshes an in-memory set of
+cancelled runs, so the pipeline's cancellation checks never touch SQLite.
+"""
+import os
+import asyncio
+from datetime import datetime
+from sqlalchemy import text, bindparam
+from .db import engine, JobStatus
+from .events import job_events
+
+STATUS_FLUSH_INTERVAL = float(os.getenv("STATUS_FLUSH_INTERVAL", "0.5"))
+
+# Fields SSE clients care about
+EVENT_FIELDS = ("status", "stage", "progress_pct", "error")
+
+class StatusWriter:
+    def __init__(self, flush_interval: float = STATUS_FLUSH_INTERVAL):
+        self.flush_interval = flush_interval
+        self._pending: dict[str, dict] = {}
+        self._watched: set[str] = set()
+        self._cancelled: set[str] = set()
+        self._flush_lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+
+    # ── writes ──────────────────────────────────────────────────────
+    async def update(self, job_id: str, **fields):
+        """Buffer a status change. Final statuses are flushed before returning."""
+        self._pending.setdefault(job_id, {}).update(fields)
+        job_events.publish(job_id, {k: v for k, v in fields.items() if k in EVENT_FIELDS})
+        if fields.get("status") in (JobStatus.DONE, JobStatus.FAILED):
+            await self.flush()
+        else:
+            self._ensure_running()
+
+    def discard(self, job_id: str):
+        """Forget unwritten changes (the job now belongs to another worker)."""
+        self._pending.pop(job_id, None)
+
+    async def flush(self):
+        async with self._flush_lock:
+            pending, self._pending = self._pending, {}
+            watched = list(self._watched)
+            if not pending and not watched:
+                return
+            try:
+                async with engine.begin() as conn:
+                    for job_id, fields in pending.items():
+                        await conn.execute(*_update_statement(job_id, fields))
+                    if watched:
+                        await self._refresh_cancelled(conn, watched)
+            except Exception:
+                # Put the batch back under anything newer and let the next tick retry
+                for job_id, fields in pending.items():
+                    self._pending[job_id] = {**fields, **self._pending.get(job_id, {})}
+                raise
+
+    # ── cancellation ────────────────────────────────────────────────
+    async def watch(self, job_id: str):
+        """Start tracking cancellation for a run owned by this process."""
+        self._watched.add(job_id)
+        await self.refresh(job_id)
+        self._ensure_running()
+
+    async def refresh(self, job_id: str):
+        """Re-read one run's cancellation flag now instead of waiting for the next tick."""
+        async with engine.connect() as conn:
+            await self._refresh_cancelled(conn, [job_id])
+
+    def unwatch(self, job_id: str):
+        self._watched.discard(job_id)
+        self._cancelled.discard(job_id)
+
+    def is_cancelled(self, job_id: str) -> bool:
+        return job_id in self._cancelled
+
+    async def _refresh_cancelled(self, conn, job_ids: list[str]):
+        # A coalesced run counts as cancelled once none of its rows is live
+        rows = await conn.execute(
+            text(
+                "SELECT COALESCE(source_job_id, job_id) AS run_id, "
+                "SUM(CASE WHEN status != :cancelled THEN 1 ELSE 0 END) AS live "
+                "FROM jobs WHERE (job_id IN :ids OR source_job_id IN :ids) AND NOT from_cache "
+                "GROUP BY run_id"
+            ).bindparams(bindparam("ids", expanding=True)),
+            {"ids": job_ids, "cancelled": JobStatus.CANCELLED.value},
+        )
+        for run_id, live in rows:
+            if run_id not in job_ids:
+                continue
+            if live:
+                self._cancelled.discard(run_id)
+            else:
+                self._cancelled.add(run_id)
+
+    # ── background flusher ──────────────────────────────────────────
+    def _ensure_running(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while self._pending or self._watched:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"[StatusWriter] Flush failed: {e}")
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+def _update_statement(job_id: str, fields: dict):
+    fields = {**fields, "updated_at": datetime.utcnow()}
+    set_clause = ", ".join(f"{k} = :{k}" for k in fields)
+    # Mirror onto coalesced followers, never resurrecting a cancelled row or touching a cache hit
+    return (
+        text(
+            f"UPDATE jobs SET {set_clause} "
+            "WHERE (job_id = :job_id OR (source_job_id = :job_id AND NOT from_cache)) AND status != :cancelled"
+        ),
+        {**fields, "job_id": job_id, "cancelled": JobStatus.CANCELLED.value},
+    )
+
+status_writer = StatusWriter()
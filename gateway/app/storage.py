@@ -0,0 +1,51 @@
+"""
+storage.py — the gateway's single SQLite engine.
+API handlers, queue workers, the status writer and checkpoints all share
+this pooled engine. Every pooled connection is tuned on connect:
+WAL so readers never block the writer, synchronous=NORMAL (safe under WAL),
+a busy timeout instead of instant "database is locked" errors, and a
+memory-mapped read path.
+"""
+import os
+from pathlib import Path
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from dotenv import load_dotenv
+load_dotenv()
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DATABASE_PATH = Path(os.getenv("GATEWAY_DB_PATH", BASE_DIR / "data" / "research.db"))
+DATABASE_PATH.parent.mkdir(parents=True, exist_ok=True)
+DATABASE_URL = f"sqlite+aiosqlite:///{DATABASE_PATH}"
+
+SQLITE_JOURNAL_MODE    = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS     = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE       = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB   = int(os.getenv("SQLITE_CACHE_SIZE_KB", "16384"))
+SQLITE_POOL_SIZE       = int(os.getenv("SQLITE_POOL_SIZE", "8"))
+SQLITE_MAX_OVERFLOW    = int(os.getenv("SQLITE_MAX_OVERFLOW", "8"))
+
+def _tune_connection(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")  # negative = KiB
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+def create_engine():
+    engine = create_async_engine(
+        DATABASE_URL,
+        echo=False,
+        pool_size=SQLITE_POOL_SIZE,
+        max_overflow=SQLITE_MAX_OVERFLOW,
+        connect_args={"timeout": SQLITE_BUSY_TIMEOUT_MS / 1000},
+    )
+    event.listen(engine.sync_engine, "connect", _tune_connection)
+    return engine
+
+engine = create_engine()
+AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False)
@@ -0,0 +1,83 @@
+"""
+trace_store.py — persists a pipeline run's spans and builds its waterfall.
+When a run ends, the gateway's own spans are combined with the spans each
+service buffered for the trace (GET /traces/{trace_id}) and written to
+`job_spans`.
+"""
+import asyncio
+from collections import defaultdict
+from sqlalchemy import select, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from .db import engine, JobSpan
+from .clients import replica_clients, SERVICE_REPLICAS
+from pie_shared.tracing import drain
+
+async def persist_trace(job_id: str, trace_id: str):
+    """Best effort — a missing service only leaves a gap in the waterfall."""
+    spans = drain(trace_id)
+    # Retries and hedged calls may have landed on any replica
+    targets = [service for service in SERVICE_REPLICAS for _ in SERVICE_REPLICAS[service]]
+    results = await asyncio.gather(
+        *(c.get(f"/traces/{trace_id}", timeout=5.0) for s in SERVICE_REPLICAS for c in replica_clients(s)),
+        return_exceptions=True,
+    )
+    for service, resp in zip(targets, results):
+        if isinstance(resp, Exception) or resp.status_code != 200:
+            print(f"[Trace] No spans from {service} for {trace_id}: {resp}")
+            continue
+        spans.extend(resp.json()["spans"])
+    if not spans:
+        return
+    async with engine.begin() as conn:
+        await conn.execute(insert(JobSpan), [{**s, "job_id": job_id, "trace_id": trace_id} for s in spans])
+
+async def load_waterfall(db: AsyncSession, job_id: str, trace_id: str | None = None) -> dict | None:
+    """Spans of one run (the latest unless `trace_id` is given) laid out from the run's start."""
+    if trace_id is None:
+        trace_id = await db.scalar(
+            select(JobSpan.trace_id).where(JobSpan.job_id == job_id).order_by(JobSpan.start.desc()).limit(1)
+        )
+    if trace_id is None:
+        return None
+    rows = (await db.execute(
+        select(JobSpan).where(JobSpan.job_id == job_id, JobSpan.trace_id == trace_id).order_by(JobSpan.start)
+    )).scalars().all()
+    if not rows:
+        return None
+
+    origin = rows[0].start
+    end = max(r.start + r.duration_ms / 1000 for r in rows)
+    depth = {}
+    by_id = {r.span_id: r for r in rows}
+    for r in rows:
+        parent = by_id.get(r.parent_id)
+        depth[r.span_id] = depth.get(parent.span_id, -1) + 1 if parent else 0
+
+    # Leaf spans are where the time is actually spent
+    parents = {r.parent_id for r in rows}
+    self_time = defaultdict(float)
+    for r in rows:
+        if r.span_id not in parents:
+            self_time[r.name] += r.duration_ms
+
+    return {
+        "job_id": job_id,
+        "trace_id": trace_id,
+        "total_ms": round((end - origin) * 1000, 2),
+        "spans": [
+            {
+                "service": r.service,
+                "name": r.name,
+                "depth": depth[r.span_id],
+                "offset_ms": round((r.start - origin) * 1000, 2),
+                "duration_ms": r.duration_ms,
+                "attrs": r.attrs or {},
+            }
+            for r in rows
+        ],
+        "slowest_leaves": sorted(
+            ({"name": n, "duration_ms": round(ms, 2)} for n, ms in self_time.items()),
+            key=lambda x: x["duration_ms"],
+            reverse=True,
+        )[:10],
+    }
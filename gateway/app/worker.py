@@ -0,0 +1,122 @@
+"""
+worker.py — queue consumer.
+Runs a fixed number of worker slots, each leasing one job at a time from the
+`jobs` table and running the pipeline for it. Slots stop claiming while a
+downstream service reports itself saturated (see admission.py).
+
+Standalone:  python -m app.worker
+Embedded:    started from the API lifespan unless GATEWAY_EMBEDDED_WORKER=0
+"""
+import os
+import uuid
+import socket
+import asyncio
+import signal
+from .db import init_db
+from .queue_manager import claim_next_job, renew_lease, release_job, ClaimedJob, JOB_LEASE_SECONDS
+from .pipeline import run_pipeline
+from .clients import close_clients
+from .status_writer import status_writer
+from .admission import admission
+from dotenv import load_dotenv
+load_dotenv()
+
+WORKER_CONCURRENCY  = int(os.getenv("WORKER_CONCURRENCY", "4"))
+QUEUE_POLL_INTERVAL = float(os.getenv("QUEUE_POLL_INTERVAL", "1.0"))
+
+class Worker:
+    def __init__(
+        self,
+        concurrency: int = WORKER_CONCURRENCY,
+        lease_seconds: float = JOB_LEASE_SECONDS,
+        poll_interval: float = QUEUE_POLL_INTERVAL,
+    ):
+        self.concurrency = concurrency
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._stopping = asyncio.Event()
+
+    async def run(self):
+        print(f"[Worker {self.worker_id}] Starting {self.concurrency} slots")
+        admission.start()
+        slots = [asyncio.create_task(self._slot(i)) for i in range(self.concurrency)]
+        try:
+            await asyncio.gather(*slots)
+        finally:
+            for s in slots:
+                s.cancel()
+
+    def stop(self):
+        """Stop claiming new jobs; running jobs finish (or their lease expires)."""
+        self._stopping.set()
+
+    async def _slot(self, slot_no: int):
+        owner = f"{self.worker_id}/{slot_no}"
+        while not self._stopping.is_set():
+            if admission.saturated():
+                # Backpressure: leave jobs queued rather than slow down the running ones
+                await self._idle()
+                continue
+            try:
+                job = await claim_next_job(owner, self.lease_seconds)
+            except Exception as e:
+                print(f"[Worker {owner}] Claim failed: {e}")
+                job = None
+
+            if job is None:
+                await self._idle()
+                continue
+
+            await self._execute(owner, job)
+
+    async def _idle(self):
+        try:
+            await asyncio.wait_for(self._stopping.wait(), timeout=self.poll_interval)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _execute(self, owner: str, job: ClaimedJob):
+        print(f"[Worker {owner}] Claimed {job.job_id} (attempt {job.attempts})")
+        pipeline = asyncio.create_task(run_pipeline(job.job_id, job.product_name, job.mau, job.arpu))
+        heartbeat = asyncio.create_task(self._heartbeat(owner, job.job_id, pipeline))
+        try:
+            await pipeline
+        except asyncio.CancelledError:
+            if not pipeline.cancelled():
+                pipeline.cancel()  # worker shutting down; lease release lets another worker resume
+                raise
+            print(f"[Worker {owner}] Abandoned {job.job_id}")
+        except Exception as e:
+            # run_pipeline already marked the job failed
+            print(f"[Worker {owner}] Job {job.job_id} failed: {e}")
+        finally:
+            heartbeat.cancel()
+            await release_job(job.job_id, owner)
+
+    async def _heartbeat(self, owner: str, job_id: str, pipeline: asyncio.Task):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                if not await renew_lease(job_id, owner, self.lease_seconds):
+                    # Someone else owns the job now; stop doing duplicate work
+                    print(f"[Worker {owner}] Lost lease on {job_id}")
+                    pipeline.cancel()
+                    return
+            except Exception as e:
+                print(f"[Worker {owner}] Heartbeat failed for {job_id}: {e}")
+
+async def _main():
+    await init_db()
+    worker = Worker()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+    try:
+        await worker.run()
+    finally:
+        await status_writer.close()
+        await close_clients()
+
+if __name__ == "__main__":
+    asyncio.run(_main())
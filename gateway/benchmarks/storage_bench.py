@@ -0,0 +1,86 @@
+"""
+storage_bench.py — concurrent job status reads vs writes on the shared engine.
+
+    cd gateway
+    python -m benchmarks.storage_bench
+    SQLITE_JOURNAL_MODE=DELETE SQLITE_SYNCHRONOUS=FULL python -m benchmarks.storage_bench
+
+Runs against a throwaway database file; BENCH_* variables size the run.
+"""
+import os
+import time
+import uuid
+import random
+import asyncio
+import tempfile
+import statistics
+
+# Must be set before app.storage builds the engine
+os.environ["GATEWAY_DB_PATH"] = os.path.join(tempfile.mkdtemp(), "bench.db")
+
+from sqlalchemy import select, update
+from app.db import init_db, engine, AsyncSessionLocal, Job, JobStatus
+from app.storage import SQLITE_JOURNAL_MODE, SQLITE_SYNCHRONOUS
+
+BENCH_JOBS     = int(os.getenv("BENCH_JOBS", "500"))
+BENCH_READERS  = int(os.getenv("BENCH_READERS", "16"))
+BENCH_WRITERS  = int(os.getenv("BENCH_WRITERS", "4"))
+BENCH_SECONDS  = float(os.getenv("BENCH_SECONDS", "5"))
+
+async def _seed() -> list[str]:
+    job_ids = [str(uuid.uuid4()) for _ in range(BENCH_JOBS)]
+    async with AsyncSessionLocal() as db:
+        db.add_all(Job(job_id=j, product_name=f"product {i}", status=JobStatus.PROCESSING)
+                   for i, j in enumerate(job_ids))
+        await db.commit()
+    return job_ids
+
+async def _reader(job_ids: list[str], deadline: float, latencies: list[float]):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                select(Job.status, Job.stage, Job.progress_pct)
+                .where(Job.job_id == random.choice(job_ids))
+            )
+        latencies.append(time.perf_counter() - start)
+
+async def _writer(job_ids: list[str], deadline: float, latencies: list[float]):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        async with engine.begin() as conn:
+            await conn.execute(
+                update(Job)
+                .where(Job.job_id == random.choice(job_ids))
+                .values(stage="Benchmarking", progress_pct=random.randint(0, 100))
+            )
+        latencies.append(time.perf_counter() - start)
+
+def _report(name: str, latencies: list[float]):
+    if not latencies:
+        print(f"{name:>7}: no operations completed")
+        return
+    ms = sorted(l * 1000 for l in latencies)
+    p99 = ms[min(len(ms) - 1, int(len(ms) * 0.99))]
+    print(f"{name:>7}: {len(ms) / BENCH_SECONDS:8.0f} ops/s   "
+          f"p50 {statistics.median(ms):6.2f} ms   p99 {p99:6.2f} ms")
+
+async def main():
+    await init_db()
+    job_ids = await _seed()
+    reads: list[float] = []
+    writes: list[float] = []
+    deadline = time.perf_counter() + BENCH_SECONDS
+    await asyncio.gather(
+        *(_reader(job_ids, deadline, reads) for _ in range(BENCH_READERS)),
+        *(_writer(job_ids, deadline, writes) for _ in range(BENCH_WRITERS)),
+    )
+    await engine.dispose()
+
+    print(f"journal_mode={SQLITE_JOURNAL_MODE} synchronous={SQLITE_SYNCHRONOUS} "
+          f"readers={BENCH_READERS} writers={BENCH_WRITERS} seconds={BENCH_SECONDS:g}")
+    _report("reads", reads)
+    _report("writes", writes)
+
+if __name__ == "__main__":
+    asyncio.run(main())
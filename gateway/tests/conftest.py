@@ -0,0 +1,37 @@
+import os
+import sys
+import asyncio
+import tempfile
+from pathlib import Path
+import pytest
+
+# Before any app import: a throwaway database and no background worker
+os.environ["GATEWAY_DB_PATH"] = str(Path(tempfile.mkdtemp(prefix="gateway-tests-")) / "research.db")
+os.environ["GATEWAY_EMBEDDED_WORKER"] = "0"
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.db import Base, engine, init_db  # noqa: E402
+
+@pytest.fixture
+def run():
+    """Run a coroutine on a fresh schema in its own event loop."""
+    def _run(coro):
+        async def main():
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.drop_all)
+            await init_db()
+            try:
+                return await coro
+            finally:
+                await engine.dispose()  # pooled connections belong to this loop
+        return asyncio.run(main())
+    return _run
+
+@pytest.fixture
+def no_admission(monkeypatch):
+    """Admit every submission regardless of downstream load."""
+    from app import main
+
+    async def admit(*args, **kwargs):
+        return None
+    monkeypatch.setattr(main.admission, "admit", admit)
@@ -0,0 +1,21 @@
+"""Small async helpers shared by the gateway tests."""
+import httpx
+from sqlalchemy import select
+from app import main
+from app.db import AsyncSessionLocal, Job
+
+def api_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://gateway")
+
+async def add_jobs(*jobs: Job):
+    async with AsyncSessionLocal() as db:
+        db.add_all(jobs)
+        await db.commit()
+
+async def all_jobs() -> list[Job]:
+    async with AsyncSessionLocal() as db:
+        return list((await db.execute(select(Job).order_by(Job.created_at))).scalars())
+
+async def get_job(job_id: str) -> Job:
+    async with AsyncSessionLocal() as db:
+        return await db.get(Job, job_id)
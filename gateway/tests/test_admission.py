@@ -0,0 +1,71 @@
+import time
+from datetime import datetime, timedelta
+import pytest
+from fastapi import HTTPException
+from app import admission as admission_module
+from app.admission import AdmissionController
+from app.db import AsyncSessionLocal, Job
+from app.queue_manager import PRIORITY_BULK, PRIORITY_INTERACTIVE
+from helpers import api_client, add_jobs
+
+@pytest.fixture
+def controller(monkeypatch):
+    monkeypatch.setattr(admission_module, "ADMISSION_WORKER_SLOTS", 2)
+    monkeypatch.setattr(admission_module, "ADMISSION_DEFAULT_JOB_SECONDS", 100.0)
+    monkeypatch.setattr(admission_module, "ADMISSION_MAX_WAIT_SECONDS", 150.0)
+    return AdmissionController()
+
+def _queued(job_id: str, priority: int = PRIORITY_INTERACTIVE) -> Job:
+    return Job(job_id=job_id, product_name=job_id, dedup_key=f"{job_id}||", priority=priority)
+
+def _leased(job_id: str, expires_in: timedelta) -> Job:
+    return Job(job_id=job_id, product_name=job_id, dedup_key=f"{job_id}||", status="analyzing",
+               lease_owner="w1", lease_expires_at=datetime.utcnow() + expires_in)
+
+async def _estimate(controller, priority: int = PRIORITY_INTERACTIVE, count: int = 1) -> float:
+    async with AsyncSessionLocal() as db:
+        return await controller.estimate(db, priority, count)
+
+def test_free_slots_mean_no_wait(run, controller):
+    async def scenario():
+        await add_jobs(_leased("running", timedelta(minutes=5)))
+        return await _estimate(controller)
+
+    assert run(scenario()) == 0
+
+def test_wait_grows_by_one_job_length_per_full_wave(run, controller):
+    async def scenario():
+        await add_jobs(_leased("r1", timedelta(minutes=5)), _leased("r2", timedelta(minutes=5)), _queued("q1"),
+                       _queued("bulk", PRIORITY_BULK))
+        return await _estimate(controller), await _estimate(controller, PRIORITY_BULK), await _estimate(controller, count=4)
+
+    # interactive: 2 running + 1 queued + 1 new over 2 slots; bulk also waits behind the queued bulk job
+    assert run(scenario()) == (100.0, 200.0, 300.0)
+
+def test_expired_leases_do_not_count_as_running(run, controller):
+    async def scenario():
+        await add_jobs(_leased("dead-1", -timedelta(minutes=1)), _leased("dead-2", -timedelta(minutes=1)))
+        return await _estimate(controller)
+
+    assert run(scenario()) == 0
+
+def test_saturated_service_holds_everything_back(run, controller):
+    controller._snapshots[("analysis", "http://a1")] = (time.monotonic(), {"saturation": 1.5})
+    assert run(_estimate(controller)) == 150.0
+
+def test_too_long_a_wait_is_a_503_with_retry_after(run, monkeypatch):
+    monkeypatch.setattr(admission_module, "ADMISSION_WORKER_SLOTS", 1)
+    monkeypatch.setattr(admission_module, "ADMISSION_MAX_WAIT_SECONDS", 30.0)
+    monkeypatch.setattr(admission_module.admission, "_job_seconds", (time.monotonic(), 100.0))
+
+    async def scenario():
+        await add_jobs(_leased("running", timedelta(minutes=5)))
+        async with AsyncSessionLocal() as db:
+            with pytest.raises(HTTPException) as rejected:
+                await admission_module.admission.admit(db, PRIORITY_INTERACTIVE)
+        async with api_client() as client:
+            return rejected.value, await client.post("/analyze", json={"product_name": "Notion"})
+
+    rejected, resp = run(scenario())
+    assert (rejected.status_code, rejected.headers["Retry-After"]) == (503, "70")
+    assert resp.status_code == 503 and resp.headers["retry-after"] == "70"
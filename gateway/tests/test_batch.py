@@ -0,0 +1,79 @@
+import asyncio
+import httpx
+import pytest
+from app import classify_batcher as batcher_module
+from app.classify_batcher import ClassifyBatcher
+from app.db import JobStatus
+from app.queue_manager import PRIORITY_BULK
+from helpers import api_client, all_jobs
+
+def test_batch_queues_every_product_and_coalesces_repeats(run, no_admission):
+    async def scenario():
+        async with api_client() as client:
+            resp = await client.post("/analyze/batch", json={"products": [
+                {"product_name": "Notion"}, {"product_name": "Linear"}, {"product_name": "notion"},
+            ]})
+            batch = resp.json()
+            status = (await client.get(f"/batch/{batch['batch_id']}")).json()
+            missing = await client.get("/batch/nope")
+        return batch, status, missing.status_code, await all_jobs()
+
+    batch, status, missing, jobs = run(scenario())
+    assert len(batch["jobs"]) == 3
+    assert all(j.batch_id == batch["batch_id"] and j.priority == PRIORITY_BULK for j in jobs)
+    assert len([j for j in jobs if j.source_job_id is None]) == 2  # the repeat rides on the first Notion
+    assert status["total"] == 3 and status["finished"] == 0
+    assert status["counts"] == {JobStatus.QUEUED.value: 3}
+    assert missing == 404
+
+@pytest.fixture
+def classifier(monkeypatch):
+    """POST /classify/batch answered in-process; returns the request bodies sent."""
+    sent = []
+
+    async def post(service, path, json=None, headers=None, timeout=None, idempotent=False):
+        sent.append(json)
+        results = [
+            {"cancelled": True} if item["job_id"] == "cancelled" else {"job_id": item["job_id"], "reviews": item["reviews"]}
+            for item in json["items"]
+        ]
+        return httpx.Response(200, json={"results": results}, request=httpx.Request("POST", f"http://{service}{path}"))
+
+    monkeypatch.setattr(batcher_module.resilience, "post", post)
+    return sent
+
+def test_calls_within_the_window_share_one_request(classifier):
+    batcher = ClassifyBatcher(window_ms=50, max_reviews=100)
+
+    async def scenario():
+        return await asyncio.gather(
+            batcher.classify("a", "Notion", [{"text": "a"}]),
+            batcher.classify("b", "Linear", [{"text": "b"}]),
+        )
+
+    a, b = asyncio.run(scenario())
+    assert len(classifier) == 1
+    assert [item["job_id"] for item in classifier[0]["items"]] == ["a", "b"]
+    assert (a["reviews"], b["reviews"]) == ([{"text": "a"}], [{"text": "b"}])
+
+def test_a_full_batch_goes_out_without_waiting(classifier):
+    batcher = ClassifyBatcher(window_ms=10_000, max_reviews=2)
+
+    async def scenario():
+        return await asyncio.wait_for(batcher.classify("a", "Notion", [{"text": "1"}, {"text": "2"}]), timeout=1)
+
+    assert asyncio.run(scenario())["job_id"] == "a"
+
+def test_a_cancelled_item_fails_alone(classifier):
+    batcher = ClassifyBatcher(window_ms=10, max_reviews=100)
+
+    async def scenario():
+        return await asyncio.gather(
+            batcher.classify("cancelled", "Notion", [{"text": "a"}]),
+            batcher.classify("b", "Linear", [{"text": "b"}]),
+            return_exceptions=True,
+        )
+
+    cancelled, ok = asyncio.run(scenario())
+    assert isinstance(cancelled, RuntimeError)
+    assert ok["job_id"] == "b"
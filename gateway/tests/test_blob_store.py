@@ -0,0 +1,58 @@
+import pytest
+from sqlalchemy import select, func
+from app.blob_store import put_json, get_json
+from app.db import AsyncSessionLocal, Blob, Job
+from helpers import api_client, add_jobs
+
+RESULT = {"risk": {"score": 0.4}, "competitor": ["Coda", "Obsidian"], "sentiment": {"overall": "mixed ✓"}}
+
+def test_equal_values_are_stored_once(run):
+    async def scenario():
+        first = await put_json(RESULT)
+        second = await put_json(dict(reversed(RESULT.items())))  # key order doesn't matter
+        async with AsyncSessionLocal() as db:
+            blobs = await db.scalar(select(func.count()).select_from(Blob))
+        return first, second, blobs, await get_json(first)
+
+    first, second, blobs, value = run(scenario())
+    assert first == second and first.startswith("sha256:")
+    assert blobs == 1
+    assert value == RESULT
+
+def test_unknown_and_malformed_references(run):
+    async def scenario():
+        missing = await get_json("sha256:" + "0" * 64)
+        with pytest.raises(ValueError):
+            await get_json("not-a-ref")
+        return missing
+
+    assert run(scenario()) is None
+
+def _result_api(fields: str | None = None, job_id: str = "j"):
+    async def scenario():
+        await add_jobs(
+            Job(job_id="j", product_name="n", status="done", result_ref=await put_json(RESULT)),
+            Job(job_id="legacy", product_name="n", status="done", result_json='{"risk": {"score": 1}}'),
+            Job(job_id="pending", product_name="n"),
+        )
+        async with api_client() as client:
+            return await client.get(f"/result/{job_id}", params={"fields": fields} if fields else None)
+    return scenario()
+
+def test_result_returns_the_stored_value(run):
+    assert run(_result_api()).json() == RESULT
+
+def test_fields_selects_top_level_keys(run):
+    assert run(_result_api("risk, competitor")).json() == {"risk": RESULT["risk"], "competitor": RESULT["competitor"]}
+
+def test_unknown_field_is_a_400_listing_the_available_ones(run):
+    resp = run(_result_api("risk,price"))
+    assert resp.status_code == 400
+    assert "price" in resp.json()["detail"] and "sentiment" in resp.json()["detail"]
+
+def test_rows_from_before_the_blob_store_still_read(run):
+    assert run(_result_api(job_id="legacy")).json() == {"risk": {"score": 1}}
+
+def test_result_of_unfinished_or_unknown_job(run):
+    assert run(_result_api(job_id="pending")).status_code == 400
+    assert run(_result_api(job_id="nope")).status_code == 404
@@ -0,0 +1,93 @@
+import asyncio
+import httpx
+import pytest
+from app import clients, main
+from app.db import Job, JobStatus
+from helpers import api_client, add_jobs, all_jobs, get_job
+
+pytestmark = pytest.mark.usefixtures("no_admission")
+
+@pytest.fixture
+def downstream(monkeypatch):
+    """Run ids whose in-flight service calls were told to stop."""
+    cancelled = []
+
+    async def cancel_downstream(run_id):
+        cancelled.append(run_id)
+    monkeypatch.setattr(main, "cancel_downstream", cancel_downstream)
+    return cancelled
+
+def _leader_and_follower(**leader_fields) -> tuple[Job, Job]:
+    leader = Job(job_id="leader", product_name="Notion", dedup_key="notion||", status="analyzing",
+                 stage="Running agents", progress_pct=60, lease_owner="w1", **leader_fields)
+    follower = Job(job_id="follower", product_name="Notion", dedup_key="notion||", status="analyzing",
+                   stage="Running agents", progress_pct=60, source_job_id="leader")
+    return leader, follower
+
+def test_cancelling_a_lone_job_stops_its_downstream_work(run, downstream):
+    async def scenario():
+        await add_jobs(Job(job_id="j", product_name="n", dedup_key="n||"))
+        async with api_client() as client:
+            resp = await client.post("/cancel/j")
+        return resp.json(), await get_job("j")
+
+    body, job = run(scenario())
+    assert body["status"] == job.status == JobStatus.CANCELLED
+    assert downstream == ["j"]
+
+def test_shared_run_stops_only_when_its_last_job_is_cancelled(run, downstream):
+    async def scenario():
+        await add_jobs(*_leader_and_follower())
+        async with api_client() as client:
+            await client.post("/cancel/leader")
+            after_leader = list(downstream)
+            await client.post("/cancel/follower")
+        return after_leader
+
+    assert run(scenario()) == []
+    assert downstream == ["leader"]
+
+def test_new_submission_joins_a_cancelled_leaders_running_job(run, downstream):
+    async def scenario():
+        await add_jobs(*_leader_and_follower())
+        async with api_client() as client:
+            await client.post("/cancel/leader")
+            resp = await client.post("/analyze", json={"product_name": "Notion"})
+        return resp.json(), await all_jobs()
+
+    body, jobs = run(scenario())
+    assert body["message"].startswith("Attached")
+    assert [j.job_id for j in jobs if j.source_job_id is None] == ["leader"]  # no second run
+    new = next(j for j in jobs if j.job_id == body["job_id"])
+    assert new.source_job_id == "leader"
+    assert (new.status, new.progress_pct) == ("analyzing", 60)  # the run's state, not "cancelled"
+
+def test_retrying_a_cancelled_leader_rejoins_its_running_job(run, downstream):
+    async def scenario():
+        await add_jobs(*_leader_and_follower())
+        async with api_client() as client:
+            await client.post("/cancel/leader")
+            resp = await client.post("/retry/leader")
+        return resp.json(), await get_job("leader")
+
+    body, leader = run(scenario())
+    assert body["status"] == leader.status == "analyzing"
+    assert leader.lease_owner == "w1"  # not handed to a second worker
+
+def test_cancel_reaches_every_replica_of_every_service(monkeypatch):
+    monkeypatch.setattr(clients, "SERVICE_REPLICAS", {"scraper": ["http://s1", "http://s2"], "analysis": ["http://a1"]})
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.host == "s2":
+            raise httpx.ConnectError("down", request=request)  # one dead replica doesn't stop the rest
+        seen.append(f"{request.url.host}{request.url.path}")
+        return httpx.Response(200, json={"cancelled": 1})
+
+    def replica_clients(service):
+        return [httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url=url)
+                for url in clients.SERVICE_REPLICAS[service]]
+    monkeypatch.setattr(clients, "replica_clients", replica_clients)
+
+    asyncio.run(clients.cancel_downstream("run-1"))
+    assert sorted(seen) == ["a1/cancel/run-1", "s1/cancel/run-1"]
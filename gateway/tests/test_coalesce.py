@@ -0,0 +1,40 @@
+import asyncio
+import pytest
+from app import main
+from helpers import api_client, all_jobs
+
+pytestmark = pytest.mark.usefixtures("no_admission")
+
+def test_repeat_submission_attaches_to_running_job(run):
+    async def scenario():
+        async with api_client() as client:
+            first = await client.post("/analyze", json={"product_name": "Notion"})
+            second = await client.post("/analyze", json={"product_name": "  notion "})
+        return first.json(), second.json(), await all_jobs()
+
+    first, second, jobs = run(scenario())
+    assert first["status"] == "queued"
+    assert second["message"].startswith("Attached")
+    leader, follower = jobs
+    assert follower.source_job_id == leader.job_id == first["job_id"]
+
+def test_concurrent_submissions_start_one_run(run, monkeypatch):
+    lookup = main.find_inflight_leader
+
+    async def slow_lookup(db, key):
+        # Every submission misses the leader, as when they race
+        leader = await lookup(db, key)
+        await asyncio.sleep(0.1)
+        return leader
+    monkeypatch.setattr(main, "find_inflight_leader", slow_lookup)
+
+    async def scenario():
+        async with api_client() as client:
+            responses = await asyncio.gather(*(client.post("/analyze", json={"product_name": "Notion"}) for _ in range(3)))
+        return [r.status_code for r in responses], await all_jobs()
+
+    codes, jobs = run(scenario())
+    assert codes == [200, 200, 200]
+    leaders = [j for j in jobs if j.source_job_id is None]
+    assert len(leaders) == 1
+    assert all(j.source_job_id == leaders[0].job_id for j in jobs if j is not leaders[0])
@@ -0,0 +1,38 @@
+import pytest
+from sqlalchemy import inspect, text
+from app.db import AsyncSessionLocal, Base, Job, engine, init_db
+
+async def _columns(table: str) -> set[str]:
+    async with engine.connect() as conn:
+        return await conn.run_sync(lambda c: {col["name"] for col in inspect(c).get_columns(table)})
+
+def test_init_db_adds_new_columns_to_an_old_table(run):
+    async def scenario():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.execute(text(
+                "CREATE TABLE jobs (job_id VARCHAR PRIMARY KEY, product_name VARCHAR, status VARCHAR,"
+                " stage VARCHAR, progress_pct INTEGER, created_at DATETIME, updated_at DATETIME)"
+            ))
+            await conn.execute(text("INSERT INTO jobs (job_id, product_name, status) VALUES ('old', 'x', 'done')"))
+        await init_db()
+        async with engine.connect() as conn:
+            row = (await conn.execute(text("SELECT attempts, tenant, from_cache FROM jobs"))).one()
+        return await _columns("jobs"), row
+
+    columns, row = run(scenario())
+    assert {"lease_owner", "dedup_key", "source_job_id", "priority", "batch_id"} <= columns
+    assert tuple(row) == (0, "anonymous", 0)
+
+def test_init_db_refuses_to_start_without_the_leader_index(run):
+    async def scenario():
+        async with engine.begin() as conn:
+            await conn.execute(text("DROP INDEX ux_jobs_inflight_leader"))
+        # Two unfinished leaders for one product, as a racy older build could leave behind
+        async with AsyncSessionLocal() as db:
+            db.add_all([Job(job_id=job_id, product_name="x", dedup_key="x||") for job_id in ("a", "b")])
+            await db.commit()
+        with pytest.raises(RuntimeError, match="ux_jobs_inflight_leader"):
+            await init_db()
+
+    run(scenario())
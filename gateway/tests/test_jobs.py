@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta
+from app.db import Job
+from helpers import api_client, add_jobs
+
+T0 = datetime(2026, 1, 1)
+
+async def _seed():
+    # Distinct mau per job keeps the in-flight keys apart; j4 and j5 share a created_at, so the page boundary has to break the tie on job_id
+    await add_jobs(*(
+        Job(job_id=f"j{i}", product_name="Notion" if i % 2 else "Linear",
+            dedup_key=f"{'notion' if i % 2 else 'linear'}|{i}|", status="done" if i < 3 else "queued",
+            created_at=T0 + timedelta(minutes=min(i, 4)))
+        for i in range(6)
+    ))
+
+async def _list(client, **params):
+    resp = await client.get("/jobs", params=params)
+    assert resp.status_code == 200, resp.text
+    return resp.json()
+
+def test_pages_walk_every_job_newest_first(run):
+    async def scenario():
+        await _seed()
+        seen, cursor = [], None
+        async with api_client() as client:
+            while True:
+                page = await _list(client, limit=2, **({"cursor": cursor} if cursor else {}))
+                seen.append([j["job_id"] for j in page["jobs"]])
+                cursor = page["next_cursor"]
+                if not cursor:
+                    return seen
+
+    assert run(scenario()) == [["j5", "j4"], ["j3", "j2"], ["j1", "j0"]]
+
+def test_filters_combine(run):
+    async def scenario():
+        await _seed()
+        async with api_client() as client:
+            return (
+                await _list(client, status=["done", "failed"], product="notion"),
+                await _list(client, created_after=(T0 + timedelta(minutes=2)).isoformat(),
+                            created_before=(T0 + timedelta(minutes=4)).isoformat()),
+            )
+
+    by_status_and_product, by_date = run(scenario())
+    assert [j["job_id"] for j in by_status_and_product["jobs"]] == ["j1"]
+    assert [j["job_id"] for j in by_date["jobs"]] == ["j3", "j2"]
+    assert by_date["next_cursor"] is None
+
+def test_garbled_cursor_is_a_400(run):
+    async def scenario():
+        async with api_client() as client:
+            return await client.get("/jobs", params={"cursor": "not-a-cursor"})
+
+    assert run(scenario()).status_code == 400
@@ -0,0 +1,96 @@
+import json
+import httpx
+import pytest
+from contextlib import asynccontextmanager
+from app import pipeline
+from app.checkpoints import SCRAPE, CLASSIFY, completed_stages, save_checkpoint
+from app.db import Job, JobStatus
+from app.status_writer import StatusWriter
+from helpers import add_jobs, get_job
+
+REVIEWS = [{"text": f"review {i}", "url": f"https://example.com/{i}", "date": None, "upvotes": i} for i in range(6)]
+
+def _ndjson(frames: list[dict]) -> bytes:
+    return "".join(json.dumps(f) + "\n" for f in frames).encode()
+
+@pytest.fixture
+def services(monkeypatch):
+    """Service endpoints, one-shot and NDJSON, answered in-process; returns the paths called, in order."""
+    answers = {
+        "/scrape": {"reviews": REVIEWS},
+        "/classify": {"reviews": REVIEWS},
+        "/analyze_and_report": {"analysis_result": {"summary": "ok"}, "report_path": "reports/j.pdf"},
+    }
+    calls = []
+
+    async def post(service, path, json=None, timeout=None, idempotent=False):
+        calls.append(path)
+        return httpx.Response(200, json=answers[path], request=httpx.Request("POST", f"http://{service}{path}"))
+
+    @asynccontextmanager
+    async def stream(service, method, path, json=None, timeout=None):
+        calls.append(path)
+        if path == "/scrape/stream":
+            frames = [{"type": "reviews", "source": "hn", "reviews": REVIEWS[:3]},
+                      {"type": "reviews", "source": "reddit", "reviews": REVIEWS[3:]},
+                      {"type": "clusters", "reviews": REVIEWS}]
+        else:
+            frames = [{"type": "reviews", "reviews": json["reviews"]}]
+        yield httpx.Response(200, content=_ndjson(frames), request=httpx.Request(method, f"http://{service}{path}"))
+
+    monkeypatch.setattr(pipeline.resilience, "post", post)
+    monkeypatch.setattr(pipeline.resilience, "stream", stream)
+    monkeypatch.setattr(pipeline, "PIPELINE_STREAMING", False)
+    monkeypatch.setattr(pipeline, "CLASSIFY_BATCHING", False)
+    monkeypatch.setattr(pipeline, "status_writer", StatusWriter(flush_interval=0.01))
+    return calls
+
+def test_finished_run_clears_its_checkpoints(run, services):
+    async def scenario():
+        await add_jobs(Job(job_id="j", product_name="Notion", dedup_key="notion||"))
+        await pipeline._run_stages("j", "Notion", None, None)
+        return await get_job("j"), await completed_stages("j")
+
+    job, stages = run(scenario())
+    assert services == ["/scrape", "/classify", "/analyze_and_report"]
+    assert job.status == JobStatus.DONE and job.report_path == "reports/j.pdf"
+    assert stages == []
+
+def test_interrupted_run_resumes_after_its_last_checkpoint(run, services):
+    async def scenario():
+        await add_jobs(Job(job_id="j", product_name="Notion", dedup_key="notion||"))
+        await save_checkpoint("j", SCRAPE, {"reviews": REVIEWS})
+        await save_checkpoint("j", CLASSIFY, {"reviews": REVIEWS})
+        await pipeline._run_stages("j", "Notion", None, None)
+        return await get_job("j")
+
+    assert run(scenario()).status == JobStatus.DONE
+    assert services == ["/analyze_and_report"]
+
+def test_streamed_run_classifies_each_source_frame_on_the_stream_endpoint(run, services, monkeypatch):
+    monkeypatch.setattr(pipeline, "PIPELINE_STREAMING", True)
+    monkeypatch.setattr(pipeline, "CLASSIFY_BATCHING", True)  # batching is for one-shot calls only
+
+    async def scenario():
+        await add_jobs(Job(job_id="j", product_name="Notion", dedup_key="notion||"))
+        await pipeline._run_stages("j", "Notion", None, None)
+        return await get_job("j")
+
+    assert run(scenario()).status == JobStatus.DONE
+    assert services == ["/scrape/stream", "/classify/stream", "/classify/stream", "/analyze_and_report"]
+
+def test_paid_analysis_calls_are_never_retried(run, services, monkeypatch):
+    answered = pipeline.resilience.post
+    idempotent = {}
+
+    async def post(service, path, **kwargs):
+        idempotent[path] = kwargs.get("idempotent", False)
+        return await answered(service, path, **kwargs)
+    monkeypatch.setattr(pipeline.resilience, "post", post)
+
+    async def scenario():
+        await add_jobs(Job(job_id="j", product_name="Notion", dedup_key="notion||"))
+        await pipeline._run_stages("j", "Notion", None, None)
+
+    run(scenario())
+    assert idempotent == {"/scrape": True, "/classify": True, "/analyze_and_report": False}
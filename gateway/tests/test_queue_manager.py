@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta
+from app import queue_manager
+from app.db import AsyncSessionLocal, Job, JobStatus
+from app.queue_manager import claim_next_job, release_job, renew_lease
+
+async def _add(*jobs: Job):
+    async with AsyncSessionLocal() as db:
+        db.add_all(jobs)
+        await db.commit()
+
+async def _get(job_id: str) -> Job:
+    async with AsyncSessionLocal() as db:
+        return await db.get(Job, job_id)
+
+def _job(job_id: str, minutes_ago: int = 0, **fields) -> Job:
+    created = datetime.utcnow() - timedelta(minutes=minutes_ago)
+    return Job(job_id=job_id, product_name=job_id, dedup_key=f"{job_id}||", created_at=created, **fields)
+
+def test_claims_oldest_first_and_each_job_once(run):
+    async def scenario():
+        await _add(_job("new", 1), _job("old", 5))
+        first = await claim_next_job("w1")
+        second = await claim_next_job("w2")
+        third = await claim_next_job("w3")
+        return first, second, third
+
+    first, second, third = run(scenario())
+    assert (first.job_id, second.job_id, third) == ("old", "new", None)
+    assert first.attempts == 1
+
+def test_expired_lease_is_reclaimed(run):
+    async def scenario():
+        await _add(_job("a"))
+        await claim_next_job("dead-worker", lease_seconds=-1)
+        reclaimed = await claim_next_job("w2")
+        lost = await renew_lease("a", "dead-worker")
+        return reclaimed, lost, await _get("a")
+
+    reclaimed, lost, job = run(scenario())
+    assert reclaimed.job_id == "a" and reclaimed.attempts == 2
+    assert lost is False
+    assert job.lease_owner == "w2"
+
+def test_released_job_is_not_claimed_again(run):
+    async def scenario():
+        await _add(_job("a"))
+        await claim_next_job("w1")
+        async with AsyncSessionLocal() as db:
+            (await db.get(Job, "a")).status = JobStatus.DONE
+            await db.commit()
+        await release_job("a", "w1")
+        return await claim_next_job("w2")
+
+    assert run(scenario()) is None
+
+def test_followers_ride_on_their_leader(run):
+    async def scenario():
+        await _add(_job("leader", 2), _job("follower", 1, source_job_id="leader"))
+        return await claim_next_job("w1"), await claim_next_job("w2")
+
+    first, second = run(scenario())
+    assert first.job_id == "leader"
+    assert second is None
+
+def test_poison_job_is_parked_as_failed(run, monkeypatch):
+    monkeypatch.setattr(queue_manager, "JOB_MAX_ATTEMPTS", 1)
+
+    async def scenario():
+        await _add(_job("a"), _job("follower", source_job_id="a"))
+        await claim_next_job("w1", lease_seconds=-1)
+        claimed = await claim_next_job("w2")
+        return claimed, await _get("a"), await _get("follower")
+
+    claimed, job, follower = run(scenario())
+    assert claimed is None
+    assert job.status == JobStatus.FAILED and job.lease_owner is None
+    assert follower.status == JobStatus.FAILED
@@ -0,0 +1,76 @@
+import httpx
+import pytest
+from app import main
+from app.db import Job
+from pie_shared.http_ranges import strong_etag
+from app.report_cache import ReportCache
+from helpers import api_client, add_jobs
+
+PDF = b"%PDF-1.7 " + bytes(range(256)) * 4
+
+@pytest.fixture
+def analysis(monkeypatch):
+    """GET /report/{id} on the analysis service, answered in-process; returns the paths fetched."""
+    fetched = []
+
+    async def get(service, path, timeout=None, idempotent=False, **kwargs):
+        fetched.append(path)
+        status = 200 if path == "/report/leader" else 404
+        return httpx.Response(status, content=PDF if status == 200 else b"", request=httpx.Request("GET", f"http://{service}{path}"))
+    monkeypatch.setattr(main.resilience, "get", get)
+    monkeypatch.setattr(main, "report_cache", ReportCache(max_bytes=1 << 20))
+    return fetched
+
+def _download(*requests: dict):
+    async def scenario():
+        await add_jobs(
+            Job(job_id="leader", product_name="n", status="done"),
+            Job(job_id="follower", product_name="n", status="done", source_job_id="leader"),
+            Job(job_id="no-pdf", product_name="n", status="done"),
+        )
+        async with api_client() as client:
+            return [await client.get(f"/report/{r.get('job_id', 'leader')}", headers=r.get("headers")) for r in requests]
+    return scenario()
+
+def test_followers_download_their_source_jobs_pdf_fetched_once(run, analysis):
+    first, again = run(_download({}, {"job_id": "follower"}))
+    assert first.content == again.content == PDF
+    assert first.headers["etag"] == strong_etag(PDF) and first.headers["accept-ranges"] == "bytes"
+    assert analysis == ["/report/leader"]  # the second download was an LRU hit
+
+def test_matching_if_none_match_is_a_304(run, analysis):
+    etag = strong_etag(PDF)
+    resp, = run(_download({"headers": {"If-None-Match": f'W/"other", W/{etag}'}}))
+    assert resp.status_code == 304 and resp.content == b""
+
+def test_ranges_resume_a_download(run, analysis):
+    etag = strong_etag(PDF)
+    head, tail, stale = run(_download(
+        {"headers": {"Range": "bytes=0-99"}},
+        {"headers": {"Range": "bytes=-24", "If-Range": etag}},
+        {"headers": {"Range": "bytes=0-99", "If-Range": '"old"'}},
+    ))
+    assert head.status_code == 206 and head.content == PDF[:100]
+    assert head.headers["content-range"] == f"bytes 0-99/{len(PDF)}"
+    assert tail.status_code == 206 and tail.content == PDF[-24:]
+    assert stale.status_code == 200 and stale.content == PDF  # the PDF changed: send it all
+
+def test_range_past_the_end_is_a_416(run, analysis):
+    resp, = run(_download({"headers": {"Range": f"bytes={len(PDF)}-"}}))
+    assert resp.status_code == 416
+    assert resp.headers["content-range"] == f"bytes */{len(PDF)}"
+
+def test_missing_report_is_a_404(run, analysis):
+    assert [r.status_code for r in run(_download({"job_id": "no-pdf"}, {"job_id": "nope"}))] == [404, 404]
+
+def test_cache_evicts_least_recently_used_and_skips_oversized_entries():
+    cache = ReportCache(max_bytes=10)
+    cache.put(("a", 1), b"aaaa")
+    cache.put(("b", 1), b"bbbb")
+    cache.get(("a", 1))
+    cache.put(("c", 1), b"cccc")
+    data, etag = cache.put(("huge", 1), b"x" * 11)
+
+    assert cache.get(("b", 1)) is None
+    assert cache.get(("a", 1)) and cache.get(("c", 1))
+    assert (data, etag) == (b"x" * 11, strong_etag(b"x" * 11)) and cache.get(("huge", 1)) is None
@@ -0,0 +1,89 @@
+import asyncio
+import httpx
+import pytest
+from app import resilience
+from app.clients import HTTP_CONNECT_TIMEOUT
+
+REPLICAS = ["http://replica-a", "http://replica-b"]
+
+@pytest.fixture
+def service(monkeypatch):
+    """A two-replica 'svc' whose answers come from `handlers[url]`; returns (handlers, calls)."""
+    handlers, calls = {}, []
+
+    def dispatch(request: httpx.Request) -> httpx.Response:
+        base = f"{request.url.scheme}://{request.url.host}"
+        calls.append((base, request.extensions["timeout"]))
+        return handlers[base](request)
+
+    def get_client(name: str, replica: int = 0) -> httpx.AsyncClient:
+        return httpx.AsyncClient(transport=httpx.MockTransport(dispatch), base_url=REPLICAS[replica])
+
+    monkeypatch.setitem(resilience.SERVICE_REPLICAS, "svc", REPLICAS)
+    monkeypatch.setattr(resilience, "get_client", get_client)
+    monkeypatch.setattr(resilience, "_breakers", {})
+    monkeypatch.setattr(resilience, "_next_replica", {})
+    monkeypatch.setattr(resilience, "RETRY_BASE_DELAY", 0.001)
+    return handlers, calls
+
+def _answers(*statuses: int):
+    remaining = list(statuses)
+    return lambda request: httpx.Response(remaining.pop(0) if len(remaining) > 1 else remaining[0])
+
+def test_idempotent_call_retries_a_503(service):
+    handlers, calls = service
+    handlers[REPLICAS[0]] = handlers[REPLICAS[1]] = _answers(503, 200)
+    resp = asyncio.run(resilience.get("svc", "/x", timeout=5, idempotent=True))
+    assert resp.status_code == 200
+    assert len(calls) == 2
+
+def test_non_idempotent_call_is_not_retried(service):
+    handlers, calls = service
+    handlers[REPLICAS[0]] = handlers[REPLICAS[1]] = _answers(503, 200)
+    resp = asyncio.run(resilience.post("svc", "/x", json={}, timeout=5))
+    assert resp.status_code == 503
+    assert len(calls) == 1
+
+def test_connection_failure_fails_over_to_another_replica(service):
+    handlers, calls = service
+
+    def refuse(request):
+        raise httpx.ConnectError("refused", request=request)
+    handlers[REPLICAS[0]] = refuse
+    handlers[REPLICAS[1]] = _answers(200)
+    resp = asyncio.run(resilience.get("svc", "/x", timeout=5, idempotent=True))
+    assert resp.status_code == 200
+    assert [base for base, _ in calls] == REPLICAS
+
+def test_breaker_opens_after_repeated_failures(service, monkeypatch):
+    handlers, calls = service
+    monkeypatch.setitem(resilience.SERVICE_REPLICAS, "svc", REPLICAS[:1])
+    handlers[REPLICAS[0]] = _answers(500)
+
+    async def scenario():
+        for _ in range(resilience.BREAKER_FAILURE_THRESHOLD):
+            await resilience.post("svc", "/x", timeout=5)
+        with pytest.raises(resilience.ServiceUnavailable):
+            await resilience.post("svc", "/x", timeout=5)
+
+    asyncio.run(scenario())
+    assert len(calls) == resilience.BREAKER_FAILURE_THRESHOLD
+
+def test_call_budget_keeps_the_short_connect_timeout(service):
+    handlers, calls = service
+    handlers[REPLICAS[0]] = handlers[REPLICAS[1]] = _answers(200)
+    asyncio.run(resilience.post("svc", "/x", timeout=420))
+    timeout = calls[0][1]
+    assert timeout["connect"] == HTTP_CONNECT_TIMEOUT
+    assert 419 < timeout["read"] <= 420
+
+def test_non_idempotent_call_moves_on_only_when_the_connection_fails(service):
+    handlers, calls = service
+
+    def refuse(request):
+        raise httpx.ConnectError("refused", request=request)
+    handlers[REPLICAS[0]] = refuse
+    handlers[REPLICAS[1]] = _answers(503)
+    resp = asyncio.run(resilience.post("svc", "/x", json={}, timeout=5))
+    assert resp.status_code == 503  # reached a replica: not sent again
+    assert [base for base, _ in calls] == REPLICAS
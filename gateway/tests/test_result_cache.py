@@ -0,0 +1,80 @@
+import asyncio
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from app import result_cache
+from app.db import AsyncSessionLocal, Job, JobStatus, engine
+from app.result_cache import find_cached_result, job_from_cache
+from app.status_writer import _update_statement
+from helpers import api_client
+
+def _finished(job_id: str, seconds_ago: float) -> Job:
+    return Job(job_id=job_id, product_name="notion", dedup_key="notion||", status=JobStatus.DONE,
+               stage="Complete", progress_pct=100, result_ref="blob",
+               updated_at=datetime.utcnow() - timedelta(seconds=seconds_ago))
+
+def test_fresh_result_is_served_and_stale_one_is_not(run, monkeypatch):
+    monkeypatch.setattr(result_cache, "RESULT_CACHE_TTL_SECONDS", 60)
+
+    async def scenario():
+        async with AsyncSessionLocal() as db:
+            db.add(_finished("fresh", 10))
+            await db.commit()
+            hit = await find_cached_result(db, "notion||")
+            (await db.get(Job, "fresh")).updated_at = datetime.utcnow() - timedelta(seconds=120)
+            await db.commit()
+            miss = await find_cached_result(db, "notion||")
+        return hit, miss
+
+    hit, miss = run(scenario())
+    assert hit.job_id == "fresh"
+    assert miss is None
+
+def test_cache_hits_do_not_extend_the_ttl(run, monkeypatch):
+    monkeypatch.setattr(result_cache, "RESULT_CACHE_TTL_SECONDS", 0.5)
+
+    async def scenario():
+        hits = []
+        async with AsyncSessionLocal() as db:
+            db.add(_finished("leader", 0))
+            await db.commit()
+            for i in range(3):
+                cached = await find_cached_result(db, "notion||")
+                hits.append(cached is not None)
+                if cached:
+                    db.add(job_from_cache(f"hit-{i}", cached, None, None))
+                    await db.commit()
+                await asyncio.sleep(0.3)
+        return hits
+
+    assert run(scenario()) == [True, True, False]
+
+def test_source_run_writes_skip_cache_hit_rows(run):
+    async def scenario():
+        async with AsyncSessionLocal() as db:
+            leader = _finished("leader", 0)
+            db.add(leader)
+            await db.commit()
+            db.add(job_from_cache("hit", leader, None, None))
+            db.add(Job(job_id="follower", product_name="notion", dedup_key="notion||", source_job_id="leader"))
+            await db.commit()
+        async with engine.begin() as conn:
+            await conn.execute(*_update_statement("leader", {"status": "scraping", "progress_pct": 10}))
+        async with AsyncSessionLocal() as db:
+            return {j.job_id: j.status for j in (await db.execute(select(Job))).scalars()}
+
+    statuses = run(scenario())
+    assert statuses == {"leader": "scraping", "follower": "scraping", "hit": JobStatus.DONE}
+
+def test_analyze_serves_a_recent_result_unless_forced(run, no_admission):
+    async def scenario():
+        async with AsyncSessionLocal() as db:
+            db.add(_finished("leader", 0))
+            await db.commit()
+        async with api_client() as client:
+            cached = await client.post("/analyze", json={"product_name": "Notion"})
+            forced = await client.post("/analyze", json={"product_name": "Notion", "force_refresh": True})
+        return cached.json(), forced.json()
+
+    cached, forced = run(scenario())
+    assert cached["status"] == JobStatus.DONE and cached["message"].startswith("Served from cache")
+    assert forced["status"] == JobStatus.QUEUED
@@ -0,0 +1,101 @@
+import json
+from datetime import datetime, timedelta
+import pytest
+import zstandard
+from sqlalchemy import select, func
+from app import retention
+from app.blob_store import put_json
+from app.db import AsyncSessionLocal, Blob, Job, JobCheckpoint, JobStatus
+from helpers import add_jobs, all_jobs
+
+OLD = datetime.utcnow() - timedelta(days=90)
+
+@pytest.fixture
+def archive_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(retention, "JOB_ARCHIVE_DIR", str(tmp_path))
+    monkeypatch.setattr(retention, "JOB_RETENTION_DAYS", 30)
+    monkeypatch.setattr(retention, "RETENTION_BATCH_SIZE", 2)
+    return tmp_path
+
+def _archived_ids(archive_dir) -> list[str]:
+    ids = []
+    for path in sorted(archive_dir.glob("*.ndjson.zst")):
+        data = zstandard.ZstdDecompressor().decompressobj().decompress(path.read_bytes())
+        ids += [json.loads(line)["job_id"] for line in data.decode().splitlines()]
+    return sorted(ids)
+
+def _old(job_id: str, status: str = JobStatus.DONE, **fields) -> Job:
+    return Job(job_id=job_id, product_name="n", status=status, created_at=OLD, updated_at=OLD, **fields)
+
+def test_old_finished_jobs_are_archived_then_deleted(run, archive_dir):
+    async def scenario():
+        await add_jobs(
+            _old("a"), _old("b"), _old("c", status=JobStatus.FAILED),
+            _old("running", status="analyzing", lease_owner="w1"),
+            Job(job_id="recent", product_name="n", status=JobStatus.DONE),
+        )
+        stats = await retention.compact_once()
+        return stats, [j.job_id for j in await all_jobs()]
+
+    stats, left = run(scenario())
+    assert stats["jobs"] == 3
+    assert sorted(left) == ["recent", "running"]
+    assert _archived_ids(archive_dir) == ["a", "b", "c"]
+    assert not list(archive_dir.glob("*.pending"))
+
+def test_failed_delete_leaves_no_archive_and_the_next_pass_archives_once(run, archive_dir, monkeypatch):
+    async def scenario():
+        await add_jobs(_old("a"))
+        real_delete = retention.delete
+        with monkeypatch.context() as m:
+            def failing_delete(table):
+                if table is Job:
+                    raise OSError("disk I/O error")
+                return real_delete(table)
+            m.setattr(retention, "delete", failing_delete)
+            with pytest.raises(OSError):
+                await retention.compact_once()
+        after_failure = _archived_ids(archive_dir), [j.job_id for j in await all_jobs()]
+        await retention.compact_once()
+        return after_failure
+
+    assert run(scenario()) == ([], ["a"])
+    assert _archived_ids(archive_dir) == ["a"]
+
+def test_interrupted_archives_are_settled_against_the_database(run, archive_dir):
+    async def scenario():
+        # As if the process died after writing each pending file: "gone" was committed, "kept" was not
+        await add_jobs(_old("kept"))
+        now = datetime.utcnow()
+        gone = retention._write_pending([{"job_id": "gone"}], now)
+        kept = retention._write_pending([{"job_id": "kept"}], now)
+        await retention._settle_pending_archives()
+        return gone, kept
+
+    gone, kept = run(scenario())
+    assert not gone.exists() and gone.with_name(gone.name.removesuffix(".pending")).exists()
+    assert not kept.exists() and not kept.with_name(kept.name.removesuffix(".pending")).exists()
+
+def test_unreferenced_blobs_and_finished_checkpoints_are_dropped(run, archive_dir, monkeypatch):
+    monkeypatch.setattr(retention, "BLOB_GRACE", timedelta(0))
+
+    async def scenario():
+        kept_ref = await put_json({"kept": True})
+        await put_json({"orphan": True})
+        await add_jobs(
+            Job(job_id="done", product_name="n", status=JobStatus.DONE, result_ref=kept_ref),
+            Job(job_id="failed", product_name="n", status=JobStatus.FAILED),
+        )
+        async with AsyncSessionLocal() as db:
+            db.add_all([JobCheckpoint(job_id="done", stage="scrape", payload=b"{}"),
+                        JobCheckpoint(job_id="failed", stage="scrape", payload=b"{}")])
+            await db.commit()
+        stats = await retention.compact_once()
+        async with AsyncSessionLocal() as db:
+            blobs = await db.scalar(select(func.count()).select_from(Blob))
+            checkpoints = list(await db.scalars(select(JobCheckpoint.job_id)))
+        return stats, blobs, checkpoints
+
+    stats, blobs, checkpoints = run(scenario())
+    assert (stats["blobs"], blobs) == (1, 1)
+    assert checkpoints == ["failed"]  # a failed job can still resume from it
@@ -0,0 +1,43 @@
+import pytest
+from app.db import Job, JobStatus
+from helpers import api_client, add_jobs, all_jobs
+
+pytestmark = pytest.mark.usefixtures("no_admission")
+
+def test_retrying_follower_of_finished_run_takes_its_result(run):
+    async def scenario():
+        await add_jobs(
+            Job(job_id="leader", product_name="n", dedup_key="n||", status=JobStatus.DONE, stage="Complete",
+                progress_pct=100, result_ref="blob", report_path="report.pdf"),
+            Job(job_id="follower", product_name="n", dedup_key="n||", status=JobStatus.CANCELLED,
+                stage="Analysis stopped by user.", source_job_id="leader"),
+        )
+        async with api_client() as client:
+            resp = await client.post("/retry/follower")
+        return resp, {j.job_id: j for j in await all_jobs()}
+
+    resp, jobs = run(scenario())
+    assert resp.status_code == 200 and resp.json()["status"] == "done"
+    assert jobs["leader"].status == JobStatus.DONE  # not re-queued
+    assert (jobs["follower"].result_ref, jobs["follower"].report_path) == ("blob", "report.pdf")
+
+def test_retrying_follower_of_archived_run_is_a_conflict(run):
+    async def scenario():
+        await add_jobs(Job(job_id="follower", product_name="n", dedup_key="n||", status=JobStatus.CANCELLED,
+                       source_job_id="archived"))
+        async with api_client() as client:
+            return await client.post("/retry/follower")
+
+    assert run(scenario()).status_code == 409
+
+def test_retrying_failed_leader_requeues_it(run):
+    async def scenario():
+        await add_jobs(Job(job_id="leader", product_name="n", dedup_key="n||", status=JobStatus.FAILED,
+                       error="boom", attempts=3))
+        async with api_client() as client:
+            resp = await client.post("/retry/leader")
+        return resp, (await all_jobs())[0]
+
+    resp, job = run(scenario())
+    assert resp.json()["status"] == "queued"
+    assert job.attempts == 0 and job.error is None
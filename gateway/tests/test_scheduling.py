@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta
+from app import queue_manager
+from app.db import Job
+from app.queue_manager import PRIORITY_BULK, PRIORITY_INTERACTIVE, claim_next_job
+from helpers import api_client, add_jobs, all_jobs
+
+def _job(job_id: str, tenant: str, minutes_ago: int, priority: int = PRIORITY_INTERACTIVE, **fields) -> Job:
+    return Job(job_id=job_id, product_name=job_id, dedup_key=f"{job_id}||", tenant=tenant, priority=priority,
+               created_at=datetime.utcnow() - timedelta(minutes=minutes_ago), **fields)
+
+def _running(job_id: str, tenant: str, priority: int = PRIORITY_INTERACTIVE) -> Job:
+    return _job(job_id, tenant, 60, priority, status="scraping", lease_owner="w0",
+                lease_expires_at=datetime.utcnow() + timedelta(minutes=5))
+
+async def _claim_all(n: int) -> list[str | None]:
+    claimed = [await claim_next_job(f"w{i}") for i in range(n)]
+    return [c.job_id if c else None for c in claimed]
+
+def test_interactive_jobs_go_before_older_bulk_ones(run):
+    async def scenario():
+        await add_jobs(_job("bulk", "a", 10, PRIORITY_BULK), _job("interactive", "a", 1))
+        return await _claim_all(2)
+
+    assert run(scenario()) == ["interactive", "bulk"]
+
+def test_tenant_with_fewer_running_jobs_goes_first(run):
+    async def scenario():
+        await add_jobs(_running("busy-1", "busy"), _job("busy-2", "busy", 10), _job("quiet-1", "quiet", 1))
+        return await _claim_all(2)
+
+    assert run(scenario()) == ["quiet-1", "busy-2"]
+
+def test_weights_scale_a_tenants_share(run, monkeypatch):
+    monkeypatch.setattr(queue_manager, "TENANT_WEIGHTS", {"paid": 3.0})
+
+    async def scenario():
+        await add_jobs(
+            _running("paid-1", "paid"), _running("paid-2", "paid"), _running("free-1", "free"),
+            _job("free-2", "free", 10), _job("paid-3", "paid", 1),
+        )
+        return await _claim_all(1)
+
+    # paid uses 2/3 of its share, free 1/1 — paid goes first despite the newer job
+    assert run(scenario()) == ["paid-3"]
+
+def test_tenant_cap_holds_back_its_jobs(run, monkeypatch):
+    monkeypatch.setattr(queue_manager, "TENANT_MAX_CONCURRENT", 1)
+    monkeypatch.setattr(queue_manager, "TENANT_CONCURRENCY_CAPS", {"vip": 2})
+
+    async def scenario():
+        await add_jobs(_running("a-1", "a"), _job("a-2", "a", 5), _running("vip-1", "vip"), _job("vip-2", "vip", 1))
+        return await _claim_all(2)
+
+    assert run(scenario()) == ["vip-2", None]
+
+def test_bulk_jobs_never_take_every_slot(run, monkeypatch):
+    monkeypatch.setattr(queue_manager, "BULK_MAX_CONCURRENT", 1)
+
+    async def scenario():
+        await add_jobs(_running("bulk-1", "a", PRIORITY_BULK), _job("bulk-2", "b", 5, PRIORITY_BULK))
+        held_back = await _claim_all(1)
+        await add_jobs(_job("interactive", "c", 1))
+        return held_back + await _claim_all(1)
+
+    assert run(scenario()) == [None, "interactive"]
+
+def test_submissions_are_filed_under_the_client_id(run, no_admission):
+    async def scenario():
+        async with api_client() as client:
+            await client.post("/analyze", json={"product_name": "Notion"}, headers={"X-Client-Id": "acme"})
+            await client.post("/analyze", json={"product_name": "Linear", "priority": "bulk"})
+        return await all_jobs()
+
+    acme, anonymous = run(scenario())
+    assert (acme.tenant, acme.priority) == ("acme", PRIORITY_INTERACTIVE)
+    assert (anonymous.tenant, anonymous.priority) == ("127.0.0.1", PRIORITY_BULK)  # falls back to the caller's IP
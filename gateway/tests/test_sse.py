@@ -0,0 +1,74 @@
+import json
+import asyncio
+from app import main
+from app.db import AsyncSessionLocal, Job, JobStatus
+from app.events import job_events
+from helpers import api_client, add_jobs
+
+def _events(body: str) -> list[dict]:
+    return [json.loads(line[len("data: "):]) for line in body.splitlines() if line.startswith("data: ")]
+
+async def _stream(job_id: str, *publish: tuple[str, dict]) -> list[dict]:
+    """Open the SSE stream and publish `(channel, event)` pairs once it is listening."""
+    async def publisher():
+        await asyncio.sleep(0.1)
+        for channel, event in publish:
+            job_events.publish(channel, event)
+            await asyncio.sleep(0.01)
+
+    async with api_client() as client:
+        task = asyncio.create_task(publisher())
+        resp = await asyncio.wait_for(client.get(f"/status/{job_id}/stream"), timeout=5)
+        await task
+    assert resp.headers["content-type"].startswith("text/event-stream")
+    return _events(resp.text)
+
+def test_stream_sends_each_change_and_closes_when_done(run):
+    async def scenario():
+        await add_jobs(Job(job_id="j", product_name="n", status="scraping", stage="Queued"))
+        return await _stream(
+            "j",
+            ("j", {"stage": "Scraping", "progress_pct": 10}),
+            ("j", {"stage": "Scraping", "progress_pct": 10}),  # no change, no event
+            ("j", {"status": "done", "stage": "Complete", "progress_pct": 100}),
+        )
+
+    events = run(scenario())
+    assert [(e["stage"], e["progress_pct"]) for e in events] == [("Queued", 0), ("Scraping", 10), ("Complete", 100)]
+    assert events[-1]["report_url"] == "/report/j"
+
+def test_follower_hears_its_leaders_progress(run):
+    async def scenario():
+        await add_jobs(
+            Job(job_id="leader", product_name="n", status="scraping"),
+            Job(job_id="follower", product_name="n", status="scraping", source_job_id="leader"),
+        )
+        return await _stream(
+            "follower",
+            ("leader", {"job_id": "leader", "status": "cancelled"}),  # the leader's own row only
+            ("leader", {"status": "done", "stage": "Complete", "progress_pct": 100}),
+        )
+
+    events = run(scenario())
+    assert [e["status"] for e in events] == ["scraping", "done"]
+    assert events[-1]["job_id"] == "follower"
+
+def test_stream_falls_back_to_the_database(run, monkeypatch):
+    monkeypatch.setattr(main, "SSE_FALLBACK_POLL_SECONDS", 0.05)
+
+    async def finish_elsewhere():
+        # A standalone worker: the row changes but no event reaches this process
+        await asyncio.sleep(0.1)
+        async with AsyncSessionLocal() as db:
+            job = await db.get(Job, "j")
+            job.status, job.stage, job.progress_pct = JobStatus.DONE, "Complete", 100
+            await db.commit()
+
+    async def scenario():
+        await add_jobs(Job(job_id="j", product_name="n", status="scraping"))
+        finisher = asyncio.create_task(finish_elsewhere())
+        events = await _stream("j")
+        await finisher
+        return events
+
+    assert [e["status"] for e in run(scenario())] == ["scraping", "done"]
@@ -0,0 +1,87 @@
+import asyncio
+import pytest
+from app import status_writer as status_writer_module
+from app.db import AsyncSessionLocal, Job, JobStatus
+from app.status_writer import StatusWriter
+from helpers import add_jobs, get_job
+
+def test_updates_are_merged_and_written_on_the_next_tick(run):
+    writer = StatusWriter(flush_interval=0.05)
+
+    async def scenario():
+        await add_jobs(Job(job_id="j", product_name="n"))
+        await writer.update("j", status="scraping", progress_pct=10)
+        await writer.update("j", stage="Scraped 40 items", progress_pct=30)
+        before = await get_job("j")
+        await asyncio.sleep(0.15)
+        return before, await get_job("j")
+
+    before, after = run(scenario())
+    assert before.status == JobStatus.QUEUED  # nothing written yet
+    assert (after.status, after.stage, after.progress_pct) == ("scraping", "Scraped 40 items", 30)
+
+def test_final_status_is_written_before_update_returns(run):
+    writer = StatusWriter(flush_interval=60)
+
+    async def scenario():
+        await add_jobs(Job(job_id="j", product_name="n"))
+        await writer.update("j", stage="Analysing", progress_pct=60)
+        await writer.update("j", status="done", progress_pct=100)
+        return await get_job("j")
+
+    job = run(scenario())
+    assert (job.status, job.stage, job.progress_pct) == (JobStatus.DONE, "Analysing", 100)
+
+def test_writes_mirror_onto_followers_but_not_cancelled_ones(run):
+    writer = StatusWriter(flush_interval=60)
+
+    async def scenario():
+        await add_jobs(
+            Job(job_id="leader", product_name="n"),
+            Job(job_id="waiting", product_name="n", source_job_id="leader"),
+            Job(job_id="gave-up", product_name="n", source_job_id="leader", status=JobStatus.CANCELLED),
+        )
+        await writer.update("leader", status="done", progress_pct=100)
+        return [await get_job(j) for j in ("leader", "waiting", "gave-up")]
+
+    leader, waiting, gave_up = run(scenario())
+    assert leader.status == waiting.status == JobStatus.DONE
+    assert gave_up.status == JobStatus.CANCELLED
+
+def test_run_counts_as_cancelled_once_every_attached_job_is(run):
+    writer = StatusWriter(flush_interval=60)
+
+    async def scenario():
+        await add_jobs(
+            Job(job_id="leader", product_name="n", status=JobStatus.CANCELLED),
+            Job(job_id="follower", product_name="n", source_job_id="leader"),
+        )
+        await writer.refresh("leader")
+        with_follower = writer.is_cancelled("leader")
+        async with AsyncSessionLocal() as db:
+            (await db.get(Job, "follower")).status = JobStatus.CANCELLED
+            await db.commit()
+        await writer.refresh("leader")
+        return with_follower, writer.is_cancelled("leader")
+
+    assert run(scenario()) == (False, True)
+
+def _broken_statement(job_id, fields):
+    raise OSError("disk full")
+
+def test_failed_flush_keeps_the_batch_for_the_next_tick(run, monkeypatch):
+    writer = StatusWriter(flush_interval=60)
+
+    async def scenario():
+        await add_jobs(Job(job_id="j", product_name="n"))
+        await writer.update("j", stage="Scraping", progress_pct=10)
+        with monkeypatch.context() as m:
+            m.setattr(status_writer_module, "_update_statement", _broken_statement)
+            with pytest.raises(OSError):
+                await writer.flush()
+        await writer.update("j", progress_pct=20)  # newer than the failed batch
+        await writer.flush()
+        return await get_job("j")
+
+    job = run(scenario())
+    assert (job.stage, job.progress_pct) == ("Scraping", 20)
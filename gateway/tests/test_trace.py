@@ -0,0 +1,85 @@
+import asyncio
+import httpx
+from app import trace_store
+from app.db import Job, JobSpan
+from pie_shared.tracing import drain, span, start_trace
+from helpers import api_client, add_jobs
+
+def test_spans_nest_under_the_current_span():
+    async def scenario():
+        with span("outside"):
+            pass  # no trace yet: not recorded
+        trace_id = start_trace()
+        with span("pipeline", product="Notion"):
+            with span("scrape"):
+                await asyncio.sleep(0)
+        return drain(trace_id), drain(trace_id)
+
+    spans, again = asyncio.run(scenario())
+    scrape, pipeline = spans  # recorded as they finish
+    assert (pipeline["name"], pipeline["parent_id"], pipeline["attrs"]) == ("pipeline", None, {"product": "Notion"})
+    assert (scrape["name"], scrape["parent_id"]) == ("scrape", pipeline["span_id"])
+    assert again == []  # drained once
+
+def _span(trace_id: str, span_id: str, parent_id: str | None, name: str, start: float, duration_ms: float,
+          service: str = "gateway") -> JobSpan:
+    return JobSpan(job_id="leader", trace_id=trace_id, span_id=span_id, parent_id=parent_id,
+                   service=service, name=name, start=start, duration_ms=duration_ms)
+
+async def _seed():
+    await add_jobs(
+        Job(job_id="leader", product_name="n", status="done"),
+        Job(job_id="follower", product_name="n", status="done", source_job_id="leader"),
+        Job(job_id="untraced", product_name="n"),
+    )
+    await add_jobs(
+        _span("old", "x", None, "pipeline", 10.0, 5.0),
+        _span("new", "p", None, "pipeline", 100.0, 3000.0),
+        _span("new", "s", "p", "scrape", 100.5, 1200.0, "scraper"),
+        _span("new", "r", "s", "scrape.reddit", 100.6, 1100.0, "scraper"),
+        _span("new", "a", "p", "analyze", 101.8, 1200.0, "analysis"),
+    )
+
+def test_waterfall_of_the_latest_run(run):
+    async def scenario():
+        await _seed()
+        async with api_client() as client:
+            return [(await client.get(path)) for path in
+                    ("/jobs/follower/trace", "/jobs/leader/trace?trace_id=old", "/jobs/untraced/trace", "/jobs/nope/trace")]
+
+    latest, old, untraced, unknown = run(scenario())
+    body = latest.json()
+    assert (body["job_id"], body["trace_id"], body["total_ms"]) == ("leader", "new", 3000.0)
+    assert [(s["name"], s["depth"], s["offset_ms"]) for s in body["spans"]] == [
+        ("pipeline", 0, 0.0), ("scrape", 1, 500.0), ("scrape.reddit", 2, 600.0), ("analyze", 1, 1800.0),
+    ]
+    assert [leaf["name"] for leaf in body["slowest_leaves"]] == ["analyze", "scrape.reddit"]
+    assert [s["name"] for s in old.json()["spans"]] == ["pipeline"]
+    assert (untraced.status_code, unknown.status_code) == (404, 404)
+
+def test_persist_merges_every_services_spans(run, monkeypatch):
+    monkeypatch.setattr(trace_store, "SERVICE_REPLICAS", {"scraper": ["http://s1"], "analysis": ["http://a1"]})
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.host == "a1":
+            return httpx.Response(503)  # a service that can't answer leaves a gap, nothing more
+        return httpx.Response(200, json={"spans": [
+            {"span_id": "s", "parent_id": None, "service": "scraper", "name": "scrape", "start": 1.0, "duration_ms": 5.0, "attrs": {}},
+        ]})
+
+    def replica_clients(service):
+        return [httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url=url)
+                for url in trace_store.SERVICE_REPLICAS[service]]
+    monkeypatch.setattr(trace_store, "replica_clients", replica_clients)
+
+    async def scenario():
+        await add_jobs(Job(job_id="leader", product_name="n"))
+        trace_id = start_trace()
+        with span("pipeline"):
+            pass
+        await trace_store.persist_trace("leader", trace_id)
+        async with api_client() as client:
+            return (await client.get("/jobs/leader/trace")).json()
+
+    body = run(scenario())
+    assert sorted((s["service"], s["name"]) for s in body["spans"]) == [("gateway", "pipeline"), ("scraper", "scrape")]
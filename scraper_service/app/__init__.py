@@ -1 +1,6 @@
+import os
 
+# Names this service in shared code (trace spans, /load); set before pie_shared is imported
+os.environ.setdefault("SERVICE_NAME", "scraper")
+# Scrapes are mostly waiting on the network, so more of them fit at once
+os.environ.setdefault("SERVICE_MAX_IN_FLIGHT", "16")
@@ -0,0 +1,178 @@
+"""
+http_cache.py — persistent cache of scraped GET responses.
+Search results and review pages for a product barely change between jobs,
+so 200 answers are kept in SQLite (zstd-compressed bodies) at
+HTTP_CACHE_PATH. An entry younger than its host's TTL (HTTP_CACHE_TTLS,
+e.g. "www.reddit.com=900", else HTTP_CACHE_DEFAULT_TTL) is served without
+touching the network or the rate limiter; an older one is revalidated with
+If-None-Match / If-Modified-Since and reused on a 304. The file is bounded
+by HTTP_CACHE_MAX_BYTES, evicting least-recently-used entries first.
+"""
+import os
+import json
+import time
+import sqlite3
+import asyncio
+import threading
+from pathlib import Path
+from urllib.parse import urlsplit
+import zstandard
+
+def _parse_ttls(raw: str) -> dict[str, float]:
+    pairs = (item.split("=", 1) for item in raw.split(",") if "=" in item)
+    return {k.strip(): float(v) for k, v in pairs}
+
+HTTP_CACHE_PATH = os.getenv("HTTP_CACHE_PATH", str(Path(__file__).resolve().parent / "http_cache.db"))  # empty = off
+HTTP_CACHE_MAX_BYTES   = int(os.getenv("HTTP_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+HTTP_CACHE_DEFAULT_TTL = float(os.getenv("HTTP_CACHE_DEFAULT_TTL", "3600"))
+HTTP_CACHE_TTLS = _parse_ttls(os.getenv(
+    "HTTP_CACHE_TTLS",
+    "www.reddit.com=900,hn.algolia.com=900,html.duckduckgo.com=3600,www.g2.com=86400,www.producthunt.com=86400",
+))
+
+# Response headers worth replaying from the cache
+KEPT_HEADERS = ("content-type", "etag", "last-modified")
+
+class CachedResponse:
+    """The parts of a curl_cffi Response the scrapers read."""
+    def __init__(self, url: str, content: bytes, headers: dict):
+        self.url = url
+        self.status_code = 200
+        self.content = content
+        self.headers = headers
+        self.from_cache = True
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+class _Entry:
+    def __init__(self, url: str, content: bytes, headers: dict, stored_at: float):
+        self.url = url
+        self.content = content
+        self.headers = headers
+        self.stored_at = stored_at
+
+    def fresh(self) -> bool:
+        ttl = HTTP_CACHE_TTLS.get(urlsplit(self.url).hostname or "", HTTP_CACHE_DEFAULT_TTL)
+        return time.time() - self.stored_at < ttl
+
+    def validators(self) -> dict:
+        headers = {}
+        if self.headers.get("etag"):
+            headers["If-None-Match"] = self.headers["etag"]
+        if self.headers.get("last-modified"):
+            headers["If-Modified-Since"] = self.headers["last-modified"]
+        return headers
+
+    def response(self) -> CachedResponse:
+        return CachedResponse(self.url, self.content, self.headers)
+
+class HttpCache:
+    def __init__(self, path: str = HTTP_CACHE_PATH, max_bytes: int = HTTP_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self._db: sqlite3.Connection | None = None
+        self._size = 0
+        self._lock = threading.Lock()  # one connection, used from worker threads
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " url TEXT PRIMARY KEY, body BLOB NOT NULL, headers TEXT NOT NULL,"
+                " stored_at REAL NOT NULL, last_used REAL NOT NULL, size INTEGER NOT NULL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS ix_responses_last_used ON responses (last_used)")
+            self._size = db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            self._db = db
+        return self._db
+
+    async def get(self, url: str) -> _Entry | None:
+        return await asyncio.to_thread(self._get, url)
+
+    async def put(self, url: str, resp):
+        cache_control = (resp.headers.get("cache-control") or "").lower()
+        if "no-store" in cache_control:
+            return
+        headers = {k: resp.headers[k] for k in KEPT_HEADERS if resp.headers.get(k)}
+        await asyncio.to_thread(self._put, url, resp.content, headers)
+
+    async def refresh(self, url: str):
+        """A 304 confirmed the entry: its TTL starts again."""
+        self.revalidated += 1
+        await asyncio.to_thread(self._refresh, url)
+
+    def stats(self) -> dict:
+        return {
+            "bytes": self._size,
+            "hits": self.hits,
+            "revalidated": self.revalidated,
+            "misses": self.misses,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _get(self, url: str) -> _Entry | None:
+        with self._lock:
+            db = self._conn()
+            row = db.execute("SELECT body, headers, stored_at FROM responses WHERE url = ?", (url,)).fetchone()
+            if row is None:
+                return None
+            db.execute("UPDATE responses SET last_used = ? WHERE url = ?", (time.time(), url))
+            db.commit()
+        body, headers, stored_at = row
+        try:
+            content = zstandard.ZstdDecompressor().decompressobj().decompress(body)
+        except zstandard.ZstdError:
+            return None
+        return _Entry(url, content, json.loads(headers), stored_at)
+
+    def _put(self, url: str, content: bytes, headers: dict):
+        body = zstandard.ZstdCompressor().compress(content)
+        now = time.time()
+        with self._lock:
+            db = self._conn()
+            old = db.execute("SELECT size FROM responses WHERE url = ?", (url,)).fetchone()
+            db.execute(
+                "INSERT OR REPLACE INTO responses (url, body, headers, stored_at, last_used, size) VALUES (?, ?, ?, ?, ?, ?)",
+                (url, body, json.dumps(headers), now, now, len(body)),
+            )
+            self._size += len(body) - (old[0] if old else 0)
+            self._evict(db)
+            db.commit()
+
+    def _refresh(self, url: str):
+        with self._lock:
+            db = self._conn()
+            db.execute("UPDATE responses SET stored_at = ? WHERE url = ?", (time.time(), url))
+            db.commit()
+
+    def _evict(self, db: sqlite3.Connection):
+        while self._size > self.max_bytes:
+            rows = db.execute("SELECT url, size FROM responses ORDER BY last_used LIMIT 32").fetchall()
+            if not rows:
+                break
+            for url, size in rows:
+                db.execute("DELETE FROM responses WHERE url = ?", (url,))
+                self._size -= size
+                if self._size <= self.max_bytes:
+                    break
+
+http_cache = HttpCache()
@@ -1,61 +1,68 @@
 import asyncio
-from fastapi import FastAPI
+import json
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse, JSONResponse
 from .models import ScrapeRequest, ScrapeResponse, ReviewItem
+from pie_shared.cancellation import cancellations, JobCancelled
+from pie_shared.tracing import TraceMiddleware, span, traced, drain
+from pie_shared.load import LoadMiddleware, load
+from pie_shared.wire import CodecRoute, CodecResponse
+from .session_pool import session_pool
+from .rate_limiter import rate_limiter
+from .http_cache import http_cache
 
 # Import Scrapers
-from .scrapers.reddit_scraper import scrape_reddit
-from .scrapers.hn_scraper import scrape_hn
-from .scrapers.bs4_scraper import scrape_web_reviews
-from .scrapers.exa_scraper import scrape_with_exa  # <--- NEW IMPORT
+from .scrapers.reddit_scraper import stream_reddit
+from .scrapers.hn_scraper import stream_hn
+from .scrapers.bs4_scraper import stream_web_reviews
+from .scrapers.exa_scraper import stream_with_exa  # <--- NEW IMPORT
+from .scrapers.streaming import collect
 
 from .dedup import deduplicate_and_weight
 
-app = FastAPI(title="Scraper Service")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    session_pool.start()
+    yield
+    await session_pool.close()
 
-@app.post("/scrape", response_model=ScrapeResponse)
-async def scrape(req: ScrapeRequest):
-    query = req.product_name
-    print(f"[Scraper] Starting orchestra for: {query}")
+app = FastAPI(title="Scraper Service", lifespan=lifespan, default_response_class=CodecResponse)
+# msgpack/zstd bodies on request; JSON stays the default
+app.router.route_class = CodecRoute
+app.add_middleware(TraceMiddleware)
+app.add_middleware(LoadMiddleware)
 
-    # Run ALL scrapers in parallel
-    results = await asyncio.gather(
-        scrape_reddit(query, limit=20),
-        scrape_hn(query, limit=20),
-        scrape_web_reviews(query, limit=10), # Reduced limit since Exa covers web too
-        scrape_with_exa(query, limit=20),    # <--- NEW CALL
-        return_exceptions=True,
-    )
-
-    # Unpack results safely
-    reddit_reviews = results[0] if isinstance(results[0], list) else []
-    hn_reviews     = results[1] if isinstance(results[1], list) else []
-    web_reviews    = results[2] if isinstance(results[2], list) else []
-    exa_reviews    = results[3] if isinstance(results[3], list) else []
+@app.exception_handler(JobCancelled)
+async def job_cancelled_handler(request: Request, exc: JobCancelled):
+    return JSONResponse(status_code=409, content={"detail": "Job was cancelled"})
 
-    # Log errors
-    if isinstance(results[0], Exception): print(f"[Scraper] Reddit failed: {results[0]}")
-    if isinstance(results[1], Exception): print(f"[Scraper] HN failed: {results[1]}")
-    if isinstance(results[2], Exception): print(f"[Scraper] Web failed: {results[2]}")
-    if isinstance(results[3], Exception): print(f"[Scraper] Exa failed: {results[3]}")
+def _source_streams(query: str) -> dict:
+    """Each source as an async generator of review batches."""
+    return {
+        "reddit": stream_reddit(query, limit=20),
+        "hn":     stream_hn(query, limit=20),
+        "web":    stream_web_reviews(query, limit=10), # Reduced limit since Exa covers web too
+        "exa":    stream_with_exa(query, limit=20),    # <--- NEW CALL
+    }
 
-    # Combine all sources
-    all_reviews = reddit_reviews + hn_reviews + web_reviews + exa_reviews
+def _source_calls(query: str) -> dict:
+    return {name: traced(f"scrape.{name}", collect(batches)) for name, batches in _source_streams(query).items()}
 
-    # 1. Deduplicate by URL (Exact Match)
-    seen_urls = set()
+def _dedup_by_url(reviews: list[ReviewItem], seen_urls: set) -> list[ReviewItem]:
     unique_reviews = []
-    for r in all_reviews:
+    for r in reviews:
         if r.url not in seen_urls:
             seen_urls.add(r.url)
             unique_reviews.append(r)
+    return unique_reviews
 
-    print(f"[Scraper] Total raw: {len(all_reviews)} -> Unique URL: {len(unique_reviews)}")
-
-    # 2. Semantic Deduplication & Clustering (The "Smart" Dedup)
-    weighted_clusters = deduplicate_and_weight(unique_reviews)
+def _cluster_reviews(unique_reviews: list[ReviewItem]) -> list[ReviewItem]:
+    # Semantic Deduplication & Clustering (The "Smart" Dedup)
+    with span("dedup.embed_and_cluster", reviews=len(unique_reviews)):
+        weighted_clusters = deduplicate_and_weight(unique_reviews)
 
-    # 3. Format for Response
-    cluster_reviews = [
+    return [
         ReviewItem(
             text=c["representative_text"],
             source=c["source"],
@@ -67,12 +74,125 @@ async def scrape(req: ScrapeRequest):
         for c in weighted_clusters
     ]
 
+@app.post("/scrape", response_model=ScrapeResponse)
+async def scrape(req: ScrapeRequest):
+    query = req.product_name
+    print(f"[Scraper] Starting orchestra for: {query}")
+
+    # Run ALL scrapers in parallel (aborted by POST /cancel/{job_id})
+    calls = _source_calls(query)
+    with cancellations.track(req.job_id) as token:
+        results = await token.run(asyncio.gather(*calls.values(), return_exceptions=True))
+
+    all_reviews = []
+    for name, result in zip(calls, results):
+        if isinstance(result, Exception):
+            print(f"[Scraper] {name} failed: {result}")
+        elif isinstance(result, list):
+            all_reviews.extend(result)
+
+    # 1. Deduplicate by URL (Exact Match)
+    unique_reviews = _dedup_by_url(all_reviews, set())
+
+    print(f"[Scraper] Total raw: {len(all_reviews)} -> Unique URL: {len(unique_reviews)}")
+
+    # 2. Cluster + format for response
+    cluster_reviews = _cluster_reviews(unique_reviews)
+
     return ScrapeResponse(
         job_id=req.job_id,
         reviews=[r.model_dump() for r in cluster_reviews],
         total_count=len(cluster_reviews),
     )
 
+@app.post("/scrape/stream")
+async def scrape_stream(req: ScrapeRequest):
+    """
+    NDJSON variant of /scrape. Emits one `reviews` frame per source as soon
+    as that source finishes (URL-deduped against earlier frames), then a
+    final `clusters` frame carrying exactly what /scrape would return.
+    """
+    query = req.product_name
+    print(f"[Scraper] Starting streamed orchestra for: {query}")
+
+    async def frames():
+        # One pump task per source hands its reviews to a shared queue as soon as it finishes
+        queue: asyncio.Queue = asyncio.Queue()
+        tasks = [asyncio.create_task(_pump(name, batches, queue)) for name, batches in _source_streams(query).items()]
+        seen_urls = set()
+        unique_reviews = []
+        with cancellations.track(req.job_id) as token:
+            token.tasks.update(tasks)
+            try:
+                running = len(tasks)
+                while running:
+                    name, batch = await queue.get()
+                    running -= 1
+                    if token.cancelled:
+                        print(f"[Scraper] Job {req.job_id} cancelled, stopping crawl")
+                        yield _frame({"type": "cancelled", "job_id": req.job_id})
+                        return
+                    if batch is None:
+                        continue
+                    batch = _dedup_by_url(batch, seen_urls)
+                    unique_reviews.extend(batch)
+                    yield _frame({
+                        "type": "reviews",
+                        "source": name,
+                        "reviews": [r.model_dump() for r in batch],
+                    })
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+            print(f"[Scraper] Unique URL: {len(unique_reviews)}")
+            # Embedding is CPU-bound; keep the event loop free for other streams
+            try:
+                cluster_reviews = await token.run(asyncio.to_thread(_cluster_reviews, unique_reviews))
+            except JobCancelled:
+                yield _frame({"type": "cancelled", "job_id": req.job_id})
+                return
+        yield _frame({
+            "type": "clusters",
+            "job_id": req.job_id,
+            "reviews": [r.model_dump() for r in cluster_reviews],
+            "total_count": len(cluster_reviews),
+        })
+
+    return StreamingResponse(frames(), media_type="application/x-ndjson")
+
+async def _pump(name: str, batches, queue: asyncio.Queue):
+    """Collect one source's stream and queue it as (name, reviews); reviews is None if the source failed."""
+    reviews = None
+    try:
+        with span(f"scrape.{name}"):
+            reviews = await collect(batches)
+    except Exception as e:
+        print(f"[Scraper] {name} failed: {e}")
+    finally:
+        queue.put_nowait((name, reviews))
+
+def _frame(payload: dict) -> str:
+    return json.dumps(payload) + "\n"
+
+@app.post("/cancel/{job_id}")
+async def cancel(job_id: str):
+    """Abort in-flight scrapes for `job_id`. Cancelling an unknown job is a no-op."""
+    stopped = cancellations.cancel(job_id)
+    if stopped:
+        print(f"[Scraper] Cancelled {stopped} request(s) for job {job_id}")
+    return {"job_id": job_id, "cancelled": stopped}
+
+@app.get("/traces/{trace_id}")
+def get_trace(trace_id: str):
+    """Spans recorded for `trace_id`. Drained on read — the gateway stores them per job."""
+    return {"spans": drain(trace_id)}
+
+@app.get("/load")
+def get_load():
+    """Live load for the gateway's admission control."""
+    return {**load.snapshot(), "sessions": session_pool.stats(), "domain_rates": rate_limiter.stats(), "http_cache": http_cache.stats()}
+
 @app.get("/health")
 def health():
     return {"status": "ok"}
\ No newline at end of file
@@ -0,0 +1,104 @@
+"""
+rate_limiter.py — per-domain token buckets shared by every scraper and job.
+All requests from the session pool wait here for their domain's token, so
+concurrent jobs share one budget per site instead of each sleeping on its
+own. Each bucket refills at the domain's rate (SCRAPER_RATE_LIMITS, e.g.
+"www.reddit.com=0.5,hn.algolia.com=2" requests/second) with up to
+SCRAPER_RATE_BURST requests at once, and every wait gets a little jitter so
+requests don't line up in a machine-like rhythm.
+
+Adaptive: a 429/403 halves the domain's rate and pauses it (for Retry-After
+when the site sends one); each success afterwards wins back a tenth of the
+configured rate.
+"""
+import os
+import time
+import random
+import asyncio
+
+def _parse_rates(raw: str) -> dict[str, float]:
+    pairs = (item.split("=", 1) for item in raw.split(",") if "=" in item)
+    return {k.strip(): float(v) for k, v in pairs}
+
+SCRAPER_RATE_LIMITS  = _parse_rates(os.getenv(
+    "SCRAPER_RATE_LIMITS", "www.reddit.com=0.5,hn.algolia.com=2,html.duckduckgo.com=0.5"
+))
+SCRAPER_DEFAULT_RATE = float(os.getenv("SCRAPER_DEFAULT_RATE", "1.0"))
+SCRAPER_RATE_BURST   = float(os.getenv("SCRAPER_RATE_BURST", "2"))
+# Fraction of the refill interval added at random to each wait
+SCRAPER_RATE_JITTER  = float(os.getenv("SCRAPER_RATE_JITTER", "0.5"))
+SCRAPER_BLOCK_PAUSE  = float(os.getenv("SCRAPER_BLOCK_PAUSE", "5"))
+
+THROTTLED_STATUSES = {403, 429}
+MIN_RATE_FRACTION = 0.05
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float = SCRAPER_RATE_BURST):
+        self.base_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        # Waiters queue on the lock, so tokens are handed out in arrival order
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    break
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+        await asyncio.sleep(random.uniform(0, SCRAPER_RATE_JITTER / self.rate))
+
+    def throttled(self, retry_after: float | None):
+        self.rate = max(self.base_rate * MIN_RATE_FRACTION, self.rate / 2)
+        self.tokens = 0
+        self.paused_until = time.monotonic() + (retry_after if retry_after is not None else SCRAPER_BLOCK_PAUSE)
+
+    def succeeded(self):
+        self.rate = min(self.base_rate, self.rate + self.base_rate / 10)
+
+class RateLimiter:
+    def __init__(self):
+        self._buckets: dict[str, TokenBucket] = {}
+
+    def bucket(self, domain: str) -> TokenBucket:
+        bucket = self._buckets.get(domain)
+        if bucket is None:
+            bucket = self._buckets[domain] = TokenBucket(SCRAPER_RATE_LIMITS.get(domain, SCRAPER_DEFAULT_RATE))
+        return bucket
+
+    async def acquire(self, domain: str):
+        await self.bucket(domain).acquire()
+
+    def feedback(self, domain: str, status_code: int, retry_after: str | None = None):
+        bucket = self.bucket(domain)
+        if status_code in THROTTLED_STATUSES:
+            bucket.throttled(_retry_after_seconds(retry_after))
+            print(f"[RateLimiter] {domain} answered {status_code}, slowing to {bucket.rate:.2f} req/s")
+        else:
+            bucket.succeeded()
+
+    def stats(self) -> dict[str, float]:
+        return {domain: round(b.rate, 3) for domain, b in self._buckets.items()}
+
+def _retry_after_seconds(value: str | None) -> float | None:
+    if not value:
+        return None
+    try:
+        return min(float(value), 300.0)
+    except ValueError:
+        return None  # HTTP-date form; fall back to the default pause
+
+rate_limiter = RateLimiter()
@@ -1,9 +1,10 @@
 import asyncio
-import random
 from datetime import datetime
 from urllib.parse import quote_plus
 from bs4 import BeautifulSoup
-from curl_cffi.requests import AsyncSession, RequestsError
+from curl_cffi.requests import RequestsError
+from ..session_pool import session_pool, PooledClient
+from .streaming import as_completed, unique_batches, collect
 from ..models import ReviewItem
 
 # We drop the hardcoded User-Agent. curl_cffi will generate the exact 
@@ -18,12 +19,8 @@ EXTRA_HEADERS = {
     "Sec-Fetch-User": "?1",
 }
 
-async def _human_sleep(min_sec: float = 1.5, max_sec: float = 3.5):
-    """Simulates human reading/scrolling delay."""
-    await asyncio.sleep(random.uniform(min_sec, max_sec))
-
-async def _fetch_with_retry(client: AsyncSession, url: str, max_retries: int = 2):
-    """Gracefully handles Cloudflare 403s and 429 Rate Limits."""
+async def _fetch_with_retry(client: PooledClient, url: str, max_retries: int = 2):
+    """Gracefully handles Cloudflare 403s and 429 Rate Limits (the rate limiter pauses the host)."""
     for attempt in range(max_retries):
         try:
             # Set a fake referer for each request to look organic
@@ -31,9 +28,7 @@ async def _fetch_with_retry(client: AsyncSession, url: str, max_retries: int = 2
             resp = await client.get(url)
             
             if resp.status_code in [403, 429]:
-                wait_time = (attempt + 1) * random.uniform(3.0, 6.0)
-                print(f"[Web Scraper] Blocked ({resp.status_code}) on {url}. Backing off {wait_time:.1f}s...")
-                await asyncio.sleep(wait_time)
+                print(f"[Web Scraper] Blocked ({resp.status_code}) on {url}, retrying at the reduced rate...")
                 continue
             return resp
         except RequestsError as e:
@@ -43,25 +38,23 @@ async def _fetch_with_retry(client: AsyncSession, url: str, max_retries: int = 2
 
 async def scrape_web_reviews(query: str, limit: int = 15) -> list[ReviewItem]:
     """Finds review pages and scrapes them using Chrome TLS impersonation."""
-    reviews = []
-    
-    # We share a single stealth session across all strategies to simulate one user's browser
-    async with AsyncSession(impersonate="chrome", headers=EXTRA_HEADERS, timeout=25.0, allow_redirects=True) as client:
-        # Strategy 1: Direct G2 search
-        g2_reviews = await _scrape_g2(client, query)
-        reviews.extend(g2_reviews)
-        
-        # Strategy 2: ProductHunt discussion
-        ph_reviews = await _scrape_producthunt(client, query)
-        reviews.extend(ph_reviews)
-        
-        # Strategy 3: General blog search via DuckDuckGo HTML
-        blog_reviews = await _scrape_duckduckgo_blogs(client, query)
-        reviews.extend(blog_reviews)
+    return await collect(stream_web_reviews(query, limit))
+
+async def stream_web_reviews(query: str, limit: int = 15):
+    """scrape_web_reviews as an async generator: one batch per strategy, as each finishes."""
     
-    return reviews[:limit]
+    # One stealth client across all strategies; each host's connections come from the shared pool.
+    # The strategies hit different hosts, so they run concurrently, each paced by its host's rate limit.
+    async with session_pool.client(impersonate="chrome", headers=EXTRA_HEADERS, timeout=25.0, allow_redirects=True) as client:
+        strategies = [
+            _scrape_g2(client, query),                 # Strategy 1: Direct G2 search
+            _scrape_producthunt(client, query),        # Strategy 2: ProductHunt discussion
+            _scrape_duckduckgo_blogs(client, query),   # Strategy 3: General blog search via DuckDuckGo HTML
+        ]
+        async for batch in unique_batches(as_completed(strategies), limit):
+            yield batch
 
-async def _scrape_g2(client: AsyncSession, query: str) -> list[ReviewItem]:
+async def _scrape_g2(client: PooledClient, query: str) -> list[ReviewItem]:
     reviews = []
     slug = query.lower().replace(" ", "-")
     encoded_query = quote_plus(query)
@@ -96,7 +89,6 @@ async def _scrape_g2(client: AsyncSession, query: str) -> list[ReviewItem]:
                         platform="g2",
                     ))
             
-            await _human_sleep()
             if reviews:
                 break
                 
@@ -105,7 +97,7 @@ async def _scrape_g2(client: AsyncSession, query: str) -> list[ReviewItem]:
             continue
     return reviews
 
-async def _scrape_producthunt(client: AsyncSession, query: str) -> list[ReviewItem]:
+async def _scrape_producthunt(client: PooledClient, query: str) -> list[ReviewItem]:
     reviews = []
     slug = query.lower().replace(" ", "-")
     encoded_query = quote_plus(query)
@@ -139,7 +131,6 @@ async def _scrape_producthunt(client: AsyncSession, query: str) -> list[ReviewIt
                         platform="producthunt",
                     ))
             
-            await _human_sleep()
             if reviews:
                 break
                 
@@ -147,7 +138,7 @@ async def _scrape_producthunt(client: AsyncSession, query: str) -> list[ReviewIt
             print(f"[PH] Error: {e}")
     return reviews
 
-async def _scrape_duckduckgo_blogs(client: AsyncSession, query: str) -> list[ReviewItem]:
+async def _scrape_duckduckgo_blogs(client: PooledClient, query: str) -> list[ReviewItem]:
     reviews = []
     current_year = datetime.now().year # Dynamically grab 2026
     search_query = f"{query} review {current_year}"
@@ -165,39 +156,41 @@ async def _scrape_duckduckgo_blogs(client: AsyncSession, query: str) -> list[Rev
         result_urls = [link.get("href") or link.get_text(strip=True) for link in result_links]
         result_urls = [u for u in result_urls if u and u.startswith("http")]
         
-        for url in result_urls[:3]:
-            await _human_sleep()
-            try:
-                page_resp = await _fetch_with_retry(client, url)
-                if not page_resp or page_resp.status_code != 200:
-                    continue
-                
-                page_soup = BeautifulSoup(page_resp.content, "html.parser")
-                
-                for tag in page_soup(["nav", "footer", "script", "style", "aside"]):
-                    tag.decompose()
-                
-                main = page_soup.select_one("article") or \
-                       page_soup.select_one("main") or \
-                       page_soup.select_one(".content") or \
-                       page_soup.select_one(".post-content")
-                
-                if main:
-                    text = main.get_text(separator=" ", strip=True)
-                    if len(text) > 200:
-                        reviews.append(ReviewItem(
-                            text=text,
-                            source="blog",
-                            url=url,
-                            date="recent",
-                            upvotes=0,
-                            platform="web",
-                        ))
-            except Exception as e:
-                print(f"[Blog] Error scraping {url}: {e}")
-                continue
+        pages = await asyncio.gather(*(_scrape_blog_page(client, url) for url in result_urls[:3]))
+        reviews = [r for r in pages if r is not None]
                 
     except Exception as e:
         print(f"[DDG] Error: {e}")
     
-    return reviews
\ No newline at end of file
+    return reviews
+
+async def _scrape_blog_page(client: PooledClient, url: str) -> ReviewItem | None:
+    try:
+        page_resp = await _fetch_with_retry(client, url)
+        if not page_resp or page_resp.status_code != 200:
+            return None
+        
+        page_soup = BeautifulSoup(page_resp.content, "html.parser")
+        
+        for tag in page_soup(["nav", "footer", "script", "style", "aside"]):
+            tag.decompose()
+        
+        main = page_soup.select_one("article") or \
+               page_soup.select_one("main") or \
+               page_soup.select_one(".content") or \
+               page_soup.select_one(".post-content")
+        
+        if main:
+            text = main.get_text(separator=" ", strip=True)
+            if len(text) > 200:
+                return ReviewItem(
+                    text=text,
+                    source="blog",
+                    url=url,
+                    date="recent",
+                    upvotes=0,
+                    platform="web",
+                )
+    except Exception as e:
+        print(f"[Blog] Error scraping {url}: {e}")
+    return None
\ No newline at end of file
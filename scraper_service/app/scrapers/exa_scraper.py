@@ -1,10 +1,6 @@
-from exa_py import Exa
-import os
-import asyncio
-from dotenv import load_dotenv
 from ..models import ReviewItem
-
-load_dotenv()
+from pie_shared import exa_client
+from .streaming import as_completed, unique_batches, collect
 
 # --- Configuration for Diversification ---
 SOURCE_MAPPING = {
@@ -52,54 +48,46 @@ RESEARCH_STRATEGIES = [
     }
 ]
 async def scrape_with_exa(query: str, limit: int = 20) -> list[ReviewItem]:
+    return await collect(stream_with_exa(query, limit))
+
+async def stream_with_exa(query: str, limit: int = 20):
+    """scrape_with_exa as an async generator: one batch per research strategy, as each finishes."""
     print(f"[Exa] Starting diversified neural search for: {query}")
     
-    api_key = os.getenv("EXA_API_KEY")
-    if not api_key:
+    if not exa_client.available():
         print("[Exa] ⚠️ API Key missing!")
-        return []
+        return
 
-    # Run multiple search strategies in parallel
+    # Run multiple search strategies in parallel (cached and throttled by exa_client)
     tasks = [
-        asyncio.to_thread(_run_exa_sync, api_key, f"{strat['query_suffix']} {query}", strat['num'])
+        _run_exa(f"{strat['query']} {query}", strat['num'], strat.get('domains'))
         for strat in RESEARCH_STRATEGIES
     ]
     
-    results_nested = await asyncio.gather(*tasks)
-    
-    # Flatten results and remove duplicates by URL
-    all_reviews = []
-    seen_urls = set()
-    for sublist in results_nested:
-        for item in sublist:
-            if item.url not in seen_urls:
-                all_reviews.append(item)
-                seen_urls.add(item.url)
+    # Remove duplicates by URL as the strategies come in
+    found = 0
+    async for batch in unique_batches(as_completed(tasks), limit):
+        found += len(batch)
+        yield batch
 
-    print(f"[Exa] Total unique results found: {len(all_reviews)}")
-    return all_reviews[:limit]
+    print(f"[Exa] Total unique results found: {found}")
 
-def _run_exa_sync(api_key: str, full_query: str, limit: int, domains: list = None) -> list[ReviewItem]:
+async def _run_exa(full_query: str, limit: int, domains: list = None) -> list[ReviewItem]:
     try:
-        exa = Exa(api_key)
         # We switch to 'auto' or 'deep' for better reasoning
-        search_params = {
-            "query": full_query,
-            "type": "auto", # 'auto' intelligently balances neural + keyword
-            "num_results": limit,
-            "text": {"max_characters": 1500}, # Increased for better LLM context later
-            "highlights": {"num_sentences": 5, "highlights_per_url": 1},
-            "livecrawl": "always" # Ensures you aren't getting 2-year-old cached data
-        }
-        
-        if domains:
-            search_params["include_domains"] = domains
-
-        response = exa.search_and_contents(**search_params)
+        results = await exa_client.search_and_contents(
+            full_query,
+            num_results=limit,
+            include_domains=domains,
+            type="auto", # 'auto' intelligently balances neural + keyword
+            text={"max_characters": 1500}, # Increased for better LLM context later
+            highlights={"num_sentences": 5, "highlights_per_url": 1},
+            livecrawl="always" # Fresh crawl on a miss; repeats within EXA_CACHE_TTL_SECONDS come from the cache
+        )
 
         reviews = []
-        for result in response.results:
-            domain = result.url.lower()
+        for result in results:
+            domain = result["url"].lower()
             platform = "web"
             for key, val in SOURCE_MAPPING.items():
                 if key in domain:
@@ -107,15 +95,15 @@ def _run_exa_sync(api_key: str, full_query: str, limit: int, domains: list = Non
                     break
 
             # If it's a deep review, we want more than just a snippet
-            content = result.highlights[0] if result.highlights else (result.text[:1200] if result.text else "")
+            content = result["highlights"][0] if result["highlights"] else (result["text"][:1200] if result["text"] else "")
             
             if len(content) < 60: continue
 
             reviews.append(ReviewItem(
-                text=f"Title: {result.title}\nContent: {content}",
+                text=f"Title: {result['title']}\nContent: {content}",
                 source=f"exa_{platform}",
-                url=result.url,
-                date=result.published_date or "2026-recent", # Grounding it in current year
+                url=result["url"],
+                date=result["published_date"] or "2026-recent", # Grounding it in current year
                 upvotes=0,
                 platform=platform
             ))
@@ -1,8 +1,9 @@
 import asyncio
-import random
 from urllib.parse import quote_plus
 from ..models import ReviewItem
-from curl_cffi.requests import AsyncSession, RequestsError
+from curl_cffi.requests import RequestsError
+from ..session_pool import session_pool, PooledClient
+from .streaming import as_completed, unique_batches, collect
 
 HN_API = "https://hn.algolia.com/api/v1"
 
@@ -13,19 +14,13 @@ EXTRA_HEADERS = {
     "Referer": "https://news.ycombinator.com/",
 }
 
-async def _human_sleep(min_sec: float = 1.0, max_sec: float = 2.5):
-    """Simulates a slight delay between requests."""
-    await asyncio.sleep(random.uniform(min_sec, max_sec))
-
-async def _fetch_with_retry(client: AsyncSession, url: str, max_retries: int = 3):
-    """Handles Algolia's rate limits (429) with exponential backoff."""
+async def _fetch_with_retry(client: PooledClient, url: str, max_retries: int = 3):
+    """Handles Algolia's rate limits (429); the shared rate limiter does the backing off."""
     for attempt in range(max_retries):
         try:
             resp = await client.get(url)
             if resp.status_code == 429:
-                wait_time = (attempt + 1) * random.uniform(2.0, 4.0)
-                print(f"[HN] 429 Rate Limit hit. Backing off for {wait_time:.1f}s...")
-                await asyncio.sleep(wait_time)
+                print(f"[HN] 429 Rate Limit hit, retrying at the reduced rate...")
                 continue
             return resp
         except RequestsError as e:
@@ -35,7 +30,10 @@ async def _fetch_with_retry(client: AsyncSession, url: str, max_retries: int = 3
 
 async def scrape_hn(query: str, limit: int = 20) -> list[ReviewItem]:
     """Scrape HN via Algolia using Chrome TLS impersonation and safe encoding."""
-    reviews = []
+    return await collect(stream_hn(query, limit))
+
+async def stream_hn(query: str, limit: int = 20):
+    """scrape_hn as an async generator: one batch per Algolia endpoint, as each answers."""
     
     # URL-encode the query so spaces and special characters don't break the API call
     encoded_query = quote_plus(query)
@@ -47,49 +45,40 @@ async def scrape_hn(query: str, limit: int = 20) -> list[ReviewItem]:
         f"{HN_API}/search?query={encoded_review_query}&tags=story&hitsPerPage=10",
     ]
     
-    # Use curl_cffi to perfectly mimic Chrome's network signature
-    async with AsyncSession(impersonate="chrome", headers=EXTRA_HEADERS, timeout=20.0) as client:
-        for i, url in enumerate(endpoints):
-            try:
-                resp = await _fetch_with_retry(client, url)
-                if not resp or resp.status_code != 200:
-                    continue
-                
-                hits = resp.json().get("hits", [])
-                
-                for hit in hits:
-                    # Stories have title+story_text, comments have comment_text
-                    text = hit.get("comment_text") or hit.get("story_text") or ""
-                    title = hit.get("title", "")
-                    combined = f"{title}\n{text}".strip()
-                    
-                    # Ignore overly short or empty comments
-                    if len(combined) < 30:
-                        continue
-                    
-                    reviews.append(ReviewItem(
-                        text=combined,
-                        source="hacker_news",
-                        url=f"https://news.ycombinator.com/item?id={hit.get('objectID', '')}",
-                        date=hit.get("created_at", "unknown"),
-                        upvotes=hit.get("points", 0) or hit.get("num_comments", 0),
-                        platform="hn",
-                    ))
-                
-                # Add a small human delay between endpoint calls, except after the last one
-                if i < len(endpoints) - 1:
-                    await _human_sleep()
-                    
-            except Exception as e:
-                print(f"[HN] Error processing endpoint: {e}")
+    # Use curl_cffi to perfectly mimic Chrome's network signature (pooled, kept alive across jobs).
+    # The endpoints are fetched concurrently; Algolia's rate limiter bucket paces them.
+    async with session_pool.client(impersonate="chrome", headers=EXTRA_HEADERS, timeout=20.0) as client:
+        # Deduplicate by URL (`limit` is per endpoint, so no overall cap)
+        async for batch in unique_batches(as_completed([_fetch_endpoint(client, url) for url in endpoints])):
+            yield batch
+
+async def _fetch_endpoint(client: PooledClient, url: str) -> list[ReviewItem]:
+    reviews = []
+    try:
+        resp = await _fetch_with_retry(client, url)
+        if not resp or resp.status_code != 200:
+            return []
+        
+        hits = resp.json().get("hits", [])
+        
+        for hit in hits:
+            # Stories have title+story_text, comments have comment_text
+            text = hit.get("comment_text") or hit.get("story_text") or ""
+            title = hit.get("title", "")
+            combined = f"{title}\n{text}".strip()
+            
+            # Ignore overly short or empty comments
+            if len(combined) < 30:
                 continue
-    
-    # Deduplicate by URL
-    seen = set()
-    unique = []
-    for r in reviews:
-        if r.url not in seen:
-            seen.add(r.url)
-            unique.append(r)
-    
-    return unique
\ No newline at end of file
+            
+            reviews.append(ReviewItem(
+                text=combined,
+                source="hacker_news",
+                url=f"https://news.ycombinator.com/item?id={hit.get('objectID', '')}",
+                date=hit.get("created_at", "unknown"),
+                upvotes=hit.get("points", 0) or hit.get("num_comments", 0),
+                platform="hn",
+            ))
+    except Exception as e:
+        print(f"[HN] Error processing endpoint: {e}")
+    return reviews
\ No newline at end of file
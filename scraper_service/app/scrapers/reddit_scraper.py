@@ -1,9 +1,10 @@
 import asyncio
-import random
 from datetime import datetime, timezone
 from urllib.parse import quote_plus
 from ..models import ReviewItem
-from curl_cffi.requests import AsyncSession, RequestsError
+from curl_cffi.requests import RequestsError
+from ..session_pool import session_pool, PooledClient
+from .streaming import as_completed, unique_batches, collect
 
 # We remove the static User-Agent because curl_cffi's "impersonate" 
 # will automatically generate the perfect, matching User-Agent and headers.
@@ -22,134 +23,128 @@ SUBREDDITS_TO_SEARCH = [
     "AskReddit", "ConsumerBehavior", "BuyItForLife", "gadgets"
 ]
 
-async def _human_sleep(min_sec: float = 2.0, max_sec: float = 4.5):
-    """Simulates a human reading/scrolling delay."""
-    await asyncio.sleep(random.uniform(min_sec, max_sec))
-
 async def scrape_reddit(query: str, limit: int = 30) -> list[ReviewItem]:
     """Stealth search Reddit via old.reddit.com JSON using Chrome TLS impersonation."""
-    reviews = []
+    return await collect(stream_reddit(query, limit))
+
+async def stream_reddit(query: str, limit: int = 30):
+    """scrape_reddit as an async generator: one batch per search term / comment crawl, as each finishes."""
     search_terms = [
         f"{query} review",
         f"{query} problems",
         f"{query} alternatives",
     ]
 
-    # impersonate="chrome" perfectly mimics a real Chrome browser's network fingerprint
-    async with AsyncSession(impersonate="chrome", headers=EXTRA_HEADERS, timeout=30.0) as client:
-        for term in search_terms:
-            try:
-                encoded_term = quote_plus(term)
-                url = f"https://www.reddit.com/search.json?q={encoded_term}&sort=relevance&t=year&limit=10"
-                
-                # Fetch with retry logic for 429s
-                resp = await _fetch_with_retry(client, url)
-                if not resp or resp.status_code != 200:
-                    continue
-                
-                data = resp.json()
-                posts = data.get("data", {}).get("children", [])
-                
-                for post in posts:
-                    p = post.get("data", {})
-                    title = p.get("title", "")
-                    selftext = p.get("selftext", "")
-                    combined = f"Title: {title}\nReview: {selftext}"
-                    
-                    if len(combined.strip()) < 30:
-                        continue
-                    
-                    ts = p.get("created_utc", 0)
-                    date_str = datetime.fromtimestamp(ts, tz=timezone.utc).isoformat() if ts else "unknown"
-                    
-                    reviews.append(ReviewItem(
-                        text=combined,
-                        source="reddit",
-                        url=f"https://reddit.com{p.get('permalink', '')}",
-                        date=date_str,
-                        upvotes=p.get("score", 0),
-                        platform="reddit",
-                    ))
-                
-                await _human_sleep() # Jittered sleep to avoid pattern detection
-                
-            except Exception as e:
-                print(f"[Reddit] Error for '{term}': {e}")
-                continue
-    
-        # Scrape comments using the SAME secure session
-        comment_reviews = await _scrape_top_post_comments(client, query)
-        reviews.extend(comment_reviews)
-    
-    # Deduplicate by URL
-    seen = set()
-    unique = []
-    for r in reviews:
-        if r.url not in seen:
-            seen.add(r.url)
-            unique.append(r)
-    
-    return unique[:limit]
+    # impersonate="chrome" perfectly mimics a real Chrome browser's network fingerprint.
+    # Requests go through the service-wide pool, so connections to Reddit are reused across jobs.
+    # Pacing is left to the shared per-domain rate limiter, so the searches and
+    # the comment fetch run concurrently within Reddit's budget.
+    async with session_pool.client(impersonate="chrome", headers=EXTRA_HEADERS, timeout=30.0) as client:
+        fetches = [_search_term(client, term) for term in search_terms]
+        fetches.append(_scrape_top_post_comments(client, query))
+        # Deduplicated by URL across batches, capped at `limit`
+        async for batch in unique_batches(as_completed(fetches), limit):
+            yield batch
 
 
-async def _scrape_top_post_comments(client: AsyncSession, query: str) -> list[ReviewItem]:
-    """Get comments from the most relevant Reddit post using the established session."""
+async def _search_term(client: PooledClient, term: str) -> list[ReviewItem]:
     reviews = []
     try:
-        encoded = quote_plus(query)
-        url = f"https://www.reddit.com/search.json?q={encoded}&sort=top&t=year&limit=3"
+        encoded_term = quote_plus(term)
+        url = f"https://www.reddit.com/search.json?q={encoded_term}&sort=relevance&t=year&limit=10"
         
+        # Fetch with retry logic for 429s
         resp = await _fetch_with_retry(client, url)
         if not resp or resp.status_code != 200:
             return []
         
-        posts = resp.json().get("data", {}).get("children", [])
-        for post in posts[:2]:
-            permalink = post["data"].get("permalink", "")
-            if not permalink:
-                continue
-            
-            comment_url = f"https://www.reddit.com{permalink}.json?limit=20"
-            await _human_sleep(1.5, 3.0)
+        data = resp.json()
+        posts = data.get("data", {}).get("children", [])
+        
+        for post in posts:
+            p = post.get("data", {})
+            title = p.get("title", "")
+            selftext = p.get("selftext", "")
+            combined = f"Title: {title}\nReview: {selftext}"
             
-            cresp = await _fetch_with_retry(client, comment_url)
-            if not cresp or cresp.status_code != 200:
+            if len(combined.strip()) < 30:
                 continue
             
-            comment_data = cresp.json()
-            if len(comment_data) < 2:
-                continue
+            ts = p.get("created_utc", 0)
+            date_str = datetime.fromtimestamp(ts, tz=timezone.utc).isoformat() if ts else "unknown"
             
-            comments = comment_data[1].get("data", {}).get("children", [])
-            for c in comments:
-                body = c.get("data", {}).get("body", "")
-                if len(body) > 50:
-                    ts = c["data"].get("created_utc", 0)
-                    date_str = datetime.fromtimestamp(ts, tz=timezone.utc).isoformat() if ts else "unknown"
-                    reviews.append(ReviewItem(
-                        text=body[:1000],
-                        source="reddit_comment",
-                        url=f"https://reddit.com{permalink}",
-                        date=date_str,
-                        upvotes=c["data"].get("score", 0),
-                        platform="reddit",
-                    ))
+            reviews.append(ReviewItem(
+                text=combined,
+                source="reddit",
+                url=f"https://reddit.com{p.get('permalink', '')}",
+                date=date_str,
+                upvotes=p.get("score", 0),
+                platform="reddit",
+            ))
+    except Exception as e:
+        print(f"[Reddit] Error for '{term}': {e}")
+    return reviews
+
+
+async def _scrape_top_post_comments(client: PooledClient, query: str) -> list[ReviewItem]:
+    """Get comments from the most relevant Reddit posts, fetched concurrently."""
+    try:
+        encoded = quote_plus(query)
+        url = f"https://www.reddit.com/search.json?q={encoded}&sort=top&t=year&limit=3"
+        
+        resp = await _fetch_with_retry(client, url)
+        if not resp or resp.status_code != 200:
+            return []
+        
+        posts = resp.json().get("data", {}).get("children", [])
+        permalinks = [p["data"].get("permalink", "") for p in posts[:2]]
+        results = await asyncio.gather(*(_post_comments(client, p) for p in permalinks if p))
     except Exception as e:
         print(f"[Reddit Comments] Error: {e}")
+        return []
     
+    return [r for batch in results for r in batch]
+
+
+async def _post_comments(client: PooledClient, permalink: str) -> list[ReviewItem]:
+    reviews = []
+    try:
+        comment_url = f"https://www.reddit.com{permalink}.json?limit=20"
+        cresp = await _fetch_with_retry(client, comment_url)
+        if not cresp or cresp.status_code != 200:
+            return []
+        
+        comment_data = cresp.json()
+        if len(comment_data) < 2:
+            return []
+        
+        comments = comment_data[1].get("data", {}).get("children", [])
+        for c in comments:
+            body = c.get("data", {}).get("body", "")
+            if len(body) > 50:
+                ts = c["data"].get("created_utc", 0)
+                date_str = datetime.fromtimestamp(ts, tz=timezone.utc).isoformat() if ts else "unknown"
+                reviews.append(ReviewItem(
+                    text=body[:1000],
+                    source="reddit_comment",
+                    url=f"https://reddit.com{permalink}",
+                    date=date_str,
+                    upvotes=c["data"].get("score", 0),
+                    platform="reddit",
+                ))
+    except Exception as e:
+        print(f"[Reddit Comments] Error: {e}")
     return reviews
 
 
-async def _fetch_with_retry(client: AsyncSession, url: str, max_retries: int = 2):
+async def _fetch_with_retry(client: PooledClient, url: str, max_retries: int = 2):
     """Handles Reddit's occasional '429 Too Many Requests' gracefully."""
     for attempt in range(max_retries):
         try:
             resp = await client.get(url)
             if resp.status_code == 429:
-                # If Reddit catches us, back off exponentially
-                wait_time = (attempt + 1) * random.uniform(4.0, 7.0)
-                print(f"[Reddit] 429 Rate Limit hit. Backing off for {wait_time:.1f}s...")
-                await asyncio.sleep(wait_time)
+                # The rate limiter has already slowed Reddit down for every job; just queue again
+                print(f"[Reddit] 429 Rate Limit hit, retrying at the reduced rate...")
                 continue
             return resp
         except RequestsError as e:
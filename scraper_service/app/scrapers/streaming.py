@@ -0,0 +1,43 @@
+"""
+streaming.py — helpers for the scrapers' async-generator form.
+Every scraper has a `stream_*` generator that yields lists of ReviewItem as
+its individual fetches finish, and a `scrape_*` coroutine that collects the
+same stream into one list.
+"""
+import asyncio
+from typing import AsyncIterator, Awaitable
+from ..models import ReviewItem
+
+async def as_completed(coros: list[Awaitable[list[ReviewItem]]]) -> AsyncIterator[list[ReviewItem]]:
+    """Yield each fetch's batch as soon as it finishes; the rest are cancelled if the consumer stops early."""
+    tasks = [asyncio.ensure_future(c) for c in coros]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+async def unique_batches(batches: AsyncIterator[list[ReviewItem]], limit: int | None = None) -> AsyncIterator[list[ReviewItem]]:
+    """Deduplicate by URL across batches and stop once `limit` reviews (if given) have been yielded."""
+    seen = set()
+    count = 0
+    try:
+        async for batch in batches:
+            unique = []
+            for r in batch:
+                if r.url not in seen:
+                    seen.add(r.url)
+                    unique.append(r)
+            if limit is not None:
+                unique = unique[:limit - count]
+            if unique:
+                count += len(unique)
+                yield unique
+            if limit is not None and count >= limit:
+                break
+    finally:
+        await batches.aclose()  # cancels the fetches still running
+
+async def collect(batches: AsyncIterator[list[ReviewItem]]) -> list[ReviewItem]:
+    return [r async for batch in batches for r in batch]
@@ -0,0 +1,175 @@
+"""
+session_pool.py — long-lived curl_cffi sessions shared by every scrape.
+One AsyncSession per (host, impersonation profile), kept across jobs so
+DNS, TCP and TLS setup (and the host's cookies) are paid once rather than
+per request. Each session is capped at SCRAPER_POOL_MAX_CLIENTS concurrent
+transfers and the pool at SCRAPER_POOL_MAX_HOSTS sessions (idle ones are
+closed least-recently-used first).
+
+Health check: a session that keeps getting blocked (403/429) or failing
+at the network level is recycled — closed and replaced by a fresh one with
+new connections and cookies. Sessions are also recycled after
+SCRAPER_SESSION_MAX_AGE so DNS changes are picked up.
+
+Scrapers use `session_pool.client(...)`, which looks like an AsyncSession
+but sends each request through the pooled session for its URL's host.
+Every request first takes a token from the host's rate limiter bucket;
+GETs are answered from (and stored in) the on-disk http_cache when possible.
+"""
+import os
+import time
+import asyncio
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from urllib.parse import urlsplit
+from curl_cffi.requests import AsyncSession, RequestsError
+from .rate_limiter import rate_limiter
+from .http_cache import http_cache
+
+SCRAPER_POOL_MAX_HOSTS      = int(os.getenv("SCRAPER_POOL_MAX_HOSTS", "64"))
+SCRAPER_POOL_MAX_CLIENTS    = int(os.getenv("SCRAPER_POOL_MAX_CLIENTS", "4"))
+SCRAPER_SESSION_MAX_AGE     = float(os.getenv("SCRAPER_SESSION_MAX_AGE", "1800"))
+SCRAPER_SESSION_MAX_FAILURES = int(os.getenv("SCRAPER_SESSION_MAX_FAILURES", "3"))
+# Hosts every job talks to get their sessions at startup
+SCRAPER_POOL_WARM_HOSTS = [
+    h.strip() for h in os.getenv("SCRAPER_POOL_WARM_HOSTS", "www.reddit.com,hn.algolia.com").split(",") if h.strip()
+]
+
+BLOCKED_STATUSES = {403, 429}
+DEFAULT_IMPERSONATE = "chrome"
+
+@dataclass
+class _PooledSession:
+    session: AsyncSession
+    created_at: float = field(default_factory=time.monotonic)
+    in_use: int = 0
+    failures: int = 0  # consecutive blocked responses or network errors
+
+class SessionPool:
+    def __init__(self, max_hosts: int = SCRAPER_POOL_MAX_HOSTS, max_clients: int = SCRAPER_POOL_MAX_CLIENTS):
+        self.max_hosts = max_hosts
+        self.max_clients = max_clients
+        self._sessions: OrderedDict[tuple[str, str], _PooledSession] = OrderedDict()
+        self.recycled = 0
+        self._closing: set[asyncio.Task] = set()
+
+    def start(self, warm_hosts: list[str] = SCRAPER_POOL_WARM_HOSTS):
+        for host in warm_hosts:
+            self._session((host, DEFAULT_IMPERSONATE))
+
+    async def close(self):
+        for pooled in self._sessions.values():
+            await pooled.session.close()
+        self._sessions.clear()
+        http_cache.close()
+
+    def client(self, impersonate: str = DEFAULT_IMPERSONATE, headers: dict | None = None, **defaults) -> "PooledClient":
+        return PooledClient(self, impersonate, dict(headers or {}), defaults)
+
+    async def request(self, method: str, url: str, impersonate: str = DEFAULT_IMPERSONATE, **kwargs):
+        if method != "GET" or not http_cache.enabled:
+            return await self._send(method, url, impersonate, **kwargs)
+        cached = await http_cache.get(url)
+        if cached is not None and cached.fresh():
+            http_cache.hits += 1
+            return cached.response()
+        if cached is not None:
+            kwargs["headers"] = {**kwargs.get("headers", {}), **cached.validators()}
+        resp = await self._send(method, url, impersonate, **kwargs)
+        if resp.status_code == 304 and cached is not None:
+            await http_cache.refresh(url)
+            return cached.response()
+        http_cache.misses += 1
+        if resp.status_code == 200:
+            await http_cache.put(url, resp)
+        return resp
+
+    async def _send(self, method: str, url: str, impersonate: str, **kwargs):
+        key = (urlsplit(url).hostname or "", impersonate)
+        await rate_limiter.acquire(key[0])
+        pooled = self._session(key)
+        pooled.in_use += 1
+        try:
+            resp = await pooled.session.request(method, url, **kwargs)
+        except RequestsError:
+            self._record(key, pooled, ok=False)
+            raise
+        finally:
+            pooled.in_use -= 1
+        self._record(key, pooled, ok=resp.status_code not in BLOCKED_STATUSES)
+        rate_limiter.feedback(key[0], resp.status_code, resp.headers.get("Retry-After"))
+        return resp
+
+    def stats(self) -> dict:
+        return {
+            "sessions": len(self._sessions),
+            "in_use": sum(p.in_use for p in self._sessions.values()),
+            "recycled": self.recycled,
+        }
+
+    def _session(self, key: tuple[str, str]) -> _PooledSession:
+        pooled = self._sessions.get(key)
+        if pooled is not None and time.monotonic() - pooled.created_at > SCRAPER_SESSION_MAX_AGE:
+            self._retire(key, pooled)
+            pooled = None
+        if pooled is None:
+            self._evict_idle()
+            pooled = _PooledSession(AsyncSession(impersonate=key[1], max_clients=self.max_clients))
+            self._sessions[key] = pooled
+        self._sessions.move_to_end(key)
+        return pooled
+
+    def _record(self, key: tuple[str, str], pooled: _PooledSession, ok: bool):
+        if ok:
+            pooled.failures = 0
+            return
+        pooled.failures += 1
+        if pooled.failures >= SCRAPER_SESSION_MAX_FAILURES and self._sessions.get(key) is pooled:
+            print(f"[SessionPool] Recycling session for {key[0]} after {pooled.failures} failures")
+            self._retire(key, pooled)
+            self.recycled += 1
+
+    def _retire(self, key: tuple[str, str], pooled: _PooledSession):
+        """Take the session out of the pool; it closes once its last request is done."""
+        del self._sessions[key]
+        self._close_when_idle(pooled)
+
+    def _evict_idle(self):
+        """Make room for one more session. Busy sessions are never closed."""
+        for key in list(self._sessions):
+            if len(self._sessions) < self.max_hosts:
+                break
+            if self._sessions[key].in_use == 0:
+                self._retire(key, self._sessions[key])
+
+    def _close_when_idle(self, pooled: _PooledSession):
+        async def close():
+            while pooled.in_use:
+                await asyncio.sleep(1.0)
+            await pooled.session.close()
+        task = asyncio.get_running_loop().create_task(close())
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+class PooledClient:
+    """AsyncSession look-alike for the scrapers: per-client default headers and options."""
+    def __init__(self, pool: SessionPool, impersonate: str, headers: dict, defaults: dict):
+        self.pool = pool
+        self.impersonate = impersonate
+        self.headers = headers
+        self.defaults = defaults
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False  # the pooled sessions outlive the scrape
+
+    async def request(self, method: str, url: str, **kwargs):
+        kwargs["headers"] = {**self.headers, **kwargs.get("headers", {})}
+        return await self.pool.request(method, url, impersonate=self.impersonate, **{**self.defaults, **kwargs})
+
+    async def get(self, url: str, **kwargs):
+        return await self.request("GET", url, **kwargs)
+
+session_pool = SessionPool()
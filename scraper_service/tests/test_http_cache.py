@@ -0,0 +1,59 @@
+import os
+import asyncio
+from types import SimpleNamespace
+import pytest
+from app import http_cache
+from app.http_cache import HttpCache
+
+URL = "https://www.reddit.com/search.json?q=notion"
+
+def _response(body: bytes, **headers) -> SimpleNamespace:
+    return SimpleNamespace(status_code=200, content=body, headers=headers)
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = HttpCache(str(tmp_path / "http_cache.db"))
+    yield cache
+    cache.close()
+
+def test_stored_response_is_fresh_within_its_host_ttl(cache, monkeypatch):
+    monkeypatch.setattr(http_cache, "HTTP_CACHE_TTLS", {"www.reddit.com": 60})
+    asyncio.run(cache.put(URL, _response(b'{"a": 1}', **{"content-type": "application/json", "etag": '"v1"'})))
+    entry = asyncio.run(cache.get(URL))
+    assert entry.fresh()
+    assert entry.response().json() == {"a": 1}
+    assert entry.validators() == {"If-None-Match": '"v1"'}
+
+    monkeypatch.setattr(http_cache, "HTTP_CACHE_TTLS", {"www.reddit.com": 0})
+    assert not asyncio.run(cache.get(URL)).fresh()
+
+def test_revalidation_restarts_the_ttl(cache, monkeypatch):
+    monkeypatch.setattr(http_cache, "HTTP_CACHE_TTLS", {"www.reddit.com": 0.2})
+
+    async def scenario():
+        await cache.put(URL, _response(b"x", etag='"v1"'))
+        await asyncio.sleep(0.25)
+        stale = (await cache.get(URL)).fresh()
+        await cache.refresh(URL)
+        return stale, (await cache.get(URL)).fresh()
+
+    assert asyncio.run(scenario()) == (False, True)
+
+def test_no_store_responses_are_skipped(cache):
+    asyncio.run(cache.put(URL, _response(b"x", **{"cache-control": "private, no-store"})))
+    assert asyncio.run(cache.get(URL)) is None
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = HttpCache(str(tmp_path / "http_cache.db"), max_bytes=2500)
+    body = os.urandom(1024)  # incompressible: ~1 KB per stored entry
+
+    async def scenario():
+        await cache.put("https://a.test/1", _response(body))
+        await cache.put("https://a.test/2", _response(body))
+        await cache.get("https://a.test/1")  # 1 is now more recent than 2
+        await cache.put("https://a.test/3", _response(body))
+        return [await cache.get(f"https://a.test/{i}") is not None for i in (1, 2, 3)]
+
+    assert asyncio.run(scenario()) == [True, False, True]
+    assert cache.stats()["bytes"] <= 2500
+    cache.close()
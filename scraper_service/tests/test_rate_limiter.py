@@ -0,0 +1,37 @@
+import time
+import asyncio
+from app import rate_limiter
+from app.rate_limiter import TokenBucket, RateLimiter
+
+def _timed(coro) -> float:
+    started = time.monotonic()
+    asyncio.run(coro)
+    return time.monotonic() - started
+
+def test_bucket_allows_a_burst_then_paces(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "SCRAPER_RATE_JITTER", 0)
+    bucket = TokenBucket(rate=10, burst=2)
+
+    async def take(n):
+        await asyncio.gather(*(bucket.acquire() for _ in range(n)))
+
+    # 2 from the burst, the other 4 at 10/s
+    assert 0.35 < _timed(take(6)) < 0.6
+
+def test_throttled_domain_slows_down_and_recovers(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "SCRAPER_RATE_LIMITS", {"example.com": 4.0})
+    limiter = RateLimiter()
+    limiter.feedback("example.com", 429, "0")
+    limiter.feedback("example.com", 403, "0")
+    assert limiter.stats() == {"example.com": 1.0}
+    for _ in range(20):
+        limiter.feedback("example.com", 200)
+    assert limiter.stats() == {"example.com": 4.0}
+
+def test_retry_after_pauses_the_domain(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "SCRAPER_RATE_JITTER", 0)
+    limiter = RateLimiter()
+    limiter.feedback("example.com", 429, "0.3")
+    assert _timed(limiter.acquire("example.com")) >= 0.3
+    # Dates and junk fall back to the default pause instead of failing
+    assert rate_limiter._retry_after_seconds("Wed, 21 Oct 2015 07:28:00 GMT") is None
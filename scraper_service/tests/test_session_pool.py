@@ -0,0 +1,90 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+from curl_cffi.requests import RequestsError
+from app import session_pool as pool_module
+from app.session_pool import SessionPool
+
+class FakeSession:
+    """Stands in for curl_cffi's AsyncSession; answers with the next queued status."""
+    created = []
+
+    def __init__(self, impersonate: str, max_clients: int):
+        self.impersonate = impersonate
+        self.statuses: list = []
+        self.closed = False
+        FakeSession.created.append(self)
+
+    async def request(self, method, url, **kwargs):
+        status = self.statuses.pop(0) if self.statuses else 200
+        if isinstance(status, Exception):
+            raise status
+        return SimpleNamespace(status_code=status, headers={})
+
+    async def close(self):
+        self.closed = True
+
+class NoLimits:
+    async def acquire(self, domain):
+        pass
+
+    def feedback(self, domain, status_code, retry_after=None):
+        pass
+
+@pytest.fixture
+def pool(monkeypatch):
+    FakeSession.created = []
+    monkeypatch.setattr(pool_module, "AsyncSession", FakeSession)
+    monkeypatch.setattr(pool_module, "rate_limiter", NoLimits())
+    monkeypatch.setattr(pool_module, "http_cache", SimpleNamespace(enabled=False))
+    monkeypatch.setattr(pool_module, "SCRAPER_SESSION_MAX_FAILURES", 2)
+    return SessionPool(max_hosts=2)
+
+def test_one_session_per_host_reused_across_requests(pool):
+    async def scenario():
+        client = pool.client()
+        await client.get("https://a.com/1")
+        await client.get("https://a.com/2")
+        await pool.client(impersonate="safari").get("https://a.com/3")
+
+    asyncio.run(scenario())
+    assert [s.impersonate for s in FakeSession.created] == ["chrome", "safari"]
+
+def test_repeatedly_blocked_session_is_recycled(pool):
+    async def scenario():
+        client = pool.client()
+        await client.get("https://a.com/")
+        first = FakeSession.created[0]
+        first.statuses = [403, RequestsError("reset"), 200]
+        await client.get("https://a.com/")
+        with pytest.raises(RequestsError):
+            await client.get("https://a.com/")
+        await client.get("https://a.com/")
+        await asyncio.sleep(0)  # let the retired session close
+        return first
+
+    first = asyncio.run(scenario())
+    assert pool.recycled == 1
+    assert first.closed and len(FakeSession.created) == 2
+
+def test_a_success_resets_the_failure_count(pool):
+    async def scenario():
+        client = pool.client()
+        await client.get("https://a.com/")
+        FakeSession.created[0].statuses = [429, 200, 429]
+        for _ in range(3):
+            await client.get("https://a.com/")
+
+    asyncio.run(scenario())
+    assert pool.recycled == 0 and len(FakeSession.created) == 1
+
+def test_idle_sessions_make_room_least_recently_used_first(pool):
+    async def scenario():
+        for host in ("a.com", "b.com", "a.com", "c.com"):
+            await pool.client().get(f"https://{host}/")
+        await asyncio.sleep(0)
+
+    asyncio.run(scenario())
+    a, b, c = FakeSession.created
+    assert b.closed and not a.closed and not c.closed
+    assert pool.stats()["sessions"] == 2
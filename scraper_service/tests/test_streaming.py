@@ -0,0 +1,42 @@
+import asyncio
+from app.models import ReviewItem
+from app.scrapers.streaming import as_completed, collect, unique_batches
+
+def _reviews(*urls: str) -> list[ReviewItem]:
+    return [ReviewItem(text=u, source="hn", url=u, date="") for u in urls]
+
+async def _fetch(delay: float, *urls: str, finished: list | None = None):
+    await asyncio.sleep(delay)
+    if finished is not None:
+        finished.append(urls)
+    return _reviews(*urls)
+
+def test_batches_arrive_in_the_order_their_fetches_finish():
+    async def scenario():
+        stream = as_completed([_fetch(0.05, "slow"), _fetch(0.0, "fast")])
+        return [[r.url for r in batch] async for batch in stream]
+
+    assert asyncio.run(scenario()) == [["fast"], ["slow"]]
+
+def test_repeated_urls_are_dropped_across_batches():
+    async def scenario():
+        stream = as_completed([_fetch(0.0, "a", "b"), _fetch(0.02, "b", "c")])
+        return await collect(unique_batches(stream))
+
+    assert [r.url for r in asyncio.run(scenario())] == ["a", "b", "c"]
+
+def test_limit_stops_the_stream_and_cancels_the_remaining_fetches():
+    finished = []
+
+    async def scenario():
+        stream = as_completed([
+            _fetch(0.0, "a", "b", finished=finished),
+            _fetch(0.01, "c", "d", finished=finished),
+            _fetch(0.2, "e", finished=finished),
+        ])
+        reviews = await collect(unique_batches(stream, limit=3))
+        await asyncio.sleep(0.3)  # the slow fetch would have finished by now
+        return reviews
+
+    assert [r.url for r in asyncio.run(scenario())] == ["a", "b", "c"]
+    assert finished == [("a", "b"), ("c", "d")]
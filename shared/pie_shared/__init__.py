@@ -0,0 +1,5 @@
+"""
+pie_shared — modules every service imports, kept in one place.
+Installed into each service from its requirements.txt (`../shared`); the
+Dockerfiles build from the repository root so the package is in the context.
+"""
@@ -0,0 +1,74 @@
+"""
+cancellation.py — stop in-flight work for a job on request.
+The gateway calls POST /cancel/{job_id} when a job is cancelled. Every
+request currently working on that job_id has its asyncio tasks cancelled
+and its flag set, so blocking code in worker threads can bail out between
+batches.
+"""
+import asyncio
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+class JobCancelled(Exception):
+    """Raised inside a request whose job was cancelled via /cancel."""
+
+class CancelToken:
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.event = threading.Event()  # polled from worker threads
+        self.tasks: set[asyncio.Task] = set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.event.is_set()
+
+    def check(self):
+        if self.cancelled:
+            raise JobCancelled(self.job_id)
+
+    def cancel(self):
+        self.event.set()
+        for task in self.tasks:
+            task.cancel()
+
+    async def run(self, aw):
+        """Await `aw` as a task that /cancel can abort."""
+        self.check()
+        task = asyncio.ensure_future(aw)
+        self.tasks.add(task)
+        try:
+            return await task
+        except asyncio.CancelledError:
+            if self.cancelled:
+                raise JobCancelled(self.job_id) from None
+            raise
+        finally:
+            self.tasks.discard(task)
+
+class CancellationRegistry:
+    def __init__(self):
+        self._tokens: dict[str, set[CancelToken]] = defaultdict(set)
+
+    @contextmanager
+    def track(self, job_id: str):
+        """Register one request's work for `job_id` for as long as the block runs."""
+        token = CancelToken(job_id)
+        self._tokens[job_id].add(token)
+        try:
+            yield token
+        finally:
+            tokens = self._tokens.get(job_id)
+            if tokens is not None:
+                tokens.discard(token)
+                if not tokens:
+                    del self._tokens[job_id]
+
+    def cancel(self, job_id: str) -> int:
+        """Cancel everything running for `job_id`. Returns how many requests were stopped."""
+        tokens = self._tokens.get(job_id, ())
+        for token in tokens:
+            token.cancel()
+        return len(tokens)
+
+cancellations = CancellationRegistry()
@@ -0,0 +1,120 @@
+"""
+exa_client.py — shared Exa access for the scraper and analysis services.
+One Exa client per process; the blocking SDK runs in worker threads, at
+most EXA_MAX_CONCURRENCY calls at a time. Results are kept in SQLite at
+EXA_CACHE_PATH, keyed by (query, domains, num_results, options), for
+EXA_CACHE_TTL_SECONDS — a strategy repeated across jobs doesn't pay for
+another livecrawl. Identical calls in flight at the same time share one
+request, run as its own task: a caller that is cancelled stops waiting
+without cancelling it for the others.
+
+`search_and_contents()` returns plain dicts (title, url, text, highlights,
+published_date) so they can be cached.
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import asyncio
+import threading
+from pathlib import Path
+from exa_py import Exa
+from dotenv import load_dotenv
+
+load_dotenv()
+
+EXA_API_KEY = os.getenv("EXA_API_KEY")
+EXA_MAX_CONCURRENCY   = int(os.getenv("EXA_MAX_CONCURRENCY", "4"))
+EXA_CACHE_TTL_SECONDS = float(os.getenv("EXA_CACHE_TTL_SECONDS", str(24 * 3600)))
+# Relative to the service directory the app runs from; empty = off
+EXA_CACHE_PATH = os.getenv("EXA_CACHE_PATH", str(Path("app") / "exa_cache.db"))
+
+_client: Exa | None = None
+_semaphore = asyncio.Semaphore(EXA_MAX_CONCURRENCY)
+_inflight: dict[str, asyncio.Task] = {}
+_db: sqlite3.Connection | None = None
+_db_lock = threading.Lock()
+
+def available() -> bool:
+    return bool(EXA_API_KEY)
+
+def _exa() -> Exa:
+    global _client
+    if _client is None:
+        _client = Exa(api_key=EXA_API_KEY)
+    return _client
+
+async def search_and_contents(query: str, num_results: int, include_domains: list[str] | None = None,
+                              **options) -> list[dict]:
+    """Exa search_and_contents through the cache. Raises whatever the SDK raises."""
+    params = {"query": query, "num_results": num_results, **options}
+    if include_domains:
+        params["include_domains"] = sorted(include_domains)
+    key = hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+    cached = await asyncio.to_thread(_cache_get, key) if EXA_CACHE_PATH else None
+    if cached is not None:
+        return cached
+
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.get_running_loop().create_task(_fetch(key, params))
+        _inflight[key] = task
+        task.add_done_callback(lambda t: _finished(key, t))
+    return await asyncio.shield(task)
+
+async def _fetch(key: str, params: dict) -> list[dict]:
+    async with _semaphore:
+        results = await asyncio.to_thread(_search, params)
+    if EXA_CACHE_PATH:
+        await asyncio.to_thread(_cache_put, key, results)
+    return results
+
+def _finished(key: str, task: asyncio.Task):
+    if _inflight.get(key) is task:
+        del _inflight[key]
+    if not task.cancelled():
+        task.exception()  # retrieved even if every caller stopped waiting
+
+def _search(params: dict) -> list[dict]:
+    params = dict(params)
+    response = _exa().search_and_contents(params.pop("query"), **params)
+    return [
+        {
+            "title": r.title,
+            "url": r.url,
+            "text": r.text,
+            "highlights": list(r.highlights or []),
+            "published_date": r.published_date,
+        }
+        for r in response.results
+    ]
+
+# ── Cache ──────────────────────────────────────────────────────────
+
+def _conn() -> sqlite3.Connection:
+    global _db
+    if _db is None:
+        _db = sqlite3.connect(EXA_CACHE_PATH, check_same_thread=False)
+        _db.execute("PRAGMA journal_mode=WAL")
+        _db.execute(
+            "CREATE TABLE IF NOT EXISTS exa_results (key TEXT PRIMARY KEY, results TEXT NOT NULL, stored_at REAL NOT NULL)"
+        )
+    return _db
+
+def _cache_get(key: str) -> list[dict] | None:
+    with _db_lock:
+        row = _conn().execute("SELECT results, stored_at FROM exa_results WHERE key = ?", (key,)).fetchone()
+    if row is None or time.time() - row[1] > EXA_CACHE_TTL_SECONDS:
+        return None
+    return json.loads(row[0])
+
+def _cache_put(key: str, results: list[dict]):
+    now = time.time()
+    with _db_lock:
+        db = _conn()
+        db.execute("INSERT OR REPLACE INTO exa_results (key, results, stored_at) VALUES (?, ?, ?)",
+                   (key, json.dumps(results), now))
+        db.execute("DELETE FROM exa_results WHERE stored_at < ?", (now - EXA_CACHE_TTL_SECONDS,))
+        db.commit()
@@ -0,0 +1,49 @@
+"""
+http_ranges.py — conditional and partial GET helpers for report downloads.
+Strong ETags are sha256 digests of the exact bytes served, so they are
+valid both for If-None-Match (304) and for If-Range.
+"""
+import hashlib
+from fastapi import HTTPException, Request
+
+def strong_etag(data: bytes) -> str:
+    return f'"{hashlib.sha256(data).hexdigest()}"'
+
+def not_modified(request: Request, etag: str) -> bool:
+    """True when the client's If-None-Match already names `etag`."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison is what If-None-Match uses
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag in candidates
+
+def requested_range(request: Request, etag: str, size: int) -> tuple[int, int] | None:
+    """
+    (start, end) inclusive for a single `Range: bytes=...` request, or None to
+    send the whole body (no Range, stale If-Range, or several ranges).
+    Raises 416 for a range outside the body.
+    """
+    header = request.headers.get("range")
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    if_range = request.headers.get("if-range")
+    if if_range and if_range.strip() != etag:
+        return None
+
+    start_s, _, end_s = header[len("bytes="):].strip().partition("-")
+    try:
+        if start_s:
+            start = int(start_s)
+            end = int(end_s) if end_s else size - 1
+        else:
+            start, end = size - int(end_s), size - 1  # suffix range: last N bytes
+    except ValueError:
+        return None  # malformed — ignore it, as RFC 9110 allows
+    start = max(start, 0)
+    end = min(end, size - 1)
+    if start > end:
+        raise HTTPException(416, "Range not satisfiable", headers={"Content-Range": f"bytes */{size}"})
+    return start, end
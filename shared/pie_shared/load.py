@@ -0,0 +1,68 @@
+"""
+load.py — live load figures served on GET /load.
+LoadMiddleware counts requests in flight; handlers add backlog gauges for
+the work they queue up (e.g. reviews waiting on the models). The gateway
+polls /load and holds back or rejects new jobs while a service is saturated.
+SERVICE_NAME and the SERVICE_MAX_IN_FLIGHT default come from the service's
+app/__init__.py.
+"""
+import os
+import threading
+from contextlib import contextmanager
+
+SERVICE_NAME = os.getenv("SERVICE_NAME", "service")
+SERVICE_MAX_IN_FLIGHT = int(os.getenv("SERVICE_MAX_IN_FLIGHT", "8"))
+
+# Health checks and the gateway's own bookkeeping calls are not load
+UNCOUNTED_PREFIXES = ("/load", "/health", "/traces/", "/cancel/")
+
+class LoadTracker:
+    def __init__(self, max_in_flight: int = SERVICE_MAX_IN_FLIGHT):
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self._gauges: dict[str, int] = {}
+        self._limits: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def limit(self, gauge: str, capacity: int):
+        """Count `gauge` towards saturation: `capacity` units in flight = 100%."""
+        self._limits[gauge] = capacity
+
+    @contextmanager
+    def track(self, gauge: str, amount: int = 1):
+        with self._lock:
+            self._gauges[gauge] = self._gauges.get(gauge, 0) + amount
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._gauges[gauge] -= amount
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            backlog = dict(self._gauges)
+        ratios = [self.in_flight / self.max_in_flight if self.max_in_flight > 0 else 0.0]
+        ratios += [backlog.get(g, 0) / cap for g, cap in self._limits.items() if cap > 0]
+        return {
+            "service": SERVICE_NAME,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "backlog": backlog,
+            "saturation": round(max(ratios), 3),
+        }
+
+load = LoadTracker()
+
+class LoadMiddleware:
+    """Counts HTTP requests in flight, streamed responses until their last frame."""
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(UNCOUNTED_PREFIXES):
+            return await self.app(scope, receive, send)
+        load.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            load.in_flight -= 1
@@ -0,0 +1,107 @@
+"""
+tracing.py — lightweight spans for per-job latency waterfalls.
+The gateway mints a trace id per pipeline run (`start_trace`) and sends it
+as X-Trace-Id (comma-separated when one request serves several jobs).
+TraceMiddleware binds it to each service's request; `span()` then records
+timings for that trace, including work done in asyncio.to_thread. Finished
+spans are buffered in memory until the gateway drains them via
+GET /traces/{trace_id}. Spans are labelled with SERVICE_NAME, which each
+service's app/__init__.py defaults to its own name.
+"""
+import os
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+TRACE_HEADER = "X-Trace-Id"
+PARENT_HEADER = "X-Parent-Span-Id"
+SERVICE_NAME = os.getenv("SERVICE_NAME", "service")
+TRACE_BUFFER_TRACES = int(os.getenv("TRACE_BUFFER_TRACES", "1000"))
+
+_trace_ids: ContextVar[tuple[str, ...]] = ContextVar("trace_ids", default=())
+_parent_id: ContextVar[str | None] = ContextVar("parent_span_id", default=None)
+
+_buffer: OrderedDict[str, list[dict]] = OrderedDict()
+_lock = threading.Lock()
+
+def start_trace() -> str:
+    trace_id = uuid.uuid4().hex
+    set_trace(trace_id)
+    return trace_id
+
+def set_trace(*trace_ids: str):
+    _trace_ids.set(tuple(t for t in trace_ids if t))
+
+def current_trace_ids() -> tuple[str, ...]:
+    return _trace_ids.get()
+
+def current_span_id() -> str | None:
+    return _parent_id.get()
+
+@contextmanager
+def span(name: str, **attrs):
+    """Time the block as a child of the current span. A no-op outside a trace."""
+    trace_ids = _trace_ids.get()
+    if not trace_ids:
+        yield
+        return
+    span_id = uuid.uuid4().hex[:16]
+    parent_id = _parent_id.get()
+    token = _parent_id.set(span_id)
+    record = {
+        "span_id": span_id,
+        "parent_id": parent_id,
+        "service": SERVICE_NAME,
+        "name": name,
+        "start": time.time(),
+        "attrs": attrs,
+    }
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException as e:
+        record["attrs"] = {**attrs, "error": type(e).__name__}
+        raise
+    finally:
+        record["duration_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        _parent_id.reset(token)
+        _record(trace_ids, record)
+
+async def traced(name: str, aw, **attrs):
+    """`await aw` inside a span — for coroutines handed to gather()."""
+    with span(name, **attrs):
+        return await aw
+
+def _record(trace_ids: tuple[str, ...], record: dict):
+    with _lock:
+        for trace_id in trace_ids:
+            _buffer.setdefault(trace_id, []).append(record)
+            _buffer.move_to_end(trace_id)
+        while len(_buffer) > TRACE_BUFFER_TRACES:
+            _buffer.popitem(last=False)  # nobody collected it
+
+def drain(trace_id: str) -> list[dict]:
+    """Hand over and forget the finished spans of `trace_id`."""
+    with _lock:
+        return _buffer.pop(trace_id, [])
+
+class TraceMiddleware:
+    """Binds X-Trace-Id to the request and wraps it in a span."""
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = dict(scope["headers"])
+        header = headers.get(TRACE_HEADER.lower().encode(), b"").decode()
+        if not header or scope["path"].startswith("/traces/"):
+            return await self.app(scope, receive, send)
+        set_trace(*(t.strip() for t in header.split(",")))
+        # Nest this request under the caller's span
+        _parent_id.set(headers.get(PARENT_HEADER.lower().encode(), b"").decode() or None)
+        with span(f"{scope['method']} {scope['path']}"):
+            await self.app(scope, receive, send)
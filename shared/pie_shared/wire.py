@@ -0,0 +1,125 @@
+"""
+wire.py — content negotiation for service payloads.
+Bodies may be JSON or msgpack (Content-Type: application/x-msgpack), either
+optionally zstd-compressed (Content-Encoding: zstd). Servers install
+CodecRoute + CodecResponse, which decode any of these into the usual
+pydantic models and answer in whatever the caller's Accept / Accept-Encoding
+asks for. Clients build requests with `request_content()` and read answers
+with `read()`. NDJSON streams and files are left as they are.
+"""
+import os
+import json
+from contextvars import ContextVar
+import msgpack
+import zstandard
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+
+JSON = "application/json"
+MSGPACK = "application/x-msgpack"
+ZSTD = "zstd"
+
+# What this process asks for and sends as a client ("json" to turn it off)
+WIRE_FORMAT = os.getenv("WIRE_FORMAT", "msgpack")
+WIRE_COMPRESSION = os.getenv("WIRE_COMPRESSION", ZSTD)  # empty = never compress
+# Smaller bodies are not worth a compression frame
+WIRE_ZSTD_MIN_BYTES = int(os.getenv("WIRE_ZSTD_MIN_BYTES", "4096"))
+WIRE_ZSTD_LEVEL = int(os.getenv("WIRE_ZSTD_LEVEL", "3"))
+
+_response_format: ContextVar[tuple[str, bool]] = ContextVar("wire_response_format", default=(JSON, False))
+
+def encode(obj, media_type: str, compress: bool) -> tuple[bytes, bool]:
+    """Returns (body, compressed)."""
+    if media_type == MSGPACK:
+        data = msgpack.packb(obj)
+    else:
+        data = json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if compress and len(data) >= WIRE_ZSTD_MIN_BYTES:
+        return zstandard.ZstdCompressor(level=WIRE_ZSTD_LEVEL).compress(data), True
+    return data, False
+
+def decode(data: bytes, media_type: str, encoding: str = ""):
+    if encoding == ZSTD:
+        data = zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    if media_type == MSGPACK:
+        return msgpack.unpackb(data)
+    return json.loads(data)
+
+def _media_type(content_type: str) -> str:
+    return content_type.split(";")[0].strip().lower()
+
+# ── Server side ────────────────────────────────────────────────────
+
+def negotiate(headers) -> tuple[str, bool]:
+    """Response format for a request: (media type, may compress)."""
+    accept = headers.get("accept", "")
+    media_type = MSGPACK if MSGPACK in accept else JSON
+    return media_type, ZSTD in headers.get("accept-encoding", "")
+
+class _DecodedRequest(Request):
+    """A msgpack and/or zstd body presented to FastAPI as already-parsed JSON."""
+    def __init__(self, request: Request, media_type: str, encoding: str):
+        headers = [
+            (k, v) for k, v in request.scope["headers"]
+            if k not in (b"content-type", b"content-encoding", b"content-length")
+        ]
+        super().__init__({**request.scope, "headers": headers + [(b"content-type", JSON.encode())]}, request.receive)
+        self._wire = (media_type, encoding)
+
+    async def json(self):
+        if not hasattr(self, "_json"):
+            self._json = decode(await self.body(), *self._wire)
+        return self._json
+
+class CodecRoute(APIRoute):
+    """Decodes msgpack/zstd request bodies and picks the response format."""
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def codec_handler(request: Request):
+            media_type = _media_type(request.headers.get("content-type", ""))
+            encoding = request.headers.get("content-encoding", "").strip().lower()
+            if media_type == MSGPACK or encoding == ZSTD:
+                request = _DecodedRequest(request, media_type, encoding)
+            token = _response_format.set(negotiate(request.headers))
+            try:
+                return await handler(request)
+            finally:
+                _response_format.reset(token)
+
+        return codec_handler
+
+class CodecResponse(JSONResponse):
+    """Default response class: JSON or msgpack, zstd when asked for and worth it."""
+    def __init__(self, content, *args, **kwargs):
+        self._compressed = False
+        super().__init__(content, *args, **kwargs)
+        if self._compressed:
+            self.headers["content-encoding"] = ZSTD
+        self.headers["vary"] = "Accept, Accept-Encoding"
+
+    def render(self, content) -> bytes:
+        media_type, compress = _response_format.get()
+        self.media_type = media_type
+        data, self._compressed = encode(content, media_type, compress)
+        return data
+
+# ── Client side ────────────────────────────────────────────────────
+
+def request_content(payload, headers: dict | None = None) -> dict:
+    """httpx keyword arguments (content + headers) sending `payload` in WIRE_FORMAT."""
+    media_type = MSGPACK if WIRE_FORMAT == "msgpack" else JSON
+    data, compressed = encode(payload, media_type, WIRE_COMPRESSION == ZSTD)
+    headers = {**(headers or {}), "Content-Type": media_type, "Accept": f"{media_type}, {JSON};q=0.5"}
+    if compressed:
+        headers["Content-Encoding"] = ZSTD
+    if WIRE_COMPRESSION == ZSTD:
+        headers["Accept-Encoding"] = f"{ZSTD}, gzip"
+    return {"content": data, "headers": headers}
+
+def read(resp):
+    """Body of a response in any format `negotiate` can produce (httpx>=0.27.1 undoes zstd itself)."""
+    if _media_type(resp.headers.get("content-type", "")) == MSGPACK:
+        return msgpack.unpackb(resp.content)
+    return resp.json()
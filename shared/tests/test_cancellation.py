@@ -0,0 +1,44 @@
+import asyncio
+import pytest
+from pie_shared.cancellation import CancellationRegistry, JobCancelled
+
+def test_cancel_stops_every_request_working_on_the_job():
+    registry = CancellationRegistry()
+
+    async def scenario():
+        with registry.track("j") as first, registry.track("j") as second, registry.track("other") as other:
+            started = asyncio.Event()
+
+            async def work():
+                started.set()
+                await asyncio.sleep(10)
+
+            running = asyncio.create_task(first.run(work()))
+            await started.wait()
+            stopped = registry.cancel("j")
+            with pytest.raises(JobCancelled):
+                await running
+            with pytest.raises(JobCancelled):
+                second.check()  # blocking code polls the flag between batches
+            return stopped, other.cancelled
+
+    assert asyncio.run(scenario()) == (2, False)
+
+def test_finished_requests_are_forgotten():
+    registry = CancellationRegistry()
+    with registry.track("j"):
+        pass
+    assert registry.cancel("j") == 0
+
+def test_other_cancellations_pass_through():
+    registry = CancellationRegistry()
+
+    async def scenario():
+        with registry.track("j") as token:
+            task = asyncio.create_task(token.run(asyncio.sleep(10)))
+            await asyncio.sleep(0)
+            task.cancel()  # e.g. the client went away — not a /cancel
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+    asyncio.run(scenario())
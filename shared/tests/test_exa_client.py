@@ -0,0 +1,79 @@
+import time
+import asyncio
+from types import SimpleNamespace
+import pytest
+from pie_shared import exa_client
+
+class FakeExa:
+    """Blocking, slow, counts its calls — like the real SDK minus the bill."""
+    def __init__(self, delay: float = 0.2, error: Exception | None = None):
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+
+    def search_and_contents(self, query, **params):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        result = SimpleNamespace(title="T", url=f"https://example.com/{query}", text="body",
+                                 highlights=["h"], published_date=None)
+        return SimpleNamespace(results=[result])
+
+@pytest.fixture
+def exa(monkeypatch, tmp_path):
+    fake = FakeExa()
+    monkeypatch.setattr(exa_client, "_exa", lambda: fake)
+    monkeypatch.setattr(exa_client, "EXA_CACHE_PATH", str(tmp_path / "exa_cache.db"))
+    monkeypatch.setattr(exa_client, "_db", None)
+    monkeypatch.setattr(exa_client, "_inflight", {})
+    monkeypatch.setattr(exa_client, "_semaphore", asyncio.Semaphore(exa_client.EXA_MAX_CONCURRENCY))
+    return fake
+
+def test_identical_concurrent_calls_share_one_request(exa):
+    async def scenario():
+        return await asyncio.gather(*(exa_client.search_and_contents("q", 3) for _ in range(3)))
+
+    results = asyncio.run(scenario())
+    assert exa.calls == 1
+    assert results[0] == results[1] == results[2]
+    assert results[0][0]["url"] == "https://example.com/q"
+
+def test_cancelled_caller_does_not_cancel_the_others(exa):
+    async def scenario():
+        first = asyncio.create_task(exa_client.search_and_contents("q", 3))
+        second = asyncio.create_task(exa_client.search_and_contents("q", 3))
+        await asyncio.sleep(0.05)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(scenario())[0]["title"] == "T"
+    assert exa.calls == 1
+    assert exa_client._inflight == {}
+
+def test_repeat_call_is_served_from_cache_until_ttl(exa, monkeypatch):
+    asyncio.run(exa_client.search_and_contents("q", 3, include_domains=["b.com", "a.com"]))
+    asyncio.run(exa_client.search_and_contents("q", 3, include_domains=["a.com", "b.com"]))
+    assert exa.calls == 1
+    # Different parameters are a different entry
+    asyncio.run(exa_client.search_and_contents("q", 5))
+    assert exa.calls == 2
+
+    monkeypatch.setattr(exa_client, "EXA_CACHE_TTL_SECONDS", 0)
+    asyncio.run(exa_client.search_and_contents("q", 3, include_domains=["a.com", "b.com"]))
+    assert exa.calls == 3
+
+def test_failures_reach_every_caller_and_are_not_cached(exa):
+    exa.error = RuntimeError("quota exceeded")
+
+    async def scenario():
+        return await asyncio.gather(*(exa_client.search_and_contents("q", 3) for _ in range(2)),
+                                    return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    exa.error = None
+    assert asyncio.run(exa_client.search_and_contents("q", 3))
+    assert exa.calls == 2
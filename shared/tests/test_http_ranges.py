@@ -0,0 +1,35 @@
+import pytest
+from fastapi import HTTPException, Request
+from pie_shared.http_ranges import not_modified, requested_range, strong_etag
+
+ETAG = strong_etag(b"report")
+
+def _request(**headers: str) -> Request:
+    return Request({"type": "http", "headers": [(k.replace("_", "-").encode(), v.encode()) for k, v in headers.items()]})
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-9", (0, 9)),
+    ("bytes=90-", (90, 99)),
+    ("bytes=-10", (90, 99)),
+    ("bytes=50-500", (50, 99)),   # clamped to the body
+    ("bytes=0-1,5-6", None),      # several ranges: whole body
+    ("bytes=a-b", None),          # malformed: ignored
+    ("items=0-9", None),
+])
+def test_requested_range(header, expected):
+    assert requested_range(_request(range=header), ETAG, 100) == expected
+
+def test_range_needs_a_matching_if_range():
+    assert requested_range(_request(range="bytes=0-9", if_range=ETAG), ETAG, 100) == (0, 9)
+    assert requested_range(_request(range="bytes=0-9", if_range='"stale"'), ETAG, 100) is None
+
+def test_unsatisfiable_range_is_a_416():
+    with pytest.raises(HTTPException) as e:
+        requested_range(_request(range="bytes=100-"), ETAG, 100)
+    assert e.value.status_code == 416 and e.value.headers["Content-Range"] == "bytes */100"
+
+@pytest.mark.parametrize("header, expected", [
+    (None, False), (ETAG, True), (f'"a", W/{ETAG}', True), ("*", True), ('"other"', False),
+])
+def test_not_modified(header, expected):
+    assert not_modified(_request(**({"if_none_match": header} if header else {})), ETAG) is expected
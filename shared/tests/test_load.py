@@ -0,0 +1,39 @@
+import asyncio
+import httpx
+from fastapi import FastAPI
+from pie_shared.load import LoadMiddleware, LoadTracker, load
+
+def test_saturation_is_the_fullest_of_requests_and_limited_gauges():
+    tracker = LoadTracker(max_in_flight=4)
+    tracker.limit("reviews", 100)
+    tracker.in_flight = 1
+    with tracker.track("reviews", 80), tracker.track("unlimited", 1000):
+        busy = tracker.snapshot()
+    idle = tracker.snapshot()
+
+    assert busy["saturation"] == 0.8 and busy["backlog"] == {"reviews": 80, "unlimited": 1000}
+    assert idle["saturation"] == 0.25 and idle["backlog"] == {"reviews": 0, "unlimited": 0}
+
+def test_middleware_counts_work_but_not_bookkeeping_calls():
+    seen = {}
+    app = FastAPI()
+    app.add_middleware(LoadMiddleware)
+
+    @app.post("/work")
+    async def work():
+        seen["work"] = load.in_flight
+        return {}
+
+    @app.get("/load")
+    async def get_load():
+        seen["load"] = load.in_flight
+        return {}
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://svc") as client:
+            await client.post("/work")
+            await client.get("/load")
+
+    asyncio.run(scenario())
+    assert seen == {"work": 1, "load": 0}
+    assert load.in_flight == 0
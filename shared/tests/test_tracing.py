@@ -0,0 +1,28 @@
+import asyncio
+import httpx
+from fastapi import FastAPI
+from pie_shared.tracing import PARENT_HEADER, TRACE_HEADER, TraceMiddleware, drain, span
+
+def _app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(TraceMiddleware)
+
+    @app.post("/work")
+    async def work():
+        with span("step", size=2):
+            await asyncio.to_thread(lambda: None)
+        return {}
+    return app
+
+def test_request_spans_go_to_every_trace_in_the_header():
+    async def scenario():
+        transport = httpx.ASGITransport(app=_app())
+        async with httpx.AsyncClient(transport=transport, base_url="http://svc") as client:
+            await client.post("/work", headers={TRACE_HEADER: "t1, t2", PARENT_HEADER: "caller"})
+        return drain("t1"), drain("t2")
+
+    t1, t2 = asyncio.run(scenario())
+    assert t1 == t2
+    step, request = t1
+    assert (request["name"], request["parent_id"]) == ("POST /work", "caller")
+    assert (step["name"], step["parent_id"], step["attrs"]) == ("step", request["span_id"], {"size": 2})
@@ -0,0 +1,56 @@
+import asyncio
+import httpx
+import pytest
+from fastapi import FastAPI
+from pydantic import BaseModel
+from pie_shared import wire
+
+PAYLOAD = {"reviews": [{"text": "Great — but slow ✓", "upvotes": 3, "score": 0.5}] * 300, "job_id": "j", "empty": None}
+
+@pytest.mark.parametrize("media_type", [wire.JSON, wire.MSGPACK])
+@pytest.mark.parametrize("compress", [False, True])
+def test_encode_decode_round_trip(media_type, compress):
+    data, compressed = wire.encode(PAYLOAD, media_type, compress)
+    assert compressed == compress  # the payload is above WIRE_ZSTD_MIN_BYTES
+    assert wire.decode(data, media_type, wire.ZSTD if compressed else "") == PAYLOAD
+
+def test_small_bodies_are_not_compressed():
+    data, compressed = wire.encode({"ok": True}, wire.MSGPACK, True)
+    assert not compressed
+    assert wire.decode(data, wire.MSGPACK) == {"ok": True}
+
+class Echo(BaseModel):
+    reviews: list[dict]
+    job_id: str
+
+def _app() -> FastAPI:
+    app = FastAPI(default_response_class=wire.CodecResponse)
+    app.router.route_class = wire.CodecRoute
+
+    @app.post("/echo")
+    async def echo(body: Echo):
+        return body.model_dump()
+
+    return app
+
+async def _post(**kwargs) -> httpx.Response:
+    transport = httpx.ASGITransport(app=_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://service") as client:
+        return await client.post("/echo", **kwargs)
+
+@pytest.mark.parametrize("wire_format", ["msgpack", "json"])
+def test_service_round_trip_in_negotiated_format(monkeypatch, wire_format):
+    monkeypatch.setattr(wire, "WIRE_FORMAT", wire_format)
+    body = {"reviews": PAYLOAD["reviews"], "job_id": "j"}
+    resp = asyncio.run(_post(**wire.request_content(body)))
+    assert resp.status_code == 200
+    expected = wire.MSGPACK if wire_format == "msgpack" else wire.JSON
+    assert resp.headers["content-type"].startswith(expected)
+    assert resp.headers.get("content-encoding") == wire.ZSTD
+    assert wire.read(resp) == body  # httpx undoes the zstd layer itself
+
+def test_plain_json_clients_still_get_json():
+    resp = asyncio.run(_post(json={"reviews": [], "job_id": "j"}))
+    assert resp.headers["content-type"].startswith(wire.JSON)
+    assert "content-encoding" not in resp.headers
+    assert wire.read(resp) == {"reviews": [], "job_id": "j"}